@@ -41,12 +41,18 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # request timings, /metrics and the Server-Timing header (predictor/metrics.py)
+    'predictor.metrics.MetricsMiddleware',
+    'predictor.metrics.TimedSessionMiddleware',
+    # unlock flag and last queries in a signed cookie (predictor/state.py)
+    'predictor.state.PredictorStateMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # on-demand stack sampling (predictor/profiler.py)
+    'predictor.profiler.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'jee_predictor.urls'
@@ -89,6 +95,26 @@ else:
         }
     }
 
+# Cache - local memory by default; set CACHE_DIR to share the prediction
+# result cache between gunicorn workers through the filesystem
+CACHES = {
+    'default': {
+        'BACKEND': (
+            'predictor.cache_backends.BatchedCullFileCache'
+            if os.getenv('CACHE_DIR')
+            else 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_DIR', 'jee-predictor'),
+        # Django culls at 300 entries by default; a warmed predictor holds
+        # a few tens of thousands
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+
+# Prediction result cache (predictor/result_cache.py)
+PREDICTION_CACHE_ALIAS = 'default'
+PREDICTION_CACHE_TIMEOUT = 60 * 60
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -122,3 +148,35 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Login redirects
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
+
+# Stamp file bumped by the cutoff loaders; workers rebuild their
+# in-memory cutoff index when it changes.
+CUTOFF_DATA_VERSION_FILE = BASE_DIR / '.cutoff_version'
+
+# Precomputed rank -> eligible programs table (build_rank_lookup command)
+RANK_LOOKUP_FILE = BASE_DIR / 'rank_lookup.npz'
+
+# Columnar cutoff snapshot, mmapped read-only by every worker
+CUTOFF_SNAPSHOT_FILE = BASE_DIR / 'cutoffs.snapshot'
+
+# Append-only spool of captured leads, drained into the database by the
+# drain_lead_queue command (predictor/lead_queue.py)
+LEAD_QUEUE_FILE = BASE_DIR / 'lead_queue.jsonl'
+
+# Send per-stage timings to browsers in a Server-Timing header; never on
+# responses marked public, which shared caches would store
+SERVER_TIMING_HEADER = DEBUG
+
+# /metrics and /api/cache-stats/ are for staff users, or for a scraper
+# sending "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Stack sampling profiler (predictor/profiler.py): `kill -USR2 <worker pid>`
+# samples that worker for PROFILE_SECONDS; captures are written to PROFILE_DIR
+PROFILE_SIGNAL = 'SIGUSR2'
+PROFILE_SECONDS = 10
+PROFILE_DIR = BASE_DIR / 'profiles'
+
+# Shared-cache lifetime (seconds) of locked prediction result pages; they
+# also carry an ETag, so browsers revalidate cheaply (predictor/http_cache.py)
+PREDICTION_PAGE_MAX_AGE = 300
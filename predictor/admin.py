@@ -13,8 +13,8 @@ class InstituteAdmin(admin.ModelAdmin):
 
 @admin.register(Cutoff)
 class CutoffAdmin(admin.ModelAdmin):
-    list_display = ('institute', 'program_name', 'quota', 'seat_type', 'gender', 'opening_rank', 'closing_rank', 'year')
-    list_filter = ('year', 'quota', 'seat_type', 'gender')
+    list_display = ('institute', 'program_name', 'quota', 'seat_type', 'gender', 'opening_rank', 'closing_rank', 'year', 'round')
+    list_filter = ('year', 'round', 'quota', 'seat_type', 'gender')
     search_fields = ('institute__name', 'program_name')
 
 
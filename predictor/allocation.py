@@ -0,0 +1,397 @@
+"""
+JoSAA-style seat allocation simulator.
+
+A bucket is one Cutoff row of a (year, round): a program at an institute
+for one (quota, seat_type, gender). Students hold a JEE Main rank (CRL),
+a category, a gender, a home state and an ordered list of programs.
+
+Allocation is student-proposing deferred acceptance. Every bucket ranks
+its applicants by the same merit order: CRL for OPEN seats, category rank
+(the CRL order restricted to one category) for reserved seats, with
+female-only and HS/OS seats only changing who may apply. With priorities
+that agree, deferred acceptance gives the same matching as letting
+students choose one at a time in rank order, so allocate() walks a
+rank-ordered queue. It does that in vectorised chunks: each student in a
+chunk takes the first bucket on their list with a free seat, and the
+chunk is accepted up to the first student who lost a seat to a better
+ranked student in the same chunk. Every partial chunk fills at least one
+bucket, so the number of passes is bounded by buckets + students / chunk.
+
+Preferences are array-backed: an (N, choices) int32 matrix of program
+codes, expanded to buckets per student type (category, gender, home state)
+through a small (programs, types, slots) lookup table instead of storing
+bucket lists per student.
+
+Seat counts per bucket come from a seats file (cutoff id -> seats) or are
+inferred from the seat matrix structure: program intake x reservation
+share x gender share x home-state share. IIT rows are left out; they are
+filled on JEE Advanced ranks, not the Main ranks simulated here.
+"""
+import csv
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .codes import (
+    CATEGORIES, FEMALE_ONLY, GENDER_NEUTRAL, OPEN, canonical_gender, canonical_seat_type,
+)
+from .institute_states import (
+    HOME_STATE_QUOTA, OTHER_STATE_QUOTA, STATE_QUOTAS, STATES, canonical_state,
+)
+
+
+# share of a program's seats per category (central reservation)
+RESERVATION_SHARE = {"OPEN": 0.405, "EWS": 0.10, "OBC-NCL": 0.27, "SC": 0.15, "ST": 0.075}
+# female-only supernumerary seats, relative to the gender-neutral ones
+FEMALE_SEAT_SHARE = 0.2
+# NITs split seats between home state and other state
+HOME_STATE_SHARE = 0.5
+# roughly a large NIT branch; pass a seats file for real intakes
+DEFAULT_PROGRAM_SEATS = 120
+
+# synthetic cohort mix
+COHORT_CATEGORY_SHARE = {"OPEN": 0.45, "EWS": 0.09, "OBC-NCL": 0.30, "SC": 0.11, "ST": 0.05}
+COHORT_FEMALE_SHARE = 0.25
+DEFAULT_CHOICES = 20
+
+# students per vectorised allocation pass (grows and shrinks as it runs)
+ALLOCATION_CHUNK = 1024
+
+SimulationResult = namedtuple("SimulationResult", ["assigned", "opening", "closing", "filled"])
+
+
+def _is_iit(institute_name):
+    # same test as classify_institutes
+    return "INDIAN INSTITUTE OF TECHNOLOGY" in institute_name.upper()
+
+
+class Buckets:
+    """
+    Seat buckets of one (year, round), with capacities.
+    """
+
+    def __init__(self, index, positions, capacity):
+        cols, strings = index.columns, index.columns.strings
+        self.positions = positions
+        self.capacity = capacity.astype(np.int32)
+        self.cutoff_id = cols.id[positions].astype(np.int64)
+        self.opening_rank = cols.opening_rank[positions].astype(np.int64)
+        self.closing_rank = cols.closing_rank[positions].astype(np.int64)
+
+        names = np.array(strings["quota"], dtype=object)[cols.quota[positions]]
+        self.quota = names
+        self.seat_type = np.array(strings["seat_type"], dtype=object)[cols.seat_type[positions]]
+        self.female_only = np.array(strings["gender"], dtype=object)[cols.gender[positions]] != GENDER_NEUTRAL
+        self.open_seat = self.seat_type == OPEN
+
+        institute = cols.institute[positions]
+        self.institute_state = index.institute_state[institute]
+
+        # program = (institute, program name); codes 0..n_programs-1
+        pairs = institute.astype(np.int64) * (len(strings["program"]) + 1) + cols.program[positions]
+        keys, self.program = np.unique(pairs, return_inverse=True)
+        self.program = self.program.astype(np.int32)
+        self.n_programs = len(keys)
+        self.program_names = [None] * self.n_programs
+        for b, p in enumerate(self.program.tolist()):
+            if self.program_names[p] is None:
+                pos = positions[b]
+                self.program_names[p] = (
+                    strings["institute"][cols.institute[pos]],
+                    strings["program"][cols.program[pos]],
+                )
+
+        # desirability: best OPEN / gender-neutral closing rank of the program
+        reference = np.full(self.n_programs, np.iinfo(np.int64).max)
+        general = self.open_seat & ~self.female_only
+        np.minimum.at(reference, self.program[general], self.closing_rank[general])
+        fallback = np.full(self.n_programs, np.iinfo(np.int64).max)
+        np.minimum.at(fallback, self.program, self.closing_rank)
+        self.reference_rank = np.where(reference == np.iinfo(np.int64).max, fallback, reference)
+
+        self._tables = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    @classmethod
+    def from_index(cls, index, year, round_no, program_seats=DEFAULT_PROGRAM_SEATS, seats=None):
+        """
+        Buckets for (year, round_no). `seats` maps Cutoff id -> seat count
+        and overrides the inferred capacity for those rows.
+        """
+        positions = np.concatenate([
+            np.arange(g.start, g.end) for key, g in index.groups.items()
+            if key[0] == year and key[1] == round_no
+        ] or [np.empty(0, dtype=np.int64)])
+
+        institute_names = index.columns.strings["institute"]
+        not_iit = np.array([not _is_iit(name) for name in institute_names], dtype=bool)
+        positions = positions[not_iit[index.columns.institute[positions]]]
+
+        buckets = cls(index, positions, np.zeros(len(positions), dtype=np.int32))
+        buckets.capacity = buckets.infer_capacity(program_seats)
+        if seats:
+            override = np.array([seats.get(int(i), -1) for i in buckets.cutoff_id])
+            buckets.capacity = np.where(override >= 0, override, buckets.capacity).astype(np.int32)
+        return buckets
+
+    def infer_capacity(self, program_seats):
+        share = np.array([RESERVATION_SHARE.get(s, 0.05) for s in self.seat_type])
+        share = share * np.where(self.female_only, FEMALE_SEAT_SHARE, 1.0)
+        split = np.isin(self.quota, [HOME_STATE_QUOTA, OTHER_STATE_QUOTA])
+        share = share * np.where(split, HOME_STATE_SHARE, 1.0)
+        return np.maximum(np.rint(program_seats * share), 1).astype(np.int32)
+
+    # -- preference expansion -------------------------------------------
+
+    def eligible(self, category, female, home_state):
+        """
+        Bool mask of buckets a student type may take.
+        """
+        mask = self.open_seat | (self.seat_type == category)
+        if not female:
+            mask &= ~self.female_only
+
+        home = self.institute_state == home_state
+        quota_ok = ~np.isin(self.quota, [HOME_STATE_QUOTA, OTHER_STATE_QUOTA, *STATE_QUOTAS])
+        quota_ok |= (self.quota == HOME_STATE_QUOTA) & home
+        quota_ok |= (self.quota == OTHER_STATE_QUOTA) & ~home & (self.institute_state != "")
+        for quota, state in STATE_QUOTAS.items():
+            if home_state == state:
+                quota_ok |= self.quota == quota
+        return mask & quota_ok
+
+    def table(self, types):
+        """
+        (programs, len(types), slots) int32 bucket ids, -1 padded. For each
+        program and student type, the buckets the type may take in the
+        order JoSAA tries them: state quotas before AI, OPEN before the
+        category seat, gender-neutral before female-only.
+        """
+        key = tuple(types)
+        if key in self._tables:
+            return self._tables[key]
+
+        home_quota = np.isin(self.quota, [HOME_STATE_QUOTA, *STATE_QUOTAS])
+        order_key = (
+            (~home_quota).astype(np.int64) * 4
+            + (~self.open_seat).astype(np.int64) * 2
+            + self.female_only.astype(np.int64)
+        )
+
+        per_type = []
+        slots = 1
+        for category, female, home_state in types:
+            idx = np.flatnonzero(self.eligible(category, female, home_state))
+            idx = idx[np.lexsort((order_key[idx], self.program[idx]))]
+            programs = self.program[idx]
+            run_start = np.flatnonzero(np.r_[True, programs[1:] != programs[:-1]])
+            run_of = np.repeat(run_start, np.diff(np.r_[run_start, len(idx)]))
+            slot = np.arange(len(idx)) - run_of
+            slots = max(slots, int(slot.max()) + 1 if len(slot) else 1)
+            per_type.append((programs, slot, idx))
+
+        table = np.full((self.n_programs, len(types), slots), -1, dtype=np.int32)
+        for t, (programs, slot, idx) in enumerate(per_type):
+            table[programs, t, slot] = idx
+
+        self._tables[key] = table
+        return table
+
+
+class Cohort:
+    """
+    Students in rank order, with array-backed preference lists.
+    """
+
+    def __init__(self, rank, category, female, home_state, preferences):
+        order = np.argsort(rank, kind="stable")
+        self.rank = np.asarray(rank, dtype=np.int64)[order]
+        self.category = np.asarray(category, dtype=object)[order]
+        self.female = np.asarray(female, dtype=bool)[order]
+        self.home_state = np.asarray(home_state, dtype=object)[order]
+        self.preferences = np.asarray(preferences, dtype=np.int32)[order]
+
+        # category rank: position in the CRL order among the same category
+        self.category_rank = np.zeros(len(self.rank), dtype=np.int64)
+        for category in np.unique(self.category):
+            members = np.flatnonzero(self.category == category)
+            self.category_rank[members] = np.arange(1, len(members) + 1)
+
+        # student types, for the bucket lookup table
+        type_keys = list(zip(self.category.tolist(), self.female.tolist(), self.home_state.tolist()))
+        self.types = sorted(set(type_keys))
+        type_code = {t: i for i, t in enumerate(self.types)}
+        self.type = np.array([type_code[t] for t in type_keys], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.rank)
+
+    @classmethod
+    def synthetic(cls, buckets, size, choices=DEFAULT_CHOICES, seed=None):
+        """
+        A cohort of `size` students with CRL ranks 1..size. Each student
+        lists programs around their reach, most desirable first: targets
+        scatter log-normally around the rank (category students reach
+        further through reserved seats), snap to the program with the
+        nearest reference closing rank, and are ordered by that rank with
+        a little per-student noise.
+        """
+        rng = np.random.default_rng(seed)
+        rank = np.arange(1, size + 1)
+        category = rng.choice(
+            CATEGORIES, size=size, p=[COHORT_CATEGORY_SHARE[c] for c in CATEGORIES]
+        ).astype(object)
+        female = rng.random(size) < COHORT_FEMALE_SHARE
+        home_state = rng.choice(np.array(STATES, dtype=object), size=size)
+
+        # a reserved-category student competes for seats about as well as
+        # an OPEN student at (category rank x OPEN share / category share)
+        reach = rank.astype(np.float64)
+        for c in CATEGORIES[1:]:
+            members = np.flatnonzero(category == c)
+            equivalent = np.arange(1, len(members) + 1) * RESERVATION_SHARE[OPEN] / RESERVATION_SHARE[c]
+            reach[members] = np.minimum(reach[members], equivalent)
+
+        order = np.argsort(buckets.reference_rank, kind="stable")
+        reference = buckets.reference_rank[order]
+
+        targets = reach[:, None] * np.exp(rng.normal(0.3, 0.6, size=(size, choices)))
+        picks = np.clip(np.searchsorted(reference, targets), 0, len(order) - 1)
+        programs = order[picks].astype(np.int32)
+
+        # drop repeated programs, then order by desirability with noise
+        programs.sort(axis=1)
+        repeated = np.zeros_like(programs, dtype=bool)
+        repeated[:, 1:] = programs[:, 1:] == programs[:, :-1]
+        key = np.log(buckets.reference_rank[programs].astype(np.float64))
+        key += rng.normal(0.0, 0.15, size=key.shape)
+        key[repeated] = np.inf
+        programs[repeated] = -1
+        preferences = np.take_along_axis(programs, np.argsort(key, axis=1), axis=1)
+
+        return cls(rank, category, female, home_state, preferences)
+
+    @classmethod
+    def from_csv(cls, path, buckets):
+        """
+        Read rank, category, gender, home_state, preferences columns.
+        preferences is "Institute :: Program; Institute :: Program; ...",
+        most preferred first; programs not in the buckets are ignored.
+        """
+        df = pd.read_csv(path, dtype=str).fillna("")
+        df.columns = [str(c).strip().lower() for c in df.columns]
+
+        code = {names: p for p, names in enumerate(buckets.program_names)}
+        lists = [
+            [code[key] for key in (tuple(part.split(" :: ", 1)) for part in prefs.split(";")) if key in code]
+            for prefs in (p.strip() for p in df["preferences"])
+        ]
+        width = max((len(prefs) for prefs in lists), default=1) or 1
+        preferences = np.full((len(lists), width), -1, dtype=np.int32)
+        for i, prefs in enumerate(lists):
+            preferences[i, :len(prefs)] = prefs
+
+        return cls(
+            rank=pd.to_numeric(df["rank"], errors="coerce").fillna(np.iinfo(np.int32).max).astype(np.int64),
+            category=np.array([canonical_seat_type(c, OPEN) for c in df["category"]], dtype=object),
+            female=np.array([canonical_gender(g) == FEMALE_ONLY for g in df["gender"]], dtype=bool),
+            home_state=np.array([canonical_state(s) for s in df["home_state"]], dtype=object),
+            preferences=preferences,
+        )
+
+
+def allocate(buckets, cohort, chunk=ALLOCATION_CHUNK):
+    """
+    Bucket index per student (-1 = unallocated), deferred-acceptance
+    result computed over the rank-ordered queue.
+    """
+    n = len(cohort)
+    remaining = buckets.capacity.astype(np.int64).copy()
+    assigned = np.full(n, -1, dtype=np.int32)
+    if not len(buckets) or not n:
+        return assigned
+
+    table = buckets.table(cohort.types)
+    # pad column so -1 preferences / slots look up a "no bucket" entry
+    remaining = np.append(remaining, 0)
+
+    start = 0
+    while start < n:
+        stop = min(n, start + chunk)
+        prefs = cohort.preferences[start:stop]
+        types = cohort.type[start:stop]
+
+        candidates = table[np.maximum(prefs, 0), types[:, None], :]
+        candidates[prefs < 0] = -1
+        candidates = candidates.reshape(len(prefs), -1)
+
+        available = remaining[candidates] > 0
+        has_seat = available.any(axis=1)
+        choice = np.where(has_seat, candidates[np.arange(len(prefs)), available.argmax(axis=1)], -1)
+
+        # the k-th student in the chunk asking for a bucket gets it only if
+        # it has more than k seats left
+        takers = np.flatnonzero(choice >= 0)
+        by_bucket = takers[np.argsort(choice[takers], kind="stable")]
+        sorted_choice = choice[by_bucket]
+        first = np.r_[True, sorted_choice[1:] != sorted_choice[:-1]]
+        run_start = np.flatnonzero(first)
+        occurrence = np.arange(len(by_bucket)) - np.repeat(run_start, np.diff(np.r_[run_start, len(by_bucket)]))
+        rejected = by_bucket[occurrence >= remaining[sorted_choice]]
+
+        accept = int(rejected.min()) if len(rejected) else len(prefs)
+        accepted = choice[:accept]
+        assigned[start:start + accept] = accepted
+        np.subtract.at(remaining, accepted[accepted >= 0], 1)
+
+        start += accept
+        chunk = chunk * 2 if accept == len(prefs) else max(64, chunk // 2)
+
+    return assigned
+
+
+def closing_ranks(buckets, cohort, assigned):
+    """
+    (opening, closing, filled) per bucket; opening/closing are 0 where no
+    seat was filled. Ranks are CRL for OPEN seats and category rank for
+    reserved seats, as JoSAA publishes them.
+    """
+    taken = np.flatnonzero(assigned >= 0)
+    bucket = assigned[taken]
+    rank = np.where(buckets.open_seat[bucket], cohort.rank[taken], cohort.category_rank[taken])
+
+    filled = np.bincount(bucket, minlength=len(buckets))
+    closing = np.zeros(len(buckets), dtype=np.int64)
+    np.maximum.at(closing, bucket, rank)
+    opening = np.full(len(buckets), np.iinfo(np.int64).max)
+    np.minimum.at(opening, bucket, rank)
+    opening[filled == 0] = 0
+    return opening, closing, filled
+
+
+def simulate(buckets, cohort):
+    assigned = allocate(buckets, cohort)
+    opening, closing, filled = closing_ranks(buckets, cohort, assigned)
+    return SimulationResult(assigned, opening, closing, filled)
+
+
+def simulate_synthetic(buckets, size, choices=DEFAULT_CHOICES, seed=None):
+    """
+    One Monte Carlo run on a fresh synthetic cohort. Returns the closing
+    rank per bucket as float, NaN where the bucket stayed empty. Top-level
+    so it can run in a process pool.
+    """
+    cohort = Cohort.synthetic(buckets, size, choices=choices, seed=seed)
+    result = simulate(buckets, cohort)
+    return np.where(result.filled > 0, result.closing, np.nan)
+
+
+def load_seats(path):
+    """
+    {cutoff id: seats} from a CSV with cutoff_id and seats columns.
+    """
+    with open(path, newline="") as fh:
+        return {int(row["cutoff_id"]): int(row["seats"]) for row in csv.DictReader(fh)}
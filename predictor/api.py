@@ -0,0 +1,224 @@
+"""
+JSON prediction API for counselling partners.
+
+POST /api/predict/ with either one student object, a list of students, or
+{"students": [...]}. Each student has marks or rank, plus optional
+category, gender, quota, home_state, year and round.
+
+The response lists each program once in a "programs" table and refers to
+it by id from every student's result. Large batches (or ?stream=1) come
+back as NDJSON instead: a {"program": ...} line the first time a program
+appears, then one {"result": ...} line per student in input order.
+
+GET /api/search/?q=nit trichy cse searches programs and institutes by
+name (typos and prefixes allowed); see search.py.
+
+GET /metrics serves this worker's request histograms (metrics.py) and
+result cache counters in the Prometheus text format, to staff or holders
+of METRICS_TOKEN; GET /profile/ (staff)
+samples this worker's stacks (profiler.py).
+"""
+import json
+import math
+
+import numpy as np
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from . import services
+from .codes import canonical_seat_type
+from .cutoff_index import get_cutoff_index
+from .metrics import metrics_access_required, registry
+from .profiler import DEFAULT_INTERVAL, MAX_SECONDS, capture
+from .result_cache import result_cache
+from .search import MAX_SEARCH_LIMIT, SEARCH_LIMIT, get_search_index
+
+
+# batches larger than this are streamed as NDJSON
+API_STREAM_THRESHOLD = 10000
+API_MAX_STUDENTS = 200000
+# about 100 bytes per student, with room for long labels
+API_MAX_BODY_BYTES = 64 * 2 ** 20
+
+
+def programs_json(index, positions):
+    """
+    The "programs" entry of each row position, gathered column by column.
+    """
+    cols, strings = index.columns, index.columns.strings
+    positions = np.asarray(positions, dtype=np.int64)
+    return [
+        {
+            "id": row_id,
+            "institute": strings["institute"][institute],
+            "program": strings["program"][program],
+            "quota": strings["quota"][quota],
+            "seat_type": strings["seat_type"][seat_type],
+            "gender": strings["gender"][gender],
+            "opening_rank": opening_rank,
+            "closing_rank": closing_rank,
+        }
+        for row_id, institute, program, quota, seat_type, gender, opening_rank, closing_rank in zip(
+            cols.id[positions].tolist(),
+            cols.institute[positions].tolist(),
+            cols.program[positions].tolist(),
+            cols.quota[positions].tolist(),
+            cols.seat_type[positions].tolist(),
+            cols.gender[positions].tolist(),
+            cols.opening_rank[positions].tolist(),
+            cols.closing_rank[positions].tolist(),
+        )
+    ]
+
+
+def _ndjson_chunk(index, chunk, seen):
+    # programs not sent yet, each just before the first result using it
+    new, counts = [], []
+    for _, positions in chunk:
+        fresh = [pos for pos in positions.tolist() if pos not in seen]
+        seen.update(fresh)
+        new += fresh
+        counts.append(len(fresh))
+    programs = iter(programs_json(index, new))
+    lines = []
+    for (result, _), count in zip(chunk, counts):
+        lines += [json.dumps({"program": next(programs)}) for _ in range(count)]
+        lines.append(json.dumps({"result": result}))
+    return "\n".join(lines) + "\n"
+
+
+def _ndjson_lines(students):
+    index = get_cutoff_index()
+    seen = set()
+    chunk = []
+    for item in services.predict_batch(students, index=index):
+        chunk.append(item)
+        if len(chunk) == services.BATCH_CHUNK:
+            yield _ndjson_chunk(index, chunk, seen)
+            chunk = []
+    if chunk:
+        yield _ndjson_chunk(index, chunk, seen)
+
+
+@csrf_exempt
+@require_POST
+def predict_api(request):
+    # read as a stream: request.body would cap batches at
+    # DATA_UPLOAD_MAX_MEMORY_SIZE (2.5 MB, about 25k students)
+    body = request.read(API_MAX_BODY_BYTES + 1)
+    if len(body) > API_MAX_BODY_BYTES:
+        return JsonResponse({"error": f"Request body is larger than {API_MAX_BODY_BYTES} bytes."}, status=413)
+    try:
+        payload = json.loads(body or b"null")
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({"error": "Request body must be valid JSON."}, status=400)
+
+    if isinstance(payload, dict) and "students" in payload:
+        students = payload["students"]
+    elif isinstance(payload, dict):
+        students = [payload]
+    else:
+        students = payload
+
+    if not isinstance(students, list) or not students:
+        return JsonResponse({"error": "Send a student object or a non-empty list of students."}, status=400)
+    if len(students) > API_MAX_STUDENTS:
+        return JsonResponse({"error": f"At most {API_MAX_STUDENTS} students per request."}, status=400)
+
+    if request.GET.get("stream") == "1" or len(students) > API_STREAM_THRESHOLD:
+        return StreamingHttpResponse(_ndjson_lines(students), content_type="application/x-ndjson")
+
+    index = get_cutoff_index()
+    results, matched = [], []
+    for result, positions in services.predict_batch(students, index=index):
+        results.append(result)
+        matched.append(positions)
+    # every program once, in order of first appearance
+    positions, first = np.unique(np.concatenate(matched), return_index=True)
+    programs = {p["id"]: p for p in programs_json(index, positions[np.argsort(first)])}
+
+    return JsonResponse({"programs": programs, "results": results})
+
+
+@require_GET
+def search_api(request):
+    """
+    Programs whose institute or program name matches `q`, best first.
+    Optional filters: type (IIT/NIT/IIIT/GFTI) and category (seat type).
+    """
+    query = request.GET.get("q", "").strip()
+    institute_type = request.GET.get("type", "").strip().upper()
+    category = request.GET.get("category", "").strip()
+    category = canonical_seat_type(category) or category
+    limit = request.GET.get("limit", "")
+    limit = min(int(limit), MAX_SEARCH_LIMIT) if limit.isdigit() and int(limit) > 0 else SEARCH_LIMIT
+
+    if not query:
+        return JsonResponse({"error": "Send a search query as ?q=."}, status=400)
+
+    search_index = get_search_index()
+    if institute_type and institute_type not in search_index.type_names:
+        return JsonResponse({"error": "type is not a known institute type."}, status=400)
+    if category and category not in search_index.seat_types:
+        return JsonResponse({"error": "category is not a known seat type."}, status=400)
+
+    results = [
+        {
+            "institute": search_index.institutes[institute],
+            "program": search_index.programs[program],
+            "institute_type": search_index.institute_types[institute],
+            "state": search_index.institute_states[institute],
+            "score": round(score, 3),
+        }
+        for institute, program, score in search_index.search(query, institute_type, category, limit)
+    ]
+    return JsonResponse({"query": query, "results": results})
+
+
+@metrics_access_required
+def cache_stats(request):
+    """
+    Hit/miss counters of this worker's prediction result cache.
+    """
+    return JsonResponse(result_cache.snapshot())
+
+
+@metrics_access_required
+def metrics(request):
+    """
+    Prometheus text exposition of this worker's request metrics.
+    """
+    stats = result_cache.snapshot()
+    extra = ["# HELP predictor_result_cache_lookups_total Prediction result cache lookups.",
+             "# TYPE predictor_result_cache_lookups_total counter"]
+    for result in ("lru_hits", "shared_hits", "misses"):
+        extra.append(f'predictor_result_cache_lookups_total{{result="{result}"}} {stats[result]}')
+    return HttpResponse(
+        registry.exposition(extra), content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@staff_member_required
+@require_GET
+def profile_worker(request):
+    """
+    Sample this worker's stacks for ?seconds= (default 5) at ?interval= ms
+    and return the capture summary; the collapsed stacks are written to
+    PROFILE_DIR.
+    """
+    try:
+        seconds = float(request.GET.get("seconds", 5))
+        interval = float(request.GET.get("interval", DEFAULT_INTERVAL * 1000)) / 1000
+    except ValueError:
+        return JsonResponse({"error": "seconds and interval must be numbers."}, status=400)
+    # float() also accepts "nan" and "inf", which time.sleep() rejects
+    if not (math.isfinite(seconds) and math.isfinite(interval)) or seconds <= 0 or interval <= 0:
+        return JsonResponse({"error": "seconds and interval must be positive numbers."}, status=400)
+    seconds = min(seconds, MAX_SECONDS)
+
+    summary = capture(seconds, interval)
+    if summary is None:
+        return JsonResponse({"error": "A capture is already running in this worker."}, status=409)
+    return JsonResponse(summary)
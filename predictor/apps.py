@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class PredictorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'predictor'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .profiler import install_signal_handler
+
+        install_signal_handler()
@@ -0,0 +1,21 @@
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class BatchedCullFileCache(FileBasedCache):
+    """
+    FileBasedCache lists the whole cache directory on every set() to decide
+    whether to cull, which makes filling tens of thousands of entries
+    (warm_prediction_cache) quadratic. Only check every `cull_every` writes.
+    """
+
+    cull_every = 500
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._writes = 0
+
+    def _cull(self):
+        self._writes += 1
+        if self._writes % self.cull_every:
+            return
+        super()._cull()
@@ -0,0 +1,117 @@
+"""
+Canonical gender, seat type and quota labels.
+
+JoSAA workbooks, the cleaned CSV, the HTML forms and API clients all spell
+these a little differently ("Female-only including Supernumerary" vs
+"Female-only (including Supernumerary)", "GEN-EWS" vs "EWS", "All India"
+vs "AI"), and a spelling that does not match the data silently returns no
+programs. Every label is translated through the tables below on the way
+in: at import (ingest.py, load_sample_cutoffs), when the snapshot is built,
+and in the views and API.
+
+A label's position in its table is its code. The snapshot dictionary-
+encodes these columns in table order, so e.g. gender code 1 is
+Female-only in every data version; labels outside the table are kept and
+get the codes after it.
+"""
+import re
+from functools import lru_cache
+
+
+GENDER_NEUTRAL = "Gender-Neutral"
+FEMALE_ONLY = "Female-only (including Supernumerary)"
+GENDERS = [GENDER_NEUTRAL, FEMALE_ONLY]
+
+OPEN = "OPEN"
+# the categories a student picks in the forms
+CATEGORIES = [OPEN, "EWS", "OBC-NCL", "SC", "ST"]
+SEAT_TYPES = CATEGORIES + [f"{c} (PwD)" for c in CATEGORIES]
+
+QUOTAS = ["AI", "HS", "OS", "GO", "JK", "LA"]
+
+TABLES = {
+    "gender": GENDERS,
+    "seat_type": SEAT_TYPES,
+    "quota": QUOTAS,
+}
+
+# other spellings, as match keys (see _key) -> canonical label
+ALIASES = {
+    "gender": {
+        "neutral": GENDER_NEUTRAL,
+        "male": GENDER_NEUTRAL,
+        "m": GENDER_NEUTRAL,
+        "female": FEMALE_ONLY,
+        "f": FEMALE_ONLY,
+        "femaleonly": FEMALE_ONLY,
+        "femaleonlysupernumerary": FEMALE_ONLY,
+    },
+    "seat_type": {
+        "gen": OPEN,
+        "general": OPEN,
+        "genews": "EWS",
+        "genewspwd": "EWS (PwD)",
+        "generalpwd": "OPEN (PwD)",
+        "obc": "OBC-NCL",
+        "obcpwd": "OBC-NCL (PwD)",
+    },
+    "quota": {
+        "allindia": "AI",
+        "homestate": "HS",
+        "otherstate": "OS",
+        "goa": "GO",
+        "jammuandkashmir": "JK",
+        "ladakh": "LA",
+    },
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def _key(value):
+    """
+    Match key: lower case, punctuation and spaces dropped, so "OPEN-PwD",
+    "open (pwd)" and "OPEN (PwD)" compare equal.
+    """
+    return _NON_ALNUM.sub("", str(value or "").lower())
+
+
+_LOOKUP = {
+    name: {**{_key(label): label for label in table}, **ALIASES[name]}
+    for name, table in TABLES.items()
+}
+
+
+@lru_cache(maxsize=4096)
+def _canonical(name, value):
+    return _LOOKUP[name].get(_key(value), "")
+
+
+def canonical(name, value, default=""):
+    """
+    Canonical spelling of a `name` ("gender", "seat_type" or "quota")
+    label, or `default` when it is not recognised.
+    """
+    return _canonical(name, str(value or "")) or default
+
+
+def canonical_gender(value, default=""):
+    return canonical("gender", value, default)
+
+
+def canonical_seat_type(value, default=""):
+    return canonical("seat_type", value, default)
+
+
+def canonical_quota(value, default=""):
+    return canonical("quota", value, default)
+
+
+def code_table(name, labels):
+    """
+    Canonical spellings of `labels`, plus the string table they encode
+    into: TABLES[name] first, then any unrecognised labels in sorted order.
+    """
+    labels = [canonical(name, label) or str(label) for label in labels]
+    extras = sorted(set(labels) - set(TABLES[name]))
+    return labels, TABLES[name] + extras
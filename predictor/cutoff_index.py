@@ -0,0 +1,603 @@
+"""
+In-memory cutoff index used by the predictor views.
+
+The index sits on top of CutoffColumns (see snapshot.py): every Cutoff row
+as sorted, dictionary-encoded NumPy columns, so each
+(year, round, quota, seat_type, gender) group is one contiguous range
+ordered by closing rank. "Which programs overlap [min_rank, max_rank]" is
+two searchsorted calls plus a vectorised check of the rows closing after
+max_rank, instead of a database range query. Lookups hit one group through
+a dict, so their cost does not grow with the number of years or rounds.
+
+Results are row positions; CutoffRow tuples are only built for the rows a
+page actually shows. Positions are stable for one data version.
+
+Long result lists are paged with a keyset cursor on (closing_rank, id),
+the order every group is already sorted in: the next page starts with one
+searchsorted past the cursor, however deep the page is.
+
+The columns come from the mmapped snapshot (settings.CUTOFF_SNAPSHOT_FILE)
+when it matches the current data version, so all gunicorn workers share
+one copy of the pages; otherwise from one joined database query.
+
+The index is rebuilt lazily whenever the cutoff data version changes.
+The version lives in a small stamp file (settings.CUTOFF_DATA_VERSION_FILE)
+that the loaders bump after writing, so every gunicorn worker notices a
+reload on its next request without asking the database.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+
+from .codes import canonical
+from .institute_states import HOME_STATE_QUOTA, OTHER_STATE_QUOTA, STATE_QUOTAS
+from .models import Cutoff
+from .snapshot import CutoffColumns, open_snapshot
+
+
+CutoffRow = namedtuple(
+    "CutoffRow",
+    [
+        "id",
+        "institute_name",
+        "program_name",
+        "quota",
+        "seat_type",
+        "gender",
+        "opening_rank",
+        "closing_rank",
+        "year",
+        "round",
+        # ((year, closing_rank), ...) for the same program/slice/round
+        "history",
+        # row position in the index's columns (valid for one data version)
+        "position",
+        # admission chance (0..1) and its label, set by the scoring engine
+        "probability",
+        "chance",
+    ],
+    defaults=[(), None, None, None],
+)
+
+
+# ---------------------------------------------------------------------------
+# Data version stamp
+# ---------------------------------------------------------------------------
+
+_version_lock = threading.Lock()
+_version_mtime = None
+_version_value = "0"
+
+
+def _version_file():
+    return getattr(
+        settings,
+        "CUTOFF_DATA_VERSION_FILE",
+        os.path.join(settings.BASE_DIR, ".cutoff_version"),
+    )
+
+
+def data_version():
+    """
+    Return the current cutoff data version (a string).
+    Only a stat() per call; the file is re-read when its mtime changes.
+    """
+    global _version_mtime, _version_value
+
+    path = _version_file()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return "0"
+
+    if mtime != _version_mtime:
+        with _version_lock:
+            try:
+                with open(path) as fh:
+                    _version_value = fh.read().strip() or "0"
+            except FileNotFoundError:
+                return "0"
+            _version_mtime = mtime
+
+    return _version_value
+
+
+def new_data_version():
+    return str(time.time_ns())
+
+
+def bump_data_version(version=None):
+    """
+    Mark the cutoff data as changed (optionally to a version whose snapshot
+    was already written). Called by the loaders after import; every worker
+    rebuilds its index on the next request.
+    """
+    version = version or new_data_version()
+    path = _version_file()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as fh:
+        fh.write(version)
+    os.replace(tmp_path, path)
+
+    invalidate_cutoff_index()
+    return version
+
+
+# ---------------------------------------------------------------------------
+# Keyset cursors
+# ---------------------------------------------------------------------------
+
+def make_cursor(closing_rank, row_id):
+    return f"{int(closing_rank)}_{int(row_id)}"
+
+
+def parse_cursor(value):
+    """
+    (closing_rank, id) from a cursor string, or None if absent/malformed.
+    """
+    closing, _, row_id = str(value or "").partition("_")
+    if not (closing.isdigit() and row_id.isdigit()):
+        return None
+    return int(closing), int(row_id)
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+# tails up to this many rows are scanned outright (tens of microseconds);
+# longer ones go through _MinTree, whose cost does not grow with the tail
+TAIL_SCAN_ROWS = 2 ** 16
+
+
+class _MinTree:
+    """
+    Minimums of opening_rank over blocks of FANOUT rows, blocks of FANOUT
+    blocks, and so on. at_most() descends only into blocks holding a
+    match, so a lookup costs O(log n + k) rather than a scan of the range.
+    """
+
+    FANOUT = 64
+
+    def __init__(self, values):
+        self.levels = [np.asarray(values)]
+        while len(self.levels[-1]) > self.FANOUT:
+            below = self.levels[-1]
+            padded = np.append(below, np.full(-len(below) % self.FANOUT, np.iinfo(below.dtype).max, below.dtype))
+            self.levels.append(padded.reshape(-1, self.FANOUT).min(axis=1))
+        self._children = np.arange(self.FANOUT)
+
+    def at_most(self, lo, hi, x, limit=None):
+        """
+        Positions p in [lo, hi) with values[p] <= x, ascending; only the
+        first `limit` when given.
+        """
+        if lo >= hi:
+            return np.empty(0, dtype=np.int64)
+        span = self.FANOUT ** (len(self.levels) - 1)
+        nodes = np.arange(lo // span, (hi - 1) // span + 1)
+        for level in reversed(self.levels):
+            nodes = nodes[level[nodes] <= x]
+            if span == 1:
+                return nodes[:limit] if limit is not None else nodes
+            # every kept block holds a match, except possibly the two cut
+            # by lo / hi, so the first limit + 2 blocks hold the first
+            # `limit` matches
+            if limit is not None:
+                nodes = nodes[:limit + 2]
+            span //= self.FANOUT
+            nodes = (nodes[:, None] * self.FANOUT + self._children).ravel()
+            nodes = nodes[(nodes >= lo // span) & (nodes <= (hi - 1) // span)]
+
+
+class _Group:
+    """
+    One (year, round, quota, seat_type, gender) key: rows [start, end) of
+    the columns, already sorted by (closing_rank, id).
+    """
+
+    __slots__ = ("start", "end", "closing", "opening", "ids", "opening_tree")
+
+    def __init__(self, columns, start, end, opening_tree):
+        self.start = start
+        self.end = end
+        self.closing = columns.closing_rank[start:end]
+        self.opening = columns.opening_rank[start:end]
+        self.ids = columns.id[start:end]
+        self.opening_tree = opening_tree
+
+    def __len__(self):
+        return self.end - self.start
+
+    def offset_after(self, cursor):
+        """
+        Group-relative index of the first row after a (closing_rank, id)
+        cursor; 0 without one.
+        """
+        if cursor is None:
+            return 0
+        closing, row_id = cursor
+        lo = int(np.searchsorted(self.closing, closing, side="left"))
+        hi = int(np.searchsorted(self.closing, closing, side="right"))
+        # ties on closing_rank are in id order
+        return lo + int(np.searchsorted(self.ids[lo:hi], row_id, side="right"))
+
+    def overlapping(self, min_rank, max_rank, limit=None, after=None):
+        """
+        Positions of rows overlapping [min_rank, max_rank], in closing order,
+        starting after the `after` cursor.
+        """
+        # first row whose band ends at or after min_rank
+        start = max(
+            int(np.searchsorted(self.closing, min_rank, side="left")),
+            self.offset_after(after),
+        )
+        # rows closing inside [min_rank, max_rank] overlap outright,
+        # because opening_rank <= closing_rank <= max_rank
+        inside_end = max(start, int(np.searchsorted(self.closing, max_rank, side="right")))
+
+        inside = np.arange(self.start + start, self.start + inside_end)
+        if limit is not None and len(inside) >= limit:
+            return inside[:limit]
+
+        # rows closing after max_rank overlap only if they open by max_rank;
+        # a short tail is cheaper to scan than to walk the block tree
+        if len(self) - inside_end <= TAIL_SCAN_ROWS:
+            tail = np.flatnonzero(self.opening[inside_end:] <= max_rank) + self.start + inside_end
+            result = np.concatenate([inside, tail])
+            return result[:limit] if limit is not None else result
+        tail = self.opening_tree.at_most(
+            self.start + inside_end, self.end, max_rank,
+            limit - len(inside) if limit is not None else None,
+        )
+        return np.concatenate([inside, tail])
+
+
+class CutoffIndex:
+    """
+    Read-only view of the Cutoff table, grouped for range lookups.
+    """
+
+    def __init__(self, columns, version=None):
+        self.columns = columns
+        self.version = columns.version if version is None else version
+        self.size = len(columns)
+
+        # label -> code of each coded column; groups are keyed by codes
+        self.label_codes = {
+            name: {label: code for code, label in enumerate(columns.strings.get(name, []))}
+            for name in ("quota", "seat_type", "gender")
+        }
+
+        # rows are sorted by the group key, so groups start where it changes
+        key_cols = [columns.year, columns.round, columns.quota, columns.seat_type, columns.gender]
+        if self.size:
+            changed = np.zeros(self.size, dtype=bool)
+            changed[0] = True
+            for col in key_cols:
+                changed[1:] |= col[1:] != col[:-1]
+            starts = np.flatnonzero(changed)
+        else:
+            starts = np.empty(0, dtype=np.int64)
+        ends = np.append(starts[1:], self.size)
+
+        self.groups = {}
+        opening_tree = _MinTree(columns.opening_rank)
+        rounds = {}
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            year, round_no = int(columns.year[start]), int(columns.round[start])
+            key = (
+                year,
+                round_no,
+                int(columns.quota[start]),
+                int(columns.seat_type[start]),
+                int(columns.gender[start]),
+            )
+            self.groups[key] = _Group(columns, start, end, opening_tree)
+            rounds.setdefault(year, set()).add(round_no)
+
+        self.rounds = {year: sorted(r) for year, r in rounds.items()}
+
+        # each institute's state, parallel to the institute string table
+        institute_names = columns.strings.get("institute", [])
+        self.institute_state = np.array(
+            columns.strings.get("institute_state") or [""] * len(institute_names), dtype=object
+        )
+        self._state_masks = {}
+
+    @classmethod
+    def build(cls, version="0"):
+        """
+        Index over the shared snapshot when it is current, else the database.
+        """
+        path = snapshot_file()
+        if os.path.exists(path):
+            try:
+                columns = open_snapshot(path)
+            except (OSError, ValueError, KeyError):
+                columns = None
+            if columns is not None and columns.version == version:
+                return cls(columns)
+
+        return cls(CutoffColumns.from_database(version=version))
+
+    def years(self):
+        """
+        Years with cutoff data, newest first.
+        """
+        return sorted(self.rounds, reverse=True)
+
+    def latest_round(self, year):
+        """
+        Latest JoSAA round loaded for `year`; CSAB only when it is all we have.
+        """
+        rounds = self.rounds.get(year, [])
+        josaa = [r for r in rounds if r <= Cutoff.FINAL_JOSAA_ROUND]
+        if josaa:
+            return josaa[-1]
+        return rounds[-1] if rounds else Cutoff.FINAL_JOSAA_ROUND
+
+    # -- rows -------------------------------------------------------------
+
+    def history(self, pos):
+        """
+        ((year, closing_rank), ...) of the same program/slice/round, or ()
+        when only one year is loaded.
+        """
+        cols = self.columns
+        key = cols.history_key[pos]
+        members = cols.history_order[cols.history_start[key]:cols.history_start[key + 1]]
+        if len(members) < 2:
+            return ()
+        return tuple(zip(cols.year[members].tolist(), cols.closing_rank[members].tolist()))
+
+    def closing_trend(self):
+        """
+        Per-row (mean, std, count) of log(closing_rank) over the same
+        program/slice/round in every loaded year up to and including the
+        row's own. std is 0 where only one year is known. Computed once per
+        index, in one vectorised pass over history_order.
+        """
+        trend = self.__dict__.get("_closing_trend")
+        if trend is not None:
+            return trend
+
+        cols = self.columns
+        order = np.asarray(cols.history_order, dtype=np.int64)
+        log_closing = np.log(np.maximum(cols.closing_rank[order], 1).astype(np.float64))
+
+        # running sums restart at each key's segment of history_order
+        seg_start = np.asarray(cols.history_start, dtype=np.int64)[cols.history_key[order]]
+        total = np.concatenate([[0.0], np.cumsum(log_closing)])
+        total_sq = np.concatenate([[0.0], np.cumsum(log_closing ** 2)])
+        end = np.arange(1, len(order) + 1)
+
+        count = (end - seg_start).astype(np.float64)
+        mean = (total[end] - total[seg_start]) / np.maximum(count, 1)
+        var = (total_sq[end] - total_sq[seg_start]) / np.maximum(count, 1) - mean ** 2
+        std = np.sqrt(np.maximum(var, 0.0) * count / np.maximum(count - 1, 1))
+
+        trend = (np.empty_like(mean), np.empty_like(std), np.empty(len(order), dtype=np.int64))
+        trend[0][order], trend[1][order], trend[2][order] = mean, std, count
+        self._closing_trend = trend
+        return trend
+
+    def row(self, pos):
+        cols, strings = self.columns, self.columns.strings
+        pos = int(pos)
+        return CutoffRow(
+            id=int(cols.id[pos]),
+            institute_name=strings["institute"][cols.institute[pos]],
+            program_name=strings["program"][cols.program[pos]],
+            quota=strings["quota"][cols.quota[pos]],
+            seat_type=strings["seat_type"][cols.seat_type[pos]],
+            gender=strings["gender"][cols.gender[pos]],
+            opening_rank=int(cols.opening_rank[pos]),
+            closing_rank=int(cols.closing_rank[pos]),
+            year=int(cols.year[pos]),
+            round=int(cols.round[pos]),
+            history=self.history(pos),
+            position=pos,
+        )
+
+    def rows(self, positions):
+        return [self.row(pos) for pos in positions]
+
+    # -- quotas -----------------------------------------------------------
+
+    def state_masks(self, state):
+        """
+        (home, other) bool arrays over institute codes for a home state.
+        Institutes with no known state are in neither.
+        """
+        masks = self._state_masks.get(state)
+        if masks is None:
+            home = self.institute_state == state
+            masks = (home, ~home & (self.institute_state != ""))
+            self._state_masks[state] = masks
+        return masks
+
+    def quota_filters(self, quotas, home_state=""):
+        """
+        [(quota, allowed)] for the quotas a student can compete in.
+        `allowed` is None (every institute) or a bool array over institute
+        codes: HS rows count only at home-state institutes and OS rows only
+        at the others; GO/JK/LA are kept only for students from that state.
+        Without a home state all of these are dropped.
+        """
+        if isinstance(quotas, str):
+            quotas = [quotas]
+
+        filters = []
+        for quota in quotas:
+            if quota in (HOME_STATE_QUOTA, OTHER_STATE_QUOTA):
+                if home_state:
+                    home, other = self.state_masks(home_state)
+                    filters.append((quota, home if quota == HOME_STATE_QUOTA else other))
+            elif quota in STATE_QUOTAS:
+                if home_state == STATE_QUOTAS[quota]:
+                    filters.append((quota, None))
+            else:
+                filters.append((quota, None))
+        return filters
+
+    def cursor(self, pos):
+        """
+        Keyset cursor of the row at `pos`.
+        """
+        return make_cursor(self.columns.closing_rank[pos], self.columns.id[pos])
+
+    def after_mask(self, positions, cursor):
+        """
+        Bool mask of the positions that sort strictly after `cursor`.
+        """
+        if cursor is None:
+            return np.ones(len(positions), dtype=bool)
+        closing, row_id = cursor
+        cols = self.columns
+        return (cols.closing_rank[positions] > closing) | (
+            (cols.closing_rank[positions] == closing) & (cols.id[positions] > row_id)
+        )
+
+    def after(self, positions, cursor):
+        """
+        The positions (in (closing_rank, id) order) strictly after `cursor`.
+        """
+        if cursor is None:
+            return positions
+        return positions[self.after_mask(positions, cursor)]
+
+    def filter_institutes(self, positions, allowed):
+        """
+        Keep the positions whose institute is allowed (None keeps all).
+        """
+        if allowed is None:
+            return positions
+        return positions[allowed[self.columns.institute[positions]]]
+
+    # -- lookups ----------------------------------------------------------
+
+    def group_key(self, year, round, quota, seat_type, gender):
+        """
+        Integer key of one (year, round, quota, seat_type, gender) slice.
+        Labels go through the canonical table first, so any accepted
+        spelling finds the slice; None when a label is not in the data.
+        """
+        key = [year, round]
+        for name, label in (("quota", quota), ("seat_type", seat_type), ("gender", gender)):
+            code = self.label_codes[name].get(canonical(name, label) or label)
+            if code is None:
+                return None
+            key.append(code)
+        return tuple(key)
+
+    def slice_groups(self, year, round, quotas, seat_type, gender, home_state=""):
+        """
+        [(group, allowed)] for every quota of the slice that has rows.
+        """
+        groups = [
+            (self.groups.get(self.group_key(year, round, quota, seat_type, gender)), allowed)
+            for quota, allowed in self.quota_filters(quotas, home_state)
+        ]
+        return [(g, allowed) for g, allowed in groups if g is not None]
+
+    def slice_positions(self, year, round, quotas, seat_type, gender, home_state=""):
+        """
+        Every position of the slice, in (closing_rank, id) order.
+        """
+        groups = self.slice_groups(year, round, quotas, seat_type, gender, home_state)
+        if not groups:
+            return np.empty(0, dtype=np.int64)
+
+        positions = np.concatenate([
+            self.filter_institutes(np.arange(g.start, g.end), allowed) for g, allowed in groups
+        ])
+        return self.sort_positions(positions) if len(groups) > 1 else positions
+
+    def sort_positions(self, positions):
+        """
+        Order positions from several groups by (closing_rank, id).
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        order = np.lexsort((self.columns.id[positions], self.columns.closing_rank[positions]))
+        return positions[order]
+
+    def overlapping_positions(self, year, round, quotas, seat_type, gender,
+                              min_rank, max_rank, limit=None, home_state="", after=None):
+        parts = []
+        for group, allowed in self.slice_groups(year, round, quotas, seat_type, gender, home_state):
+            if allowed is None:
+                parts.append(group.overlapping(min_rank, max_rank, limit, after))
+            else:
+                part = self.filter_institutes(group.overlapping(min_rank, max_rank, after=after), allowed)
+                parts.append(part[:limit])
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        if len(parts) == 1:
+            return parts[0]
+
+        merged = self.sort_positions(np.concatenate(parts))
+        return merged[:limit] if limit is not None else merged
+
+    def overlapping(self, year, round, quotas, seat_type, gender, min_rank, max_rank,
+                    limit=None, home_state="", after=None):
+        """
+        Rows whose [opening_rank, closing_rank] overlaps [min_rank, max_rank],
+        ordered by closing_rank like the old `.order_by("closing_rank")` query.
+        """
+        return self.rows(self.overlapping_positions(
+            year, round, quotas, seat_type, gender, min_rank, max_rank, limit, home_state, after,
+        ))
+
+    def containing(self, year, round, quotas, seat_type, gender, rank,
+                   limit=None, home_state="", after=None):
+        """
+        Rows with opening_rank <= rank <= closing_rank.
+        """
+        return self.overlapping(
+            year, round, quotas, seat_type, gender, rank, rank, limit, home_state, after,
+        )
+
+
+def snapshot_file():
+    return getattr(
+        settings,
+        "CUTOFF_SNAPSHOT_FILE",
+        os.path.join(settings.BASE_DIR, "cutoffs.snapshot"),
+    )
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_cutoff_index():
+    """
+    Return this worker's CutoffIndex, building it on first use and
+    rebuilding it (or remapping a newer snapshot) after the data version
+    changes.
+    """
+    global _index
+
+    version = data_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = CutoffIndex.build(version=version)
+        return _index
+
+
+def invalidate_cutoff_index():
+    """
+    Drop this worker's index; the next lookup rebuilds it.
+    """
+    global _index
+    with _index_lock:
+        _index = None
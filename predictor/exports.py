@@ -0,0 +1,87 @@
+"""
+CSV / XLSX downloads of a student's full eligible-program list.
+
+Rows come from services.iter_eligible(), which walks the in-memory index
+one position at a time, so an export never holds more than the current
+row (plus the position array) in memory:
+
+    csv   streamed: a StreamingHttpResponse over a generator, so the
+          header line is sent before any row is formatted
+    xlsx  openpyxl write-only workbook, which spools rows to a temp file
+          instead of keeping cells in memory; an xlsx is a zip whose
+          directory is written last, so the finished file is streamed
+          back from disk
+"""
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+
+
+EXPORT_HEADER = [
+    "Institute", "Program", "Quota", "Seat Type", "Gender",
+    "Opening Rank", "Closing Rank", "Year", "Round", "Closing Rank History",
+]
+CHANCE_HEADER = ["Chance (%)", "Chance"]
+
+# csv rows written per chunk sent to the client
+CSV_CHUNK_ROWS = 500
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def export_values(row, with_chance=False):
+    values = [
+        row.institute_name, row.program_name, row.quota, row.seat_type, row.gender,
+        row.opening_rank, row.closing_rank, row.year, row.round,
+        " · ".join(f"{year}: {closing}" for year, closing in row.history),
+    ]
+    if with_chance:
+        values += [round(row.probability * 100), row.chance]
+    return values
+
+
+class _Echo:
+    """
+    File-like object whose write() hands back the text, for csv.writer.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(rows, with_chance):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_HEADER + (CHANCE_HEADER if with_chance else []))
+
+    chunk = []
+    for row in rows:
+        chunk.append(writer.writerow(export_values(row, with_chance)))
+        if len(chunk) >= CSV_CHUNK_ROWS:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def csv_response(rows, filename, with_chance=False):
+    response = StreamingHttpResponse(_csv_lines(rows, with_chance), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_response(rows, filename, with_chance=False):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Programs")
+    sheet.append(EXPORT_HEADER + (CHANCE_HEADER if with_chance else []))
+    for row in rows:
+        sheet.append(export_values(row, with_chance))
+
+    # deleted when the response closes it
+    fh = tempfile.TemporaryFile()
+    workbook.save(fh)
+    fh.seek(0)
+    return FileResponse(
+        fh, as_attachment=True, filename=f"{filename}.xlsx", content_type=XLSX_CONTENT_TYPE,
+    )
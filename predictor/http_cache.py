@@ -0,0 +1,117 @@
+"""
+Canonical, cacheable GET URLs for the prediction pages.
+
+Marks predictor and browse-colleges results are plain GETs:
+
+    /predict/?marks=180&category=OPEN&gender=Gender-Neutral&home_state=&year=2025&round=6
+    /colleges/?rank=5000&category=OPEN&gender=Gender-Neutral&home_state=&year=2025&round=6
+
+Any other spelling of the same query (label aliases, missing year/round,
+other parameter order) redirects to the canonical URL first, so every
+student asking the same question hits the same URL and cache entry.
+
+A result page depends only on that query, the cutoff data version and
+whether the visitor has unlocked every college. Those make a strong ETag,
+and the version (a publish timestamp) gives Last-Modified. Both are
+checked before the prediction is computed or rendered, so a conditional
+request gets a 304 without touching the database.
+
+The locked page is the same for every visitor and is served as public.
+The unlocked page is private to the visitor. The unlock flag is the only
+thing read from the signed state cookie (state.py), so responses carry
+Vary: Cookie. A reverse proxy shares the public copies by stripping every
+cookie except predictor_state from its cache key; with no unlock cookie,
+all locked visitors then share one entry per URL.
+"""
+import hashlib
+import os
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.http import HttpResponseRedirect
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def canonical_query(value_key, value, category, gender, home_state, year, round_no):
+    """
+    [(key, value)] of a result page, in canonical order; the labels are
+    expected in their canonical spelling already (views.student_filters).
+    """
+    return [
+        (value_key, str(int(value))),
+        ("category", category),
+        ("gender", gender),
+        ("home_state", home_state),
+        ("year", str(year)),
+        ("round", str(round_no)),
+    ]
+
+
+def canonical_redirect(request, query):
+    """
+    A redirect to the canonical URL, or None when the request is already
+    on it. Temporary, since "latest year/round" moves with the data.
+    """
+    query_string = urlencode(query)
+    if request.method in ("GET", "HEAD") and request.META.get("QUERY_STRING", "") == query_string:
+        return None
+    return HttpResponseRedirect(f"{request.path}?{query_string}")
+
+
+_template_stamp = None
+
+
+def template_stamp():
+    """
+    Newest template mtime, so a deploy that changes the markup also
+    changes every ETag.
+    """
+    global _template_stamp
+    if _template_stamp is None:
+        root = os.path.join(os.path.dirname(__file__), "templates")
+        _template_stamp = max(
+            (os.stat(os.path.join(d, f)).st_mtime_ns for d, _, files in os.walk(root) for f in files),
+            default=0,
+        )
+    return _template_stamp
+
+
+def page_etag(kind, query, version, unlocked):
+    raw = repr((kind, tuple(query), version, unlocked, template_stamp()))
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()[:32]
+
+
+def published_at(version):
+    """
+    Publish time of a data version (versions are time_ns stamps), or None.
+    """
+    return int(version) // 10 ** 9 if str(version).isdigit() and int(version) else None
+
+
+class CachedPage:
+    """
+    Validators for one result page. not_modified() is the 304 to return
+    straight away, if any; finish() adds the headers to a rendered page.
+    """
+
+    def __init__(self, request, kind, query, version, unlocked):
+        self.request = request
+        self.etag = page_etag(kind, query, version, unlocked)
+        self.last_modified = published_at(version)
+        self.unlocked = unlocked
+
+    def not_modified(self):
+        response = get_conditional_response(self.request, etag=self.etag, last_modified=self.last_modified)
+        return self.finish(response) if response is not None else None
+
+    def finish(self, response):
+        response["ETag"] = self.etag
+        if self.last_modified is not None:
+            response["Last-Modified"] = http_date(self.last_modified)
+        if self.unlocked:
+            # revalidated on every use, but still answered with a 304
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=getattr(settings, "PREDICTION_PAGE_MAX_AGE", 300))
+        return response
@@ -0,0 +1,177 @@
+"""
+Streaming ingestion of JoSAA / CSAB opening-closing rank workbooks.
+
+The official .xlsx files are read with openpyxl in read-only mode, which
+parses sheet XML as it is iterated, and turned into Cutoff rows by a
+chain of generators:
+
+    iter_sheet_rows()   raw cell tuples, one sheet at a time
+    iter_cutoff_rows()  header row located and normalised, values cleaned
+    batched()           fixed-size lists for bulk_create
+
+Nothing holds more than one batch, so memory stays flat however large the
+workbook is. Sheets without an opening/closing rank header (the seat
+matrix sheets, for instance) are skipped. Quota, seat type and gender
+labels are stored in their canonical spelling (codes.py).
+"""
+import re
+from collections import namedtuple
+from itertools import islice
+
+from openpyxl import load_workbook
+
+from .codes import canonical
+from .institute_states import infer_state
+from .models import Institute
+
+
+CutoffRecord = namedtuple(
+    "CutoffRecord",
+    ["institute", "program", "quota", "seat_type", "gender", "opening_rank", "closing_rank"],
+)
+
+# normalised header text -> CutoffRecord field
+HEADER_FIELDS = {
+    "institute": "institute",
+    "institute name": "institute",
+    "academic program name": "program",
+    "program name": "program",
+    "program": "program",
+    "quota": "quota",
+    "seat type": "seat_type",
+    "category": "seat_type",
+    "gender": "gender",
+    "opening rank": "opening_rank",
+    "closing rank": "closing_rank",
+}
+# a header row is found within this many rows of the top of a sheet
+HEADER_SEARCH_ROWS = 10
+
+_SPACES = re.compile(r"\s+")
+_RANK = re.compile(r"^(\d+)(?:\.0+)?\s*P?$", re.IGNORECASE)
+
+
+def normalize_header(value):
+    return _SPACES.sub(" ", str(value or "")).strip().lower()
+
+
+def clean_text(value):
+    return _SPACES.sub(" ", str(value)).strip() if value is not None else ""
+
+
+def normalize_label(name, value):
+    """
+    Canonical spelling of a quota / seat type / gender cell (codes.py);
+    unrecognised labels are kept as they are.
+    """
+    text = clean_text(value)
+    return canonical(name, text) or text
+
+
+def parse_rank(value):
+    """
+    Rank cell -> int, or None when it is blank or not a whole number.
+    A trailing "P" (preparatory rank) is stripped, as load_sample_cutoffs does.
+    """
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    match = _RANK.match(str(value).strip())
+    return int(match.group(1)) if match else None
+
+
+def iter_sheet_rows(path, sheets=None):
+    """
+    (sheet title, row iterator) per worksheet, streamed from a read-only
+    workbook. `sheets` limits it to those titles.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            if sheets and sheet.title not in sheets:
+                continue
+            yield sheet.title, sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def find_header(rows):
+    """
+    {CutoffRecord field: column index} from the first row that names every
+    field, consuming rows up to it; None if the sheet has no such row.
+    """
+    for row in islice(rows, HEADER_SEARCH_ROWS):
+        columns = {}
+        for i, cell in enumerate(row):
+            field = HEADER_FIELDS.get(normalize_header(cell))
+            if field and field not in columns:
+                columns[field] = i
+        if len(columns) == len(CutoffRecord._fields):
+            return columns
+    return None
+
+
+def iter_cutoff_rows(rows, columns, skipped):
+    """
+    CutoffRecords from a sheet's data rows. Rows without a usable
+    institute, program or rank pair are counted in skipped["rows"].
+    """
+    order = [columns[field] for field in CutoffRecord._fields]
+    width = max(order) + 1
+    for row in rows:
+        if row is None or len(row) < width:
+            row = tuple(row or ()) + (None,) * width
+        institute, program, quota, seat_type, gender, opening, closing = (row[i] for i in order)
+
+        record = CutoffRecord(
+            clean_text(institute),
+            clean_text(program),
+            normalize_label("quota", quota),
+            normalize_label("seat_type", seat_type),
+            normalize_label("gender", gender),
+            parse_rank(opening),
+            parse_rank(closing),
+        )
+        if not (record.institute and record.program) or None in (record.opening_rank, record.closing_rank):
+            skipped["rows"] += 1
+            continue
+        yield record
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def resolve_institutes(names):
+    """
+    Return ({name: id}, number of states filled) for every institute
+    name, creating the missing ones in a single bulk insert. New
+    institutes, and existing ones with no state yet, get their state from
+    infer_state() here, once, so the predictor never has to work it out
+    per request.
+    """
+    names = set(names)
+    existing = {}
+    blank_state = []
+    for inst_id, name, state in Institute.objects.filter(name__in=names).values_list("id", "name", "state"):
+        existing[name] = inst_id
+        if not state and infer_state(name):
+            blank_state.append(Institute(id=inst_id, state=infer_state(name)))
+    Institute.objects.bulk_update(blank_state, ["state"])
+
+    missing = names - existing.keys()
+    if missing:
+        Institute.objects.bulk_create(
+            [Institute(name=n, state=infer_state(n), institute_type="") for n in sorted(missing)]
+        )
+        existing.update(Institute.objects.filter(name__in=missing).values_list("name", "id"))
+
+    return existing, len(blank_state)
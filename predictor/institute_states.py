@@ -0,0 +1,177 @@
+"""
+Institute -> state map and home-state quota rules.
+
+JoSAA gives NITs and a few state-funded institutes separate Home State (HS)
+and Other State (OS) quotas, plus special Goa (GO), Jammu & Kashmir (JK)
+and Ladakh (LA) quotas. Which one a student competes in depends only on
+their home state and the institute's state, so the state is worked out
+once per institute at import time (infer_state) and stored on
+Institute.state; the cutoff index then resolves quotas with one array
+lookup per institute instead of matching strings per row.
+"""
+import re
+
+
+STATES = [
+    "Andaman and Nicobar Islands",
+    "Andhra Pradesh",
+    "Arunachal Pradesh",
+    "Assam",
+    "Bihar",
+    "Chandigarh",
+    "Chhattisgarh",
+    "Dadra and Nagar Haveli and Daman and Diu",
+    "Delhi",
+    "Goa",
+    "Gujarat",
+    "Haryana",
+    "Himachal Pradesh",
+    "Jammu and Kashmir",
+    "Jharkhand",
+    "Karnataka",
+    "Kerala",
+    "Ladakh",
+    "Lakshadweep",
+    "Madhya Pradesh",
+    "Maharashtra",
+    "Manipur",
+    "Meghalaya",
+    "Mizoram",
+    "Nagaland",
+    "Odisha",
+    "Puducherry",
+    "Punjab",
+    "Rajasthan",
+    "Sikkim",
+    "Tamil Nadu",
+    "Telangana",
+    "Tripura",
+    "Uttar Pradesh",
+    "Uttarakhand",
+    "West Bengal",
+]
+
+STATE_ALIASES = {
+    "j&k": "Jammu and Kashmir",
+    "jammu & kashmir": "Jammu and Kashmir",
+    "orissa": "Odisha",
+    "pondicherry": "Puducherry",
+    "gujrat": "Gujarat",
+    "uttaranchal": "Uttarakhand",
+    "nct of delhi": "Delhi",
+    "daman and diu": "Dadra and Nagar Haveli and Daman and Diu",
+    "dadra and nagar haveli": "Dadra and Nagar Haveli and Daman and Diu",
+}
+
+# quota codes
+HOME_STATE_QUOTA = "HS"
+OTHER_STATE_QUOTA = "OS"
+# quotas reserved for students from one state, at any institute offering them
+STATE_QUOTAS = {
+    "GO": "Goa",
+    "JK": "Jammu and Kashmir",
+    "LA": "Ladakh",
+}
+
+# Checked in order, on word boundaries, against the institute name.
+# Names that mention a state other than their own come first; then state
+# names; then cities.
+INSTITUTE_STATE_KEYWORDS = [
+    ("Punjab Engineering College", "Chandigarh"),
+    ("Indian Oil Odisha Campus", "Odisha"),
+    ("Vadodara International Campus Diu", "Dadra and Nagar Haveli and Daman and Diu"),
+    ("Sant Longowal", "Punjab"),
+    *((state, state) for state in STATES),
+    *((alias, state) for alias, state in STATE_ALIASES.items()),
+    ("Agartala", "Tripura"),
+    ("Ahmedabad", "Gujarat"),
+    ("Aizawl", "Mizoram"),
+    ("Allahabad", "Uttar Pradesh"),
+    ("Bhadohi", "Uttar Pradesh"),
+    ("Bhagalpur", "Bihar"),
+    ("Bhilai", "Chhattisgarh"),
+    ("Bhopal", "Madhya Pradesh"),
+    ("Bhubaneswar", "Odisha"),
+    ("Bilaspur", "Chhattisgarh"),
+    ("Bombay", "Maharashtra"),
+    ("Calicut", "Kerala"),
+    ("Chittoor", "Andhra Pradesh"),
+    ("Deoghar", "Jharkhand"),
+    ("Dhanbad", "Jharkhand"),
+    ("Dharwad", "Karnataka"),
+    ("Durgapur", "West Bengal"),
+    ("Gandhinagar", "Gujarat"),
+    ("Guwahati", "Assam"),
+    ("Gwalior", "Madhya Pradesh"),
+    ("Hamirpur", "Himachal Pradesh"),
+    ("Haridwar", "Uttarakhand"),
+    ("Hyderabad", "Telangana"),
+    ("Indore", "Madhya Pradesh"),
+    ("Itanagar", "Arunachal Pradesh"),
+    ("Jabalpur", "Madhya Pradesh"),
+    ("Jaipur", "Rajasthan"),
+    ("Jalandhar", "Punjab"),
+    ("Jammu", "Jammu and Kashmir"),
+    ("Jamshedpur", "Jharkhand"),
+    ("Jodhpur", "Rajasthan"),
+    ("Kanpur", "Uttar Pradesh"),
+    ("Kancheepuram", "Tamil Nadu"),
+    ("Kharagpur", "West Bengal"),
+    ("Kottayam", "Kerala"),
+    ("Kundli", "Haryana"),
+    ("Kurukshetra", "Haryana"),
+    ("Lucknow", "Uttar Pradesh"),
+    ("Madras", "Tamil Nadu"),
+    ("Mandi", "Himachal Pradesh"),
+    ("Mesra", "Jharkhand"),
+    ("Mumbai", "Maharashtra"),
+    ("Nagpur", "Maharashtra"),
+    ("Palakkad", "Kerala"),
+    ("Patna", "Bihar"),
+    ("Pune", "Maharashtra"),
+    ("Raipur", "Chhattisgarh"),
+    ("Ranchi", "Jharkhand"),
+    ("Ropar", "Punjab"),
+    ("Rourkela", "Odisha"),
+    ("Roorkee", "Uttarakhand"),
+    ("Sagar", "Madhya Pradesh"),
+    ("Salem", "Tamil Nadu"),
+    ("Shibpur", "West Bengal"),
+    ("Shillong", "Meghalaya"),
+    ("Silchar", "Assam"),
+    ("Srinagar", "Jammu and Kashmir"),
+    ("Surathkal", "Karnataka"),
+    ("Surat", "Gujarat"),
+    ("Tezpur", "Assam"),
+    ("Thanjavur", "Tamil Nadu"),
+    ("Tiruchirappalli", "Tamil Nadu"),
+    ("Tirupati", "Andhra Pradesh"),
+    ("Vadodara", "Gujarat"),
+    ("Varanasi", "Uttar Pradesh"),
+    ("Vijayawada", "Andhra Pradesh"),
+    ("Warangal", "Telangana"),
+]
+
+_KEYWORD_PATTERNS = [
+    (re.compile(rf"\b{re.escape(keyword)}\b", re.IGNORECASE), state)
+    for keyword, state in INSTITUTE_STATE_KEYWORDS
+]
+_CANONICAL = {s.lower(): s for s in STATES}
+_CANONICAL.update(STATE_ALIASES)
+
+
+def canonical_state(value):
+    """
+    Canonical STATES spelling for user input, or "" if unrecognised.
+    """
+    return _CANONICAL.get(str(value or "").strip().lower(), "")
+
+
+def infer_state(institute_name):
+    """
+    State an institute is in, from its name; "" when no keyword matches.
+    """
+    for pattern, state in _KEYWORD_PATTERNS:
+        if pattern.search(institute_name):
+            return state
+    return ""
@@ -0,0 +1,222 @@
+"""
+Write-behind queue for lead capture.
+
+start_lead() and verify_otp() do not touch the database: they append one
+JSON line per event to a local spool file (settings.LEAD_QUEUE_FILE) and
+return, and the drain_lead_queue command moves the events into the Lead
+table in batches:
+
+    {"event": "lead", "token": ..., "name": ..., "phone": ..., "created_at": ...}
+    {"event": "verified", "token": ...}
+
+Each event is a single O_APPEND write, so concurrent workers never
+interleave lines, and is fsynced before the view returns. Writers hold a
+shared flock on a sibling lock file (<spool>.lock) from opening the spool
+until the write is done. A drain takes it exclusively to rename the spool
+aside, so no writer still has the old file open. New events then go to a
+fresh file. The drain deletes the claimed file only once its transaction
+has committed. A crash in between
+replays it on the next drain: delivery is at-least-once, and replays are
+harmless because leads are deduplicated on token, and on phone within
+a window (DEDUPE_WINDOW by default) of an earlier lead. A duplicate's
+token is kept as a LeadAlias, so its "verified" event, even one drained
+later, marks the lead it repeated.
+"""
+import fcntl
+import glob
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Lead, LeadAlias
+
+
+LEAD_EVENT = "lead"
+VERIFIED_EVENT = "verified"
+
+# leads with the same phone captured this close together are one lead
+DEDUPE_WINDOW = timedelta(minutes=10)
+DRAIN_BATCH_SIZE = 1000
+
+LEAD_FIELDS = ["name", "phone", "state", "pass_year", "otp_code"]
+
+
+def captured(event):
+    """
+    Capture time of a lead event, as the model stores it.
+    """
+    return datetime.fromtimestamp(event["created_at"], tz=dt_timezone.utc if settings.USE_TZ else None)
+
+
+def queue_path():
+    return str(getattr(settings, "LEAD_QUEUE_FILE", settings.BASE_DIR / "lead_queue.jsonl"))
+
+
+@contextmanager
+def spool_lock(operation):
+    """
+    Hold the spool's lock file: fcntl.LOCK_SH to write, LOCK_EX to claim.
+    """
+    fd = os.open(f"{queue_path()}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, operation)
+        yield
+    finally:
+        # closing the file releases the lock
+        os.close(fd)
+
+
+def enqueue(event):
+    """
+    Append one event to the spool, durably.
+    """
+    line = (json.dumps(event, separators=(",", ":")) + "\n").encode()
+    with spool_lock(fcntl.LOCK_SH):
+        fd = os.open(queue_path(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def enqueue_lead(**fields):
+    """
+    Queue a new lead; returns its token, which later events refer to.
+    """
+    token = uuid.uuid4().hex
+    event = {field: fields.get(field, "") for field in LEAD_FIELDS}
+    event.update(event=LEAD_EVENT, token=token, created_at=time.time())
+    enqueue(event)
+    return token
+
+
+def enqueue_verified(token):
+    enqueue({"event": VERIFIED_EVENT, "token": token})
+
+
+# -- draining ------------------------------------------------------------
+
+def claim_spools():
+    """
+    Move the live spool aside and return every spool waiting to be
+    drained, oldest first (including any left by a drain that crashed).
+    """
+    path = queue_path()
+    # waits for writers that already opened the spool to finish
+    with spool_lock(fcntl.LOCK_EX):
+        if os.path.exists(path):
+            os.replace(path, f"{path}.{time.time_ns()}.draining")
+    return sorted(glob.glob(f"{glob.escape(path)}.*.draining"))
+
+
+def read_events(path):
+    """
+    (events, number of unreadable lines) from one spool. A torn last line
+    from a crashed writer is skipped rather than failing the drain.
+    """
+    events, bad = [], 0
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                bad += 1
+                continue
+            if not isinstance(event, dict) or not event.get("token"):
+                bad += 1
+            elif event.get("event") == LEAD_EVENT and not isinstance(event.get("created_at"), (int, float)):
+                bad += 1
+            else:
+                events.append(event)
+    return events, bad
+
+
+def apply_events(events, batch_size=DRAIN_BATCH_SIZE, window=DEDUPE_WINDOW):
+    """
+    Write a spool's events to the Lead table; returns counts of leads
+    created, duplicates dropped and leads marked verified.
+    """
+    leads = [e for e in events if e.get("event") == LEAD_EVENT]
+    verified = {e["token"] for e in events if e.get("event") == VERIFIED_EVENT}
+    # token -> lead id; replayed events resolve to the lead already written,
+    # and tokens dropped as duplicates in an earlier drain to their lead
+    tokens = {e["token"] for e in leads} | verified
+    lead_ids = dict(Lead.objects.filter(token__in=tokens).values_list("token", "id"))
+    lead_ids.update(LeadAlias.objects.filter(token__in=tokens).values_list("token", "lead_id"))
+
+    # earlier leads (already stored, or earlier in this spool) per phone
+    pending = [e for e in leads if e["token"] not in lead_ids]
+    recent = {}
+    if pending:
+        since = min(captured(e) for e in pending) - window
+        for lead_id, phone, created in Lead.objects.filter(
+            phone__in={e.get("phone", "") for e in pending}, created_at__gte=since,
+        ).values_list("id", "phone", "created_at"):
+            recent.setdefault(phone, []).append((created, lead_id))
+
+    new, duplicates = [], 0
+    aliases = {}  # duplicate token -> token / id of the lead it repeats
+    for event in sorted(pending, key=lambda e: e["created_at"]):
+        if event["token"] in aliases:
+            continue
+        created = captured(event)
+        earlier = next(
+            (ref for when, ref in recent.get(event.get("phone", ""), ()) if abs(created - when) <= window),
+            None,
+        )
+        if earlier is not None:
+            aliases[event["token"]] = earlier
+            duplicates += 1
+            continue
+        new.append(Lead(
+            token=event["token"],
+            created_at=created,
+            **{field: event.get(field, "") for field in LEAD_FIELDS},
+        ))
+        aliases[event["token"]] = event["token"]
+        recent.setdefault(event.get("phone", ""), []).append((created, event["token"]))
+
+    Lead.objects.bulk_create(new, batch_size=batch_size)
+    if new:
+        lead_ids.update(Lead.objects.filter(token__in=[l.token for l in new]).values_list("token", "id"))
+
+    def resolve(token):
+        ref = aliases.get(token, token)
+        return lead_ids.get(ref) if isinstance(ref, str) else ref
+
+    LeadAlias.objects.bulk_create(
+        [LeadAlias(token=token, lead_id=resolve(token)) for token, ref in aliases.items() if ref != token],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+    verify_ids = {resolve(token) for token in verified} - {None}
+    marked = Lead.objects.filter(id__in=verify_ids, otp_verified=False).update(otp_verified=True)
+    return len(new), duplicates, marked
+
+
+def drain(batch_size=DRAIN_BATCH_SIZE, window=DEDUPE_WINDOW):
+    """
+    Apply and remove every waiting spool; returns summed counts
+    {"spools", "created", "duplicates", "verified", "bad_lines"}.
+    """
+    totals = dict.fromkeys(["spools", "created", "duplicates", "verified", "bad_lines"], 0)
+    for path in claim_spools():
+        events, bad = read_events(path)
+        with transaction.atomic():
+            created, duplicates, marked = apply_events(events, batch_size, window)
+        # only now: a crash before this line replays the spool
+        os.remove(path)
+        totals["spools"] += 1
+        totals["created"] += created
+        totals["duplicates"] += duplicates
+        totals["verified"] += marked
+        totals["bad_lines"] += bad
+    return totals
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from predictor.institute_states import infer_state
+from predictor.models import Institute
+from predictor.publishing import publish_cutoff_data
+
+
+class Command(BaseCommand):
+    help = "Fill Institute.state from institute names (used for HS/OS quota resolution)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--overwrite",
+            action="store_true",
+            help="Also replace states that are already set",
+        )
+
+    def handle(self, *args, **options):
+        changed = []
+        unknown = []
+
+        for inst in Institute.objects.all():
+            if inst.state and not options["overwrite"]:
+                continue
+
+            new_state = infer_state(inst.name)
+            if not new_state:
+                unknown.append(inst.name)
+            elif inst.state != new_state:
+                inst.state = new_state
+                changed.append(inst)
+
+        Institute.objects.bulk_update(changed, ["state"])
+
+        if unknown:
+            self.stdout.write(self.style.WARNING(f"No state found for: {unknown}"))
+
+        if changed:
+            # the cutoff snapshot carries institute states; republish it
+            publish_cutoff_data()
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {len(changed)} institutes."))
@@ -0,0 +1,347 @@
+import gc
+import json
+import os
+import platform
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+from pathlib import Path
+
+import django
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from predictor import http_cache, services
+from predictor.codes import CATEGORIES, GENDERS
+from predictor.cutoff_index import CutoffIndex, data_version, get_cutoff_index
+from predictor.institute_states import STATES
+from predictor.management.commands.load_sample_cutoffs import clean_rank_column
+from predictor.marks_engine import MarksEngine, get_marks_engine
+from predictor.models import Cutoff, MarksBand
+from predictor.rank_lookup import RankLookup, get_rank_lookup
+from predictor.result_cache import result_cache
+from predictor.scoring import RankEstimate, score_slice
+from predictor.search import SearchIndex
+
+
+# used when the configured database has no MarksBand rows to copy
+DEFAULT_MARKS_BANDS = [
+    (250, 300, 99.9, 1, 1000),
+    (200, 249, 99.5, 1001, 6000),
+    (150, 199, 98.0, 6001, 25000),
+    (100, 149, 94.0, 25001, 75000),
+    (50, 99, 80.0, 75001, 250000),
+    (0, 49, 40.0, 250001, 900000),
+]
+BAND_FIELDS = ["min_marks", "max_marks", "percentile", "min_rank", "max_rank"]
+
+STAGES = [
+    "marks_to_rank", "range_query", "rank_lookup", "chance_scoring", "grouping",
+    "template_render", "request_home", "request_colleges",
+]
+
+
+def rss_mb():
+    """
+    Current resident set size, from /proc where available.
+    """
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return max_rss_mb()
+
+
+def max_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if platform.system() == "Darwin" else peak / 2 ** 10
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+    values = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "n": len(values), "mean": round(float(values.mean()), 3),
+        "p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3),
+    }
+
+
+def synthetic_csv(source, scale, path, seed):
+    """
+    `scale` copies of the cutoff CSV as one file: copy 0 as it is, the
+    others as renamed programs with closing/opening ranks jittered by
+    +/-10%, so every (year, round, seat type, gender) slice grows `scale`
+    times over.
+    """
+    df = pd.read_csv(source)
+    df.columns = [str(c).strip() for c in df.columns]
+    opening = clean_rank_column(df["Opening Rank"])
+    closing = clean_rank_column(df["Closing Rank"])
+    valid = opening.notna() & closing.notna()
+    df, opening, closing = df[valid], opening[valid].astype(int), closing[valid].astype(int)
+
+    rng = np.random.default_rng(seed)
+    copies = [df]
+    for k in range(1, scale):
+        factor = rng.uniform(0.9, 1.1, len(df))
+        copy = df.copy()
+        copy["Academic Program Name"] = copy["Academic Program Name"].astype(str) + f" [synthetic {k}]"
+        copy["Opening Rank"] = np.maximum(1, np.rint(opening.to_numpy() * factor)).astype(int)
+        copy["Closing Rank"] = np.maximum(copy["Opening Rank"], np.rint(closing.to_numpy() * factor)).astype(int)
+        copies.append(copy)
+    pd.concat(copies).to_csv(path, index=False)
+    return len(df) * scale
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the predictor hot paths (marks -> rank, range query, grouping, render, "
+        "full requests), the cutoff loader and worker memory at several data volumes; prints JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--csv",
+            type=str,
+            default="cutoffs_clean.csv",
+            help="Cutoff CSV to load (load_sample_cutoffs format)",
+        )
+        parser.add_argument(
+            "--scales",
+            type=str,
+            default="1,10,100",
+            help="Comma-separated multiples of the CSV's volume to benchmark",
+        )
+        parser.add_argument("--samples", type=int, default=200, help="Timed samples per stage")
+        parser.add_argument("--seed", type=int, default=0, help="Seed for synthetic data and inputs")
+        parser.add_argument("--year", type=int, default=2025, help="Year to load the cutoffs as")
+        parser.add_argument(
+            "--output",
+            type=str,
+            default=None,
+            help="Write the JSON report here instead of stdout",
+        )
+        parser.add_argument(
+            "--use-current-db",
+            action="store_true",
+            help="Run against the configured database instead of a scratch SQLite copy; "
+                 "replaces its cutoffs for --year",
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["csv"]):
+            raise CommandError(f"No such CSV: {options['csv']}")
+        try:
+            scales = [int(s) for s in options["scales"].split(",") if s.strip()]
+        except ValueError:
+            raise CommandError("--scales must be comma-separated integers")
+        if not scales or min(scales) < 1:
+            raise CommandError("--scales must be positive integers")
+
+        bands = list(MarksBand.objects.values_list(*BAND_FIELDS)) or DEFAULT_MARKS_BANDS
+        tmpdir = tempfile.mkdtemp(prefix="predictor-benchmark-")
+        # data files and the prediction cache in the temp dir, so a run
+        # never touches the real snapshot, lookup table or cache
+        isolated = override_settings(
+            CUTOFF_DATA_VERSION_FILE=Path(tmpdir) / "version",
+            RANK_LOOKUP_FILE=Path(tmpdir) / "rank_lookup.npz",
+            CUTOFF_SNAPSHOT_FILE=Path(tmpdir) / "cutoffs.snapshot",
+            LEAD_QUEUE_FILE=Path(tmpdir) / "lead_queue.jsonl",
+            CACHES={"default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "predictor-benchmark",
+                "OPTIONS": {"MAX_ENTRIES": 100000},
+            }},
+            ALLOWED_HOSTS=["localhost"],
+        )
+        old_name = None
+        isolated.enable()
+        try:
+            if not options["use_current_db"]:
+                # a throwaway SQLite file, created and migrated the way the test runner does
+                connection.settings_dict.setdefault("TEST", {})["NAME"] = str(Path(tmpdir) / "benchmark.sqlite3")
+                old_name = connection.settings_dict["NAME"]
+                connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            if not MarksBand.objects.exists():
+                MarksBand.objects.bulk_create(MarksBand(**dict(zip(BAND_FIELDS, b))) for b in bands)
+
+            report = {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "numpy": np.__version__,
+                "database": connection.vendor,
+                "csv": options["csv"],
+                "samples": options["samples"],
+                "seed": options["seed"],
+                "runs": [],
+            }
+            for scale in scales:
+                self.stderr.write(f"Scale {scale}x ...")
+                report["runs"].append(self.run_scale(scale, options, tmpdir))
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            isolated.disable()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        text = json.dumps(report, indent=2)
+        if options["output"]:
+            Path(options["output"]).write_text(text + "\n")
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            self.stdout.write(text)
+
+    # -- one data volume ---------------------------------------------------
+
+    def run_scale(self, scale, options, tmpdir):
+        path = options["csv"]
+        if scale > 1:
+            path = os.path.join(tmpdir, f"cutoffs_x{scale}.csv")
+            synthetic_csv(options["csv"], scale, path, options["seed"] + scale)
+
+        # the loader as shipped: read, clean, bulk insert, publish snapshot + lookup
+        started = time.perf_counter()
+        call_command("load_sample_cutoffs", path=path, year=options["year"], stdout=StringIO())
+        load_seconds = time.perf_counter() - started
+        rows = Cutoff.objects.filter(year=options["year"]).count()
+
+        run = {
+            "scale": scale,
+            "rows": rows,
+            "import": {
+                "seconds": round(load_seconds, 3),
+                "rows_per_sec": round(rows / load_seconds) if load_seconds > 0 else None,
+            },
+            "memory": self.worker_memory(),
+        }
+        latencies, queries = self.time_stages(options)
+        run["latency_ms"] = {stage: percentiles(latencies[stage]) for stage in STAGES}
+        run["queries_per_request"] = {
+            view: {"mean": round(float(np.mean(counts)), 2), "max": int(max(counts))}
+            for view, counts in queries.items() if counts
+        }
+        return run
+
+    def worker_memory(self):
+        """
+        What a freshly started worker allocates to serve this data version:
+        the mmapped index, the rank lookup table, the marks engine and the
+        search index, built from the published files as a worker would.
+        """
+        gc.collect()
+        before = rss_mb()
+        tracemalloc.start()
+        index = CutoffIndex.build(version=data_version())
+        structures = [
+            index,
+            RankLookup.load(str(settings.RANK_LOOKUP_FILE)),
+            MarksEngine.build(version=index.version),
+            SearchIndex(index),
+        ]
+        heap, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        after = rss_mb()
+        del structures, index
+        return {
+            "worker_heap_mb": round(heap / 2 ** 20, 2),
+            "worker_heap_peak_mb": round(peak / 2 ** 20, 2),
+            "worker_rss_delta_mb": round(after - before, 2),
+            "process_rss_mb": round(after, 2),
+            "process_max_rss_mb": round(max_rss_mb(), 2),
+        }
+
+    def time_stages(self, options):
+        """
+        Per-sample timings of every stage, with random students. The result
+        cache is cleared before each request, so every figure is an
+        uncached computation.
+        """
+        rng = np.random.default_rng(options["seed"])
+        index = get_cutoff_index()
+        lookup = get_rank_lookup(index)
+        engine = get_marks_engine()
+        year, round_no = services.resolve_year_round(index, options["year"], None)
+        quotas = tuple(services.PREDICTOR_QUOTAS)
+        limit = services.RESULT_LIMIT
+        shared_cache = caches["default"]
+        factory = RequestFactory(HTTP_HOST="localhost")
+        client = Client(HTTP_HOST="localhost")
+
+        latencies = {stage: [] for stage in STAGES}
+        queries = {"home": [], "colleges": []}
+
+        def timed(stage, func, *args, **kwargs):
+            started = time.perf_counter()
+            value = func(*args, **kwargs)
+            latencies[stage].append(time.perf_counter() - started)
+            return value
+
+        for _ in range(options["samples"]):
+            marks = int(rng.integers(0, 301))
+            rank = int(rng.integers(1, 200001))
+            category = CATEGORIES[rng.integers(len(CATEGORIES))]
+            gender = GENDERS[rng.integers(len(GENDERS))]
+            home_state = STATES[rng.integers(len(STATES))] if rng.random() < 0.5 else ""
+
+            estimate = timed("marks_to_rank", engine.estimate, marks)
+            if estimate is not None:
+                timed(
+                    "range_query", index.overlapping_positions,
+                    year, round_no, quotas, category, gender, estimate.rank_low, estimate.rank_high,
+                    limit=limit + 1, home_state=home_state,
+                )
+                timed(
+                    "chance_scoring", score_slice,
+                    index, year, round_no, quotas, category, gender,
+                    RankEstimate(estimate.approx_rank, estimate.rank_low, estimate.rank_high),
+                    limit=limit, home_state=home_state,
+                )
+
+            positions = timed(
+                "rank_lookup", lookup.positions_containing,
+                index, year, round_no, quotas, category, gender, rank,
+                limit=limit + 1, home_state=home_state,
+            )
+            timed("grouping", lambda: services.group_by_institute(index.rows(positions[:limit])))
+
+            prediction = services.Prediction(index.rows(positions[:limit]), can_see_all=True)
+            context = {
+                "rank": str(rank), "category": category, "gender": gender, "home_state": home_state,
+                "states": STATES, **services.year_round_context(index, year, round_no),
+                **prediction.as_context(),
+            }
+            request = factory.get("/colleges/")
+            timed("template_render", render_to_string, "predictor/colleges.html", context, request)
+
+            # canonical URLs, so the figures are the result pages, not redirects
+            student = (category, gender, home_state, year, round_no)
+            for view, send in (
+                ("colleges", lambda: client.get(
+                    "/colleges/", http_cache.canonical_query("rank", rank, *student))),
+                ("home", lambda: client.get(
+                    "/predict/", http_cache.canonical_query("marks", marks, *student))),
+            ):
+                result_cache.clear()
+                shared_cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    response = timed(f"request_{view}", send)
+                if response.status_code != 200:
+                    raise CommandError(f"{view} returned HTTP {response.status_code}")
+                queries[view].append(len(captured))
+
+        return latencies, queries
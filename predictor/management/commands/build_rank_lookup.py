@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+from predictor.rank_lookup import build_rank_lookup
+
+
+class Command(BaseCommand):
+    help = "Precompute rank -> eligible programs segments for the browse page"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        lookup = build_rank_lookup()
+        elapsed = time.perf_counter() - started
+
+        segments = sum(len(seg.bounds) for seg in lookup.segments.values())
+        entries = sum(seg.stored_ids for seg in lookup.segments.values())
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Built {len(lookup.segments)} slices, {segments} segments, "
+                f"{entries} stored entries in {elapsed:.2f}s (version={lookup.version})"
+            )
+        )
@@ -1,12 +1,13 @@
 from django.core.management.base import BaseCommand
 from predictor.models import Institute
+from predictor.publishing import publish_cutoff_data
 
 
 class Command(BaseCommand):
     help = "Classify institutes into IIT / NIT / IIIT / GFTI based on their names"
 
     def handle(self, *args, **options):
-        updated = 0
+        changed = []
 
         for inst in Institute.objects.all():
             n = inst.name.upper()
@@ -22,7 +23,12 @@ class Command(BaseCommand):
 
             if inst.institute_type != new_type:
                 inst.institute_type = new_type
-                inst.save()
-                updated += 1
+                changed.append(inst)
 
-        self.stdout.write(self.style.SUCCESS(f"Updated {updated} institutes."))
+        Institute.objects.bulk_update(changed, ["institute_type"])
+
+        if changed:
+            # the cutoff snapshot carries institute types (search filters)
+            publish_cutoff_data()
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {len(changed)} institutes."))
@@ -0,0 +1,56 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from predictor import lead_queue
+
+
+class Command(BaseCommand):
+    help = "Move leads queued by the unlock flow into the database (once, or continuously with --loop)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=lead_queue.DRAIN_BATCH_SIZE,
+            help="Leads per bulk INSERT statement",
+        )
+        parser.add_argument(
+            "--dedupe-minutes",
+            type=float,
+            default=lead_queue.DEDUPE_WINDOW.total_seconds() / 60,
+            help="Leads with the same phone captured within this many minutes are stored once",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep draining until interrupted",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds between drains with --loop",
+        )
+
+    def handle(self, *args, **options):
+        window = timedelta(minutes=options["dedupe_minutes"])
+        try:
+            while True:
+                started = time.perf_counter()
+                totals = lead_queue.drain(options["batch_size"], window)
+                if totals["spools"] or not options["loop"]:
+                    self.report(totals, time.perf_counter() - started)
+                if not options["loop"]:
+                    return
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.NOTICE("Stopped"))
+
+    def report(self, totals, elapsed):
+        if totals["bad_lines"]:
+            self.stdout.write(self.style.WARNING(f"Skipped {totals['bad_lines']} unreadable queue line(s)"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Drained {totals['spools']} spool(s) in {elapsed:.2f}s: created={totals['created']}, "
+            f"duplicates={totals['duplicates']}, verified={totals['verified']}"
+        ))
@@ -0,0 +1,47 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from predictor.cutoff_index import CutoffIndex, data_version, snapshot_file
+from predictor.publishing import publish_cutoff_data
+from predictor.snapshot import CutoffColumns, open_snapshot, write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Write the Cutoff + Institute tables to the mmapped columnar snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            type=str,
+            default=None,
+            help="Output file (defaults to settings.CUTOFF_SNAPSHOT_FILE)",
+        )
+        parser.add_argument(
+            "--publish",
+            action="store_true",
+            help="Write under a new data version and bump the stamp so workers remap it",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        if options["publish"]:
+            index = publish_cutoff_data()
+            path = snapshot_file()
+        else:
+            path = options["path"] or snapshot_file()
+            index = CutoffIndex(CutoffColumns.from_database(version=data_version()))
+            write_snapshot(index.columns, path)
+
+        elapsed = time.perf_counter() - started
+        columns = open_snapshot(path)
+        size = os.path.getsize(path)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {len(columns)} rows, {len(columns.strings['institute'])} institutes, "
+                f"{len(columns.strings['program'])} programs to {path} "
+                f"({size / 1024:.0f} KiB, version={columns.version}) in {elapsed:.2f}s"
+            )
+        )
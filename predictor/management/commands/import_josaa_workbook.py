@@ -0,0 +1,183 @@
+import os
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from predictor.ingest import batched, find_header, iter_cutoff_rows, iter_sheet_rows, resolve_institutes
+from predictor.institute_states import HOME_STATE_QUOTA, OTHER_STATE_QUOTA
+from predictor.models import Cutoff, Institute
+from predictor.publishing import publish_cutoff_data, published_by_caller
+
+
+def sheet_year_round(title, year=None, round_no=None):
+    """
+    (year, round) for a sheet: the options when given, else read from a
+    title like "2025 josaa", "2024 Round 3" or "2025 CSAB".
+    """
+    if year is None:
+        match = re.search(r"\b(20\d\d)\b", title)
+        year = int(match.group(1)) if match else None
+    if round_no is None:
+        match = re.search(r"round\s*(\d)", title, re.IGNORECASE)
+        if match:
+            round_no = int(match.group(1))
+        elif re.search(r"csab", title, re.IGNORECASE):
+            round_no = Cutoff.ROUND_CSAB
+        else:
+            round_no = Cutoff.FINAL_JOSAA_ROUND
+    return year, round_no
+
+
+class Command(BaseCommand):
+    help = "Import JoSAA/CSAB opening-closing ranks straight from the official .xlsx workbook"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            type=str,
+            default="Jee Data.xlsx",
+            help="Path to the JoSAA/CSAB workbook",
+        )
+        parser.add_argument(
+            "--sheet",
+            action="append",
+            default=None,
+            help="Sheet to import (repeatable); defaults to every sheet with a cutoff header",
+        )
+        parser.add_argument(
+            "--year",
+            type=int,
+            default=None,
+            help="Admission year; defaults to the year in each sheet's title",
+        )
+        parser.add_argument(
+            "--round",
+            type=int,
+            default=None,
+            choices=[value for value, _ in Cutoff.ROUND_CHOICES],
+            help=f"JoSAA round 1-6, or {Cutoff.ROUND_CSAB} for CSAB; defaults to the sheet title, "
+                 f"else round {Cutoff.FINAL_JOSAA_ROUND}",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Rows per bulk INSERT statement",
+        )
+        parser.add_argument(
+            "--report-every",
+            type=int,
+            default=50000,
+            help="Print throughput every N rows",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"No such workbook: {path}")
+
+        self.stdout.write(self.style.NOTICE(f"Reading workbook: {path}"))
+
+        started = time.perf_counter()
+        self.rows_read = 0
+        self.next_report = options["report_every"]
+        self.started = started
+
+        skipped = {"rows": 0}
+        replaced = set()
+        institute_ids = {}
+        state_quota_institutes = set()
+        states_filled = inserted = deleted = 0
+
+        # one transaction: readers keep seeing the previous data until the
+        # whole workbook commits
+        with transaction.atomic(), published_by_caller():
+            for title, rows in iter_sheet_rows(path, options["sheet"]):
+                columns = find_header(rows)
+                if columns is None:
+                    self.stdout.write(f"  {title}: no opening/closing rank header, skipped")
+                    continue
+
+                year, round_no = sheet_year_round(title, options["year"], options["round"])
+                if year is None:
+                    self.stdout.write(self.style.WARNING(
+                        f"  {title}: no year in the sheet title; pass --year. Skipped"
+                    ))
+                    continue
+
+                # a (year, round) is replaced as a whole, once per run
+                if (year, round_no) not in replaced:
+                    deleted += Cutoff.objects.filter(year=year, round=round_no).delete()[0]
+                    replaced.add((year, round_no))
+
+                sheet_rows = 0
+                for batch in batched(iter_cutoff_rows(rows, columns, skipped), options["batch_size"]):
+                    new_names = {r.institute for r in batch} - institute_ids.keys()
+                    if new_names:
+                        ids, filled = resolve_institutes(new_names)
+                        institute_ids.update(ids)
+                        states_filled += filled
+                    state_quota_institutes.update(
+                        r.institute for r in batch if r.quota in (HOME_STATE_QUOTA, OTHER_STATE_QUOTA)
+                    )
+
+                    Cutoff.objects.bulk_create(
+                        [
+                            Cutoff(
+                                institute_id=institute_ids[r.institute],
+                                program_name=r.program,
+                                quota=r.quota,
+                                seat_type=r.seat_type,
+                                gender=r.gender,
+                                year=year,
+                                round=round_no,
+                                opening_rank=r.opening_rank,
+                                closing_rank=r.closing_rank,
+                            )
+                            for r in batch
+                        ],
+                        batch_size=options["batch_size"],
+                    )
+                    sheet_rows += len(batch)
+                    self.progress(len(batch), options["report_every"])
+
+                inserted += sheet_rows
+                self.stdout.write(f"  {title}: {sheet_rows} rows as year={year}, round={round_no}")
+
+        elapsed = time.perf_counter() - started
+        size_mb = os.path.getsize(path) / 2 ** 20
+        self.stdout.write(self.style.NOTICE(
+            f"Inserted={inserted}, Deleted={deleted}, Skipped={skipped['rows']} in {elapsed:.2f}s "
+            f"({inserted / elapsed if elapsed > 0 else 0:,.0f} rows/sec, "
+            f"{size_mb / elapsed if elapsed > 0 else 0:.1f} MB/s of workbook)"
+        ))
+
+        # HS/OS rows are only served for institutes whose state is known
+        unmapped = sorted(Institute.objects.filter(
+            name__in=state_quota_institutes, state="",
+        ).values_list("name", flat=True))
+        if unmapped:
+            self.stdout.write(self.style.WARNING(
+                f"No state known for {len(unmapped)} institute(s) with HS/OS seats; "
+                f"set Institute.state in the admin: {unmapped}"
+            ))
+        if states_filled:
+            self.stdout.write(self.style.NOTICE(f"Filled the state of {states_filled} institutes"))
+
+        if not (inserted or deleted or states_filled):
+            self.stdout.write(self.style.SUCCESS("Done. No changes"))
+            return
+
+        index = publish_cutoff_data()
+        self.stdout.write(self.style.NOTICE(f"Published data version {index.version}"))
+        self.stdout.write(self.style.SUCCESS(f"Done. Rows={inserted}"))
+
+    def progress(self, count, report_every):
+        self.rows_read += count
+        if self.rows_read < self.next_report:
+            return
+        self.next_report += report_every
+        elapsed = time.perf_counter() - self.started
+        rate = self.rows_read / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(f"  {self.rows_read:,} rows ({rate:,.0f} rows/sec)")
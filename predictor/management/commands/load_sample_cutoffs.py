@@ -1,7 +1,24 @@
-import math
+import time
+
 import pandas as pd
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from predictor.codes import canonical
+from predictor.ingest import resolve_institutes
+from predictor.institute_states import HOME_STATE_QUOTA, OTHER_STATE_QUOTA
 from predictor.models import Institute, Cutoff
+from predictor.publishing import publish_cutoff_data, published_by_caller
+
+
+def clean_rank_column(series):
+    """
+    Vectorised rank parsing: strip the "P" (preparatory) suffix and return
+    a nullable Int64 series; blanks and non-integers become <NA>.
+    """
+    cleaned = series.astype("string").str.strip().str.replace("P", "", regex=False)
+    numbers = pd.to_numeric(cleaned, errors="coerce")
+    numbers = numbers.where(numbers == numbers.round())
+    return numbers.astype("Int64")
 
 
 class Command(BaseCommand):
@@ -20,12 +37,32 @@ class Command(BaseCommand):
             default=2025,
             help="Admission year for these cutoffs",
         )
+        parser.add_argument(
+            "--round",
+            type=int,
+            default=Cutoff.FINAL_JOSAA_ROUND,
+            choices=[value for value, _ in Cutoff.ROUND_CHOICES],
+            help=f"JoSAA round 1-6, or {Cutoff.ROUND_CSAB} for CSAB",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Diff against existing rows for --year/--round and apply only inserts/updates/deletes",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Rows per bulk INSERT statement",
+        )
 
     def handle(self, *args, **options):
         path = options["path"]
         year = options["year"]
+        round_no = options["round"]
+        batch_size = options["batch_size"]
 
-        self.stdout.write(self.style.NOTICE(f"Reading CSV: {path} (year={year})"))
+        self.stdout.write(self.style.NOTICE(f"Reading CSV: {path} (year={year}, round={round_no})"))
 
         # Load the clean cutoff table
         df = pd.read_csv(path)
@@ -63,55 +100,151 @@ class Command(BaseCommand):
             return
 
         # Optional: clean up labels a bit (keep strings exactly as in CSV)
-        df[col_inst] = df[col_inst].astype(str).str.strip()
-        df[col_prog] = df[col_prog].astype(str).str.strip()
-        df[col_quota] = df[col_quota].astype(str).str.strip()
-        df[col_seat_type] = df[col_seat_type].astype(str).str.strip()
-        df[col_gender] = df[col_gender].astype(str).str.strip()
-
-        # Wipe existing data so we reload from clean CSV
-        Cutoff.objects.all().delete()
-
-        created, skipped = 0, 0
-
-        for _, row in df.iterrows():
-            inst_name = row[col_inst]
-            prog_name = row[col_prog]
-            quota = row[col_quota]
-            seat_type = row[col_seat_type]
-            gender = row[col_gender]
-
-            # Skip rows with missing or non‑numeric ranks
-            if pd.isna(row[col_open]) or pd.isna(row[col_close]):
-                skipped += 1
-                continue
-
-            try:
-                opening_rank = int(str(row[col_open]).replace("P", ""))
-                closing_rank = int(str(row[col_close]).replace("P", ""))
-            except (ValueError, TypeError):
-                skipped += 1
-                continue
-
-            institute, _ = Institute.objects.get_or_create(
-                name=inst_name,
-                defaults={"state": "", "institute_type": ""},
+        for col in (col_inst, col_prog, col_quota, col_seat_type, col_gender):
+            df[col] = df[col].astype(str).str.strip()
+
+        # quota / seat type / gender in their canonical spelling, so every
+        # source and every query agree on them
+        for col, name in ((col_quota, "quota"), (col_seat_type, "seat_type"), (col_gender, "gender")):
+            df[col] = df[col].map({v: canonical(name, v) or v for v in df[col].unique()})
+
+        # Ranks may carry a "P" suffix (preparatory); anything else that is
+        # not a whole number is skipped
+        df[col_open] = clean_rank_column(df[col_open])
+        df[col_close] = clean_rank_column(df[col_close])
+
+        valid = df[col_open].notna() & df[col_close].notna()
+        skipped = int((~valid).sum())
+        df = df[valid]
+
+        started = time.perf_counter()
+
+        rows = list(
+            zip(
+                df[col_inst],
+                df[col_prog],
+                df[col_quota],
+                df[col_seat_type],
+                df[col_gender],
+                (int(r) for r in df[col_open]),
+                (int(r) for r in df[col_close]),
             )
+        )
+
+        # one transaction either way: readers keep seeing the previous data
+        # for this year/round until the new version commits in a single swap
+        with transaction.atomic(), published_by_caller():
+            institute_ids, states_filled = resolve_institutes(df[col_inst].unique())
+
+            if options["incremental"]:
+                inserted, updated, deleted = self.apply_delta(
+                    rows, institute_ids, year, round_no, batch_size
+                )
+            else:
+                # Wipe this year/round so we reload from clean CSV
+                deleted, _ = Cutoff.objects.filter(year=year, round=round_no).delete()
+                inserted = self.insert_rows(rows, institute_ids, year, round_no, batch_size)
+                updated = 0
+
+        # HS/OS rows are only served for institutes whose state is known
+        state_quota = df[col_quota].isin([HOME_STATE_QUOTA, OTHER_STATE_QUOTA])
+        unmapped = sorted(Institute.objects.filter(
+            name__in=df.loc[state_quota, col_inst].unique(), state="",
+        ).values_list("name", flat=True))
+        if unmapped:
+            self.stdout.write(self.style.WARNING(
+                f"No state known for {len(unmapped)} institute(s) with HS/OS seats; "
+                f"set Institute.state in the admin: {unmapped}"
+            ))
+
+        written = inserted + updated + deleted
+        elapsed = time.perf_counter() - started
+        rate = len(rows) / elapsed if elapsed > 0 else float("inf")
 
-            Cutoff.objects.create(
-                institute=institute,
-                program_name=prog_name,
-                quota=quota,
-                seat_type=seat_type,
-                gender=gender,
-                year=year,
-                opening_rank=opening_rank,
-                closing_rank=closing_rank,
+        self.stdout.write(
+            self.style.NOTICE(
+                f"Inserted={inserted}, Updated={updated}, Deleted={deleted} "
+                f"in {elapsed:.2f}s ({rate:,.0f} rows/sec)"
             )
-            created += 1
+        )
+
+        if states_filled:
+            self.stdout.write(self.style.NOTICE(f"Filled the state of {states_filled} institutes"))
+
+        if not written and not states_filled:
+            self.stdout.write(self.style.SUCCESS(f"Done. No changes, Skipped={skipped}"))
+            return
+
+        # write the shared snapshot + rank lookup for a new data version,
+        # then tell every worker to remap them
+        index = publish_cutoff_data()
+        self.stdout.write(self.style.NOTICE(f"Published data version {index.version}"))
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Done. Created={created}, Skipped={skipped}"
+                f"Done. Rows={len(rows)}, Skipped={skipped}"
             )
         )
+
+    def insert_rows(self, rows, institute_ids, year, round_no, batch_size):
+        Cutoff.objects.bulk_create(
+            (
+                Cutoff(
+                    institute_id=institute_ids[inst_name],
+                    program_name=prog_name,
+                    quota=quota,
+                    seat_type=seat_type,
+                    gender=gender,
+                    year=year,
+                    round=round_no,
+                    opening_rank=opening_rank,
+                    closing_rank=closing_rank,
+                )
+                for inst_name, prog_name, quota, seat_type, gender, opening_rank, closing_rank in rows
+            ),
+            batch_size=batch_size,
+        )
+        return len(rows)
+
+    def apply_delta(self, rows, institute_ids, year, round_no, batch_size):
+        """
+        Diff incoming rows against this year/round's Cutoff rows on the natural key
+        (institute, program_name, quota, seat_type, gender).
+        """
+        existing = {
+            (inst_id, prog_name, quota, seat_type, gender): (pk, opening_rank, closing_rank)
+            for pk, inst_id, prog_name, quota, seat_type, gender, opening_rank, closing_rank
+            in Cutoff.objects.filter(year=year, round=round_no).values_list(
+                "id",
+                "institute_id",
+                "program_name",
+                "quota",
+                "seat_type",
+                "gender",
+                "opening_rank",
+                "closing_rank",
+            ).iterator()
+        }
+
+        to_insert, to_update = [], []
+        for row in rows:
+            inst_name, prog_name, quota, seat_type, gender, opening_rank, closing_rank = row
+            key = (institute_ids[inst_name], prog_name, quota, seat_type, gender)
+            current = existing.pop(key, None)
+
+            if current is None:
+                to_insert.append(row)
+            elif current[1:] != (opening_rank, closing_rank):
+                to_update.append(
+                    Cutoff(id=current[0], opening_rank=opening_rank, closing_rank=closing_rank)
+                )
+
+        # whatever is left in `existing` is no longer in the CSV
+        stale_ids = [pk for pk, _, _ in existing.values()]
+
+        for i in range(0, len(stale_ids), batch_size):
+            Cutoff.objects.filter(id__in=stale_ids[i:i + batch_size]).delete()
+        Cutoff.objects.bulk_update(to_update, ["opening_rank", "closing_rank"], batch_size=batch_size)
+        self.insert_rows(to_insert, institute_ids, year, round_no, batch_size)
+
+        return len(to_insert), len(to_update), len(stale_ids)
@@ -0,0 +1,106 @@
+import csv
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from predictor import allocation, services
+from predictor.cutoff_index import get_cutoff_index
+
+
+class Command(BaseCommand):
+    help = "Simulate JoSAA seat allocation on a synthetic or uploaded cohort and write closing ranks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, default=None, help="Cutoff year (defaults to the latest)")
+        parser.add_argument("--round", type=int, default=None, help="Cutoff round (defaults to the latest)")
+        parser.add_argument("--cohort", type=str, default=None,
+                            help="CSV of rank, category, gender, home_state, preferences (default: synthetic)")
+        parser.add_argument("--students", type=int, default=1000000, help="Synthetic cohort size")
+        parser.add_argument("--choices", type=int, default=allocation.DEFAULT_CHOICES,
+                            help="Programs per synthetic student")
+        parser.add_argument("--seats", type=str, default=None, help="CSV of cutoff_id, seats")
+        parser.add_argument("--program-seats", type=int, default=allocation.DEFAULT_PROGRAM_SEATS,
+                            help="Intake per program when inferring seats")
+        parser.add_argument("--runs", type=int, default=1, help="Monte Carlo runs (synthetic cohorts)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Processes for Monte Carlo runs (1 = run in this process)")
+        parser.add_argument("--output", type=str, default="simulated_cutoffs.csv")
+
+    def handle(self, *args, **options):
+        index = get_cutoff_index()
+        year, round_no = services.resolve_year_round(index, options["year"], options["round"])
+
+        seats = allocation.load_seats(options["seats"]) if options["seats"] else None
+        buckets = allocation.Buckets.from_index(
+            index, year, round_no, program_seats=options["program_seats"], seats=seats,
+        )
+        if not len(buckets):
+            raise CommandError(f"No cutoff rows to simulate for year={year}, round={round_no}")
+
+        self.stdout.write(self.style.NOTICE(
+            f"{len(buckets)} buckets, {buckets.n_programs} programs, "
+            f"{int(buckets.capacity.sum())} seats (year={year}, round={round_no})"
+        ))
+
+        started = time.perf_counter()
+        if options["cohort"]:
+            cohort = allocation.Cohort.from_csv(options["cohort"], buckets)
+            result = allocation.simulate(buckets, cohort)
+            runs = np.where(result.filled > 0, result.closing, np.nan)[None, :]
+            self.stdout.write(f"  {len(cohort)} students, {int((result.assigned >= 0).sum())} allocated")
+        else:
+            seeds = [options["seed"] + i for i in range(options["runs"])]
+            args = (buckets, options["students"], options["choices"])
+            if options["workers"] <= 1 or len(seeds) == 1:
+                runs = [allocation.simulate_synthetic(*args, seed=seed) for seed in seeds]
+            else:
+                with ProcessPoolExecutor(max_workers=min(options["workers"], len(seeds))) as pool:
+                    runs = list(pool.map(
+                        allocation.simulate_synthetic,
+                        *zip(*[args] * len(seeds)),
+                        seeds,
+                    ))
+            runs = np.vstack(runs)
+        elapsed = time.perf_counter() - started
+
+        # buckets left empty in every run are NaN throughout
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            median = np.nanmedian(runs, axis=0)
+            low = np.nanpercentile(runs, 10, axis=0)
+            high = np.nanpercentile(runs, 90, axis=0)
+
+        self.write_output(options["output"], buckets, median, low, high)
+
+        filled = ~np.isnan(median)
+        error = np.abs(np.log(np.maximum(median[filled], 1) / np.maximum(buckets.closing_rank[filled], 1)))
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. {len(runs)} run(s) in {elapsed:.1f}s; {int(filled.sum())}/{len(buckets)} buckets filled; "
+            f"median |log(simulated / actual closing)| = {float(np.median(error)) if len(error) else 0:.2f}; "
+            f"wrote {options['output']}"
+        ))
+
+    def write_output(self, path, buckets, median, low, high):
+
+        def fmt(value):
+            return "" if np.isnan(value) else int(round(value))
+
+        with open(path, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow([
+                "cutoff_id", "institute", "program", "quota", "seat_type", "gender_female_only",
+                "seats", "actual_opening", "actual_closing",
+                "simulated_closing", "simulated_closing_p10", "simulated_closing_p90",
+            ])
+            for b in range(len(buckets)):
+                institute, program = buckets.program_names[buckets.program[b]]
+                writer.writerow([
+                    int(buckets.cutoff_id[b]), institute, program, buckets.quota[b], buckets.seat_type[b],
+                    int(buckets.female_only[b]), int(buckets.capacity[b]),
+                    int(buckets.opening_rank[b]), int(buckets.closing_rank[b]),
+                    fmt(median[b]), fmt(low[b]), fmt(high[b]),
+                ])
@@ -0,0 +1,75 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+# keys the predictor kept in the session before they moved to the state cookie
+LEGACY_KEYS = {
+    "can_see_all_colleges",
+    "last_prediction",
+    "last_colleges_rank",
+    "last_colleges_category",
+    "last_colleges_gender",
+    "last_colleges_year",
+    "last_colleges_round",
+    "last_colleges_home_state",
+}
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions in batches (and, with --legacy, sessions holding only old predictor state)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Sessions per DELETE statement, so the table is never locked for long",
+        )
+        parser.add_argument(
+            "--legacy",
+            action="store_true",
+            help="Also delete unexpired sessions whose only keys are the predictor's old "
+                 "unlock flag / last query, which now live in the state cookie",
+        )
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in ("django.contrib.sessions.backends.db",
+                                           "django.contrib.sessions.backends.cached_db"):
+            raise CommandError(f"Sessions are not stored in the database ({settings.SESSION_ENGINE})")
+
+        started = time.perf_counter()
+        expired = self.delete_in_batches(
+            Session.objects.filter(expire_date__lt=timezone.now()).values_list("session_key", flat=True),
+            options["batch_size"],
+        )
+        self.stdout.write(self.style.NOTICE(f"Expired sessions deleted: {expired}"))
+
+        legacy = 0
+        if options["legacy"]:
+            legacy = self.delete_in_batches(self.legacy_keys(options["batch_size"]), options["batch_size"])
+            self.stdout.write(self.style.NOTICE(f"Predictor-only sessions deleted: {legacy}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. Deleted {expired + legacy} sessions in {time.perf_counter() - started:.2f}s, "
+            f"{Session.objects.count()} left"
+        ))
+
+    def legacy_keys(self, batch_size):
+        for session in Session.objects.only("session_key", "session_data").iterator(chunk_size=batch_size):
+            # set_expiry() keeps its own key in the data
+            keys = set(session.get_decoded()) - {"_session_expiry"}
+            if keys and keys <= LEGACY_KEYS:
+                yield session.session_key
+
+    def delete_in_batches(self, keys, batch_size):
+        # keys are collected first: deleting while a cursor over the same
+        # table is open is not safe on every backend
+        keys = list(keys)
+        deleted = 0
+        for i in range(0, len(keys), batch_size):
+            deleted += Session.objects.filter(session_key__in=keys[i:i + batch_size]).delete()[0]
+        return deleted
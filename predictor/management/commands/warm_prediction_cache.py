@@ -0,0 +1,126 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from predictor import services
+from predictor.codes import CATEGORIES, GENDERS
+from predictor.cutoff_index import get_cutoff_index
+from predictor.marks_engine import get_marks_engine
+from predictor.rank_lookup import get_rank_lookup
+from predictor.search import get_search_index
+
+
+def warm_marks(year, round_no, category, gender, marks_values):
+    """
+    Fill the cache for home(): every marks value for one category/gender.
+    """
+    engine = get_marks_engine()
+    warmed = 0
+    for marks in marks_values:
+        estimate = engine.estimate(marks)
+        if estimate is None:
+            continue
+        services.predict_chances(year, round_no, category, gender, estimate)
+        warmed += 1
+    return warmed
+
+
+def warm_ranks(year, round_no, category, gender, ranks):
+    """
+    Fill the cache for colleges(): a list of ranks for one category/gender.
+    Entries are keyed on the rank lookup segment, so one rank per segment
+    covers every rank in it.
+    """
+    for rank in ranks:
+        services.predict_rank(year, round_no, category, gender, rank)
+    return len(ranks)
+
+
+class Command(BaseCommand):
+    help = "Precompute predictor results for every marks value and rank segment"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, default=None, help="Defaults to the latest year")
+        parser.add_argument("--round", type=int, default=None, help="Defaults to the latest round")
+        parser.add_argument("--max-rank", type=int, default=200000)
+        parser.add_argument(
+            "--rank-step",
+            type=int,
+            default=100,
+            help="Unused: ranks are warmed at every rank lookup segment boundary",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Worker processes (1 = run in this process)",
+        )
+
+    def handle(self, *args, **options):
+        backend = settings.CACHES[getattr(settings, "PREDICTION_CACHE_ALIAS", "default")]["BACKEND"]
+        if backend.endswith("LocMemCache"):
+            self.stdout.write(self.style.WARNING(
+                "Prediction cache uses LocMemCache, which is private to each process; "
+                "set CACHE_DIR (or a shared cache backend) so web workers see the warmed entries."
+            ))
+
+        # build the in-memory structures once, before forking, so workers
+        # inherit them instead of each querying the database
+        index = get_cutoff_index()
+        get_marks_engine()
+        get_search_index(index)
+        lookup = get_rank_lookup(index)
+        year, round_no = services.resolve_year_round(index, options["year"], options["round"])
+
+        marks_values = list(range(0, 301))
+        chunk = 500
+
+        tasks = []
+        for category in CATEGORIES:
+            for gender in GENDERS:
+                tasks.append((warm_marks, (year, round_no, category, gender, marks_values)))
+                # rank 1 plus every segment start reaches every cached entry
+                boundaries = lookup.boundaries(
+                    index, year, round_no, services.PREDICTOR_QUOTAS, category, gender,
+                )
+                ranks = [1] + [rank for rank in boundaries if 1 < rank <= options["max_rank"]]
+                for i in range(0, len(ranks), chunk):
+                    tasks.append((warm_ranks, (year, round_no, category, gender, ranks[i:i + chunk])))
+
+        self.stdout.write(self.style.NOTICE(
+            f"Warming {len(tasks)} tasks for year={year}, round={round_no} "
+            f"with {options['workers']} worker(s)"
+        ))
+
+        started = time.perf_counter()
+        warmed = 0
+        report_every = max(1, len(tasks) // 10)
+
+        def report(done):
+            if done % report_every and done != len(tasks):
+                return
+            elapsed = time.perf_counter() - started
+            rate = warmed / elapsed if elapsed > 0 else 0.0
+            self.stdout.write(f"  {done}/{len(tasks)} tasks, {warmed} entries ({rate:,.0f}/sec)")
+
+        if options["workers"] <= 1:
+            for done, (func, args) in enumerate(tasks, start=1):
+                warmed += func(*args)
+                report(done)
+        else:
+            # forked children must not share the parent's DB connection
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+                futures = [pool.submit(func, *args) for func, args in tasks]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    warmed += future.result()
+                    report(done)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. Warmed {warmed} entries in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,180 @@
+"""
+Marks -> percentile -> rank engine.
+
+All MarksBand rows are loaded once per worker into sorted NumPy arrays.
+A lookup bisects on min_marks and then interpolates linearly inside the
+band, so every mark value gets its own rank estimate instead of the band
+midpoint. The likely range is the estimate at marks +/- MARKS_MARGIN
+(one question's worth of marks either way).
+
+estimate_many() does the same for a whole array of marks in one
+vectorised pass, for batch scoring and what-if sweeps.
+"""
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from .cutoff_index import data_version
+from .metrics import timed
+from .models import MarksBand
+
+
+# one JEE Main question is +4 marks
+MARKS_MARGIN = 4
+
+MarksEstimate = namedtuple(
+    "MarksEstimate",
+    [
+        "marks",
+        "percentile",
+        "min_rank",      # band bounds, as stored
+        "max_rank",
+        "approx_rank",   # interpolated estimate
+        "rank_low",      # likely range (better rank first)
+        "rank_high",
+    ],
+)
+
+
+class MarksEngine:
+    def __init__(self, bands, version="0"):
+        bands = sorted(bands, key=lambda b: b[0])
+
+        self.version = version
+        self.min_marks = np.array([b[0] for b in bands], dtype=np.float64)
+        self.max_marks = np.array([b[1] for b in bands], dtype=np.float64)
+        self.percentile = np.array([b[2] for b in bands], dtype=np.float64)
+        self.min_rank = np.array([b[3] for b in bands], dtype=np.int64)
+        self.max_rank = np.array([b[4] for b in bands], dtype=np.int64)
+
+        if len(bands):
+            # Python floats compare exactly with ints of any size (covers())
+            self.lowest_marks = float(self.min_marks[0])
+            self.highest_marks = float(self.max_marks.max())
+
+    @classmethod
+    def build(cls, version="0"):
+        rows = MarksBand.objects.values_list(
+            "min_marks", "max_marks", "percentile", "min_rank", "max_rank"
+        )
+        return cls(list(rows), version=version)
+
+    def _band_positions(self, marks):
+        """
+        Band index for each mark value, -1 where no band covers it.
+        """
+        pos = np.searchsorted(self.min_marks, marks, side="right") - 1
+        inside = pos >= 0
+        safe = np.where(inside, pos, 0)
+        inside &= marks <= self.max_marks[safe]
+        return np.where(inside, pos, -1)
+
+    def _rank_at(self, marks, pos):
+        """
+        Linear interpolation inside each band: the band's top marks map to
+        min_rank, its bottom marks to max_rank.
+        """
+        lo, hi = self.min_marks[pos], self.max_marks[pos]
+        t = (marks - lo + 0.5) / (hi - lo + 1.0)
+        return self.max_rank[pos] - t * (self.max_rank[pos] - self.min_rank[pos])
+
+    def estimate_many(self, marks):
+        """
+        Vectorised estimates for an array of marks.
+
+        Returns a dict of arrays: valid, percentile, min_rank, max_rank,
+        approx_rank, rank_low, rank_high. Entries where `valid` is False
+        (marks outside every band) are zero.
+        """
+        marks = np.asarray(marks, dtype=np.float64)
+        n = marks.shape
+        if not len(self.min_marks):
+            zeros = np.zeros(n, dtype=np.int64)
+            return {
+                "valid": np.zeros(n, dtype=bool),
+                "percentile": np.zeros(n),
+                "min_rank": zeros,
+                "max_rank": zeros,
+                "approx_rank": zeros,
+                "rank_low": zeros,
+                "rank_high": zeros,
+            }
+
+        pos = self._band_positions(marks)
+        valid = pos >= 0
+        safe = np.where(valid, pos, 0)
+
+        approx = self._rank_at(marks, safe)
+
+        # likely range: estimate one question's marks either way,
+        # clamped to the marks the bands actually cover
+        upper = np.clip(marks + MARKS_MARGIN, self.lowest_marks, self.highest_marks)
+        lower = np.clip(marks - MARKS_MARGIN, self.lowest_marks, self.highest_marks)
+        upper_pos, lower_pos = self._band_positions(upper), self._band_positions(lower)
+        rank_low = np.where(upper_pos >= 0, self._rank_at(upper, np.maximum(upper_pos, 0)), approx)
+        rank_high = np.where(lower_pos >= 0, self._rank_at(lower, np.maximum(lower_pos, 0)), approx)
+
+        def as_rank(values):
+            return np.where(valid, np.maximum(np.rint(values), 1), 0).astype(np.int64)
+
+        return {
+            "valid": valid,
+            "percentile": np.where(valid, self.percentile[safe], 0.0),
+            "min_rank": np.where(valid, self.min_rank[safe], 0),
+            "max_rank": np.where(valid, self.max_rank[safe], 0),
+            "approx_rank": as_rank(approx),
+            "rank_low": as_rank(np.minimum(rank_low, approx)),
+            "rank_high": as_rank(np.maximum(rank_high, approx)),
+        }
+
+    def covers(self, marks):
+        """
+        Whether `marks` lies within the bands' overall range. Compares
+        exactly, so an int of any size is safe (estimate_many would
+        overflow converting it to float).
+        """
+        return bool(len(self.min_marks)) and self.lowest_marks <= marks <= self.highest_marks
+
+    def estimate(self, marks):
+        """
+        MarksEstimate for a single mark value, or None if out of range.
+        """
+        if not self.covers(marks):
+            return None
+        with timed("marks"):
+            result = self.estimate_many([marks])
+        if not result["valid"][0]:
+            return None
+
+        return MarksEstimate(
+            marks=marks,
+            percentile=float(result["percentile"][0]),
+            min_rank=int(result["min_rank"][0]),
+            max_rank=int(result["max_rank"][0]),
+            approx_rank=int(result["approx_rank"][0]),
+            rank_low=int(result["rank_low"][0]),
+            rank_high=int(result["rank_high"][0]),
+        )
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_marks_engine():
+    """
+    Return this worker's MarksEngine, rebuilt when the data version changes.
+    """
+    global _engine
+
+    version = data_version()
+    engine = _engine
+    if engine is not None and engine.version == version:
+        return engine
+
+    with _engine_lock:
+        if _engine is None or _engine.version != version:
+            _engine = MarksEngine.build(version=version)
+        return _engine
+
@@ -0,0 +1,231 @@
+"""
+Per-request hot-path timings, in-process histograms and a Prometheus
+text exposition.
+
+MetricsMiddleware opens a RequestTimings for every request. Code on the
+predictor paths adds to it with timed(stage):
+
+    marks    marks -> rank estimate (MarksEngine.estimate)
+    query    cutoff query: result cache lookup or index/lookup computation,
+             plus building the rows
+    group    grouping rows by institute
+    render   template rendering
+    session  session save (TimedSessionMiddleware)
+    db       every SQL statement, with the statement count, through a
+             connection execute wrapper
+
+Outside a request timed() does nothing but a context variable lookup, so
+management commands pay nothing. At the end of a request the totals go
+into fixed-bucket histograms (one lock, a handful of bisects) and into a
+Server-Timing header, which browser dev tools show per request.
+
+Histograms are per worker process, like result_cache stats: each
+gunicorn worker exposes its own /metrics, and Prometheus sums them.
+They are readable by staff users and by scrapers holding METRICS_TOKEN
+only (metrics_access_required).
+"""
+import bisect
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import connection
+from django.http import HttpResponseForbidden
+
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+STAGES = ["marks", "query", "group", "render", "session", "db"]
+
+_current = ContextVar("predictor_request_timings", default=None)
+
+
+class RequestTimings:
+    __slots__ = ("stages", "queries")
+
+    def __init__(self):
+        self.stages = {}
+        self.queries = 0
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add("db", time.perf_counter() - started)
+            self.queries += 1
+
+    def server_timing(self, total):
+        """
+        Server-Timing header value; durations in milliseconds.
+        """
+        parts = [
+            f"{stage};dur={self.stages[stage] * 1000:.2f}" + (
+                f';desc="{self.queries} queries"' if stage == "db" else ""
+            )
+            for stage in STAGES if stage in self.stages
+        ]
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+@contextmanager
+def timed(stage):
+    """
+    Add the time spent in the block to the current request's `stage`.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage, time.perf_counter() - started)
+
+
+# -- histograms ------------------------------------------------------------
+
+class Histogram:
+    """
+    Cumulative-bucket histogram per label value, Prometheus style.
+    """
+
+    def __init__(self, name, help_text, label, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self.series = {}  # label value -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, label_value, value):
+        series = self.series.get(label_value)
+        if series is None:
+            series = self.series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_value, series in sorted(self.series.items()):
+            label = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.request_seconds = Histogram(
+                "predictor_request_duration_seconds", "Request latency by view.", "view", SECONDS_BUCKETS,
+            )
+            self.stage_seconds = Histogram(
+                "predictor_stage_duration_seconds", "Time per request spent in each hot-path stage.",
+                "stage", SECONDS_BUCKETS,
+            )
+            self.db_queries = Histogram(
+                "predictor_db_queries_per_request", "SQL statements per request by view.", "view", QUERY_BUCKETS,
+            )
+            self.responses = {}  # (view, status) -> count
+
+    def observe_request(self, view, status, total, timings):
+        with self._lock:
+            self.request_seconds.observe(view, total)
+            self.db_queries.observe(view, timings.queries)
+            for stage, seconds in timings.stages.items():
+                self.stage_seconds.observe(stage, seconds)
+            key = (view, status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def exposition(self, extra=()):
+        with self._lock:
+            lines = []
+            for histogram in (self.request_seconds, self.stage_seconds, self.db_queries):
+                lines += histogram.exposition()
+            lines += ["# HELP predictor_responses_total Responses by view and status.",
+                      "# TYPE predictor_responses_total counter"]
+            for (view, status), count in sorted(self.responses.items()):
+                lines.append(f'predictor_responses_total{{view="{view}",status="{status}"}} {count}')
+        return "\n".join(lines + list(extra)) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def metrics_access_required(view):
+    """
+    Let staff users and "Authorization: Bearer <METRICS_TOKEN>" through;
+    everyone else gets a 403.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = getattr(settings, "METRICS_TOKEN", "")
+        sent = request.META.get("HTTP_AUTHORIZATION", "")
+        if request.user.is_staff or (token and hmac.compare_digest(sent, f"Bearer {token}")):
+            return view(request, *args, **kwargs)
+        return HttpResponseForbidden("Metrics are restricted.")
+    return wrapper
+
+
+# -- middleware ------------------------------------------------------------
+
+def has_public_cache_control(response):
+    return "public" in (v.strip() for v in response.get("Cache-Control", "").lower().split(","))
+
+
+class MetricsMiddleware:
+    """
+    Times every request; list it first in MIDDLEWARE after the static file
+    middleware, so it covers the session and everything inside.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, "SERVER_TIMING_HEADER", settings.DEBUG)
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timings.execute_wrapper):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        registry.observe_request(getattr(match, "url_name", None) or "unmatched", response.status_code, total, timings)
+        # per-request timings must not end up in a shared cache
+        if self.server_timing and not has_public_cache_control(response):
+            response["Server-Timing"] = timings.server_timing(total)
+        return response
+
+
+class TimedSessionMiddleware(SessionMiddleware):
+    """
+    SessionMiddleware with the session save timed as the "session" stage.
+    """
+
+    def process_response(self, request, response):
+        with timed("session"):
+            return super().process_response(request, response)
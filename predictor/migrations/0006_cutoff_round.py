@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictor', '0005_lead'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cutoff',
+            name='predictor_c_year_39d004_idx',
+        ),
+        migrations.AddField(
+            model_name='cutoff',
+            name='round',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Round 1'), (2, 'Round 2'), (3, 'Round 3'), (4, 'Round 4'), (5, 'Round 5'), (6, 'Round 6'), (7, 'CSAB')], default=6),
+        ),
+        migrations.AddIndex(
+            model_name='cutoff',
+            index=models.Index(fields=['year', 'round', 'institute', 'program_name', 'quota', 'seat_type', 'gender'], name='predictor_c_year_6d2e8a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cutoff',
+            index=models.Index(fields=['year', 'round', 'quota', 'seat_type', 'gender', 'closing_rank'], name='cutoff_slice_closing_idx'),
+        ),
+    ]
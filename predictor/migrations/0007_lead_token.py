@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictor', '0006_cutoff_round'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='token',
+            field=models.CharField(blank=True, db_index=True, max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='lead',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['phone', 'created_at'], name='lead_phone_created_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class MarksBand(models.Model):
@@ -36,6 +37,11 @@ class Institute(models.Model):
 
 
 class Cutoff(models.Model):
+    # JoSAA rounds 1-6, then CSAB special round
+    ROUND_CSAB = 7
+    ROUND_CHOICES = [(n, f"Round {n}") for n in range(1, 7)] + [(ROUND_CSAB, "CSAB")]
+    FINAL_JOSAA_ROUND = 6
+
     institute = models.ForeignKey(Institute, on_delete=models.CASCADE)
     program_name = models.CharField(max_length=255)
     quota = models.CharField(max_length=20)          # AI, HS, OS, etc.
@@ -44,12 +50,14 @@ class Cutoff(models.Model):
     opening_rank = models.IntegerField()
     closing_rank = models.IntegerField()
     year = models.IntegerField(default=2025)
+    round = models.PositiveSmallIntegerField(choices=ROUND_CHOICES, default=FINAL_JOSAA_ROUND)
 
     class Meta:
         indexes = [
             models.Index(
                 fields=[
                     'year',
+                    'round',
                     'institute',
                     'program_name',
                     'quota',
@@ -57,6 +65,18 @@ class Cutoff(models.Model):
                     'gender',
                 ]
             ),
+            # predictor access path: one slice, then a closing_rank range
+            models.Index(
+                fields=[
+                    'year',
+                    'round',
+                    'quota',
+                    'seat_type',
+                    'gender',
+                    'closing_rank',
+                ],
+                name='cutoff_slice_closing_idx',
+            ),
         ]
 
     def __str__(self):
@@ -89,7 +109,28 @@ class Lead(models.Model):
     otp_code = models.CharField(max_length=10, blank=True)
     otp_verified = models.BooleanField(default=False)
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    # id of the queued capture event (lead_queue.py); blank for older rows
+    token = models.CharField(max_length=32, blank=True, db_index=True)
+    # capture time, set when the lead is queued rather than when it is drained
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # lead_queue dedupe: same phone within a time window
+            models.Index(fields=["phone", "created_at"], name="lead_phone_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.phone})"
+
+
+class LeadAlias(models.Model):
+    """
+    Token of a queued lead dropped as a duplicate (lead_queue.py), kept so
+    its later "verified" event still reaches the lead it repeated.
+    """
+    token = models.CharField(max_length=32, unique=True)
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name="aliases")
+
+    def __str__(self):
+        return f"{self.token} -> {self.lead_id}"
@@ -0,0 +1,228 @@
+"""
+Sampling profiler for live workers, pure Python and off until asked.
+
+A StackSampler thread wakes every `interval` seconds, reads the other
+threads' current frames with sys._current_frames() and counts each stack
+as one collapsed line (root;...;leaf), the input of flamegraph.pl and
+speedscope. The root frame is the view the thread was serving, from the
+thread -> view map ProfilingMiddleware keeps, in brackets, so a
+flamegraph splits by view. A capture can be started three ways:
+
+    signal       kill -USR2 <worker pid> samples that worker for
+                 PROFILE_SECONDS in a background thread (PROFILE_SIGNAL);
+                 the way in for gunicorn's sync workers
+    endpoint     /profile/?seconds=N (staff only) samples the worker serving
+                 it, for threaded workers
+    per request  an X-Profile header on home/colleges (staff, or DEBUG)
+                 samples just that request's thread
+
+Each capture writes <name>.collapsed and a <name>.json summary (samples
+per view and the hottest leaf functions) to PROFILE_DIR. Between captures
+the only cost is one dict store per request.
+"""
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+
+DEFAULT_INTERVAL = 0.005
+REQUEST_INTERVAL = 0.001
+MAX_DEPTH = 128
+MAX_SECONDS = 60
+TOP_FUNCTIONS = 15
+NO_REQUEST = "no request"
+
+# thread ident -> url name of the request it is serving
+_thread_views = {}
+_labels = {}
+_capture_lock = threading.Lock()
+
+
+def frame_label(code):
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename.replace(os.sep, "/").rsplit("/", 2)
+        label = _labels[code] = f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+    return label
+
+
+class StackSampler:
+    """
+    Samples the stacks of every thread but its own (or only `thread_id`).
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, thread_id=None, exclude=()):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.exclude = set(exclude)
+        self.stacks = Counter()   # collapsed stack -> samples
+        self.views = Counter()    # view -> samples
+        self.leaves = Counter()   # (view, leaf function) -> samples
+        self.samples = 0
+        self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self._started
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(own)
+
+    def sample(self, own):
+        for ident, frame in sys._current_frames().items():
+            if ident == own or ident in self.exclude:
+                continue
+            if self.thread_id is not None and ident != self.thread_id:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            view = _thread_views.get(ident, NO_REQUEST)
+            stack.append(f"[{view}]")
+            self.stacks[";".join(reversed(stack))] += 1
+            self.views[view] += 1
+            self.leaves[view, stack[0]] += 1
+            self.samples += 1
+
+    def summary(self):
+        views = {}
+        for view, count in self.views.most_common():
+            top = [(leaf, n) for (v, leaf), n in self.leaves.most_common() if v == view][:TOP_FUNCTIONS]
+            views[view] = {
+                "samples": count,
+                "share": round(count / self.samples, 4),
+                "top": [{"function": leaf, "samples": n} for leaf, n in top],
+            }
+        return {
+            "pid": os.getpid(),
+            "seconds": round(self.seconds, 3),
+            "interval": self.interval,
+            "samples": self.samples,
+            "views": views,
+        }
+
+    def write(self, name):
+        """
+        Write <name>.collapsed and <name>.json to PROFILE_DIR; returns the
+        summary with both paths added.
+        """
+        directory = profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, name)
+        with open(f"{base}.collapsed", "w") as fh:
+            fh.writelines(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+        summary = self.summary()
+        summary["files"] = [f"{base}.collapsed", f"{base}.json"]
+        with open(f"{base}.json", "w") as fh:
+            json.dump(summary, fh, indent=2)
+        return summary
+
+
+def profile_dir():
+    return str(getattr(settings, "PROFILE_DIR", settings.BASE_DIR / "profiles"))
+
+
+def capture_name(kind):
+    return f"{kind}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10 ** 6:06d}"
+
+
+def capture(seconds, interval=DEFAULT_INTERVAL):
+    """
+    Sample this worker's other threads for `seconds` and write the files;
+    returns the summary, or None when another capture is already running.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        return None
+    try:
+        # the calling thread only sleeps meanwhile
+        sampler = StackSampler(interval, exclude={threading.get_ident()}).start()
+        time.sleep(min(seconds, MAX_SECONDS))
+        return sampler.stop().write(capture_name("worker"))
+    finally:
+        _capture_lock.release()
+
+
+def _on_signal(signum, frame):
+    # keep the handler short: the capture runs in its own thread
+    seconds = getattr(settings, "PROFILE_SECONDS", 10)
+    threading.Thread(target=capture, args=(seconds,), name="profile-capture", daemon=True).start()
+
+
+def install_signal_handler():
+    """
+    Start a capture on settings.PROFILE_SIGNAL (e.g. "SIGUSR2"); called
+    from AppConfig.ready(). Signal handlers can only be set from the main
+    thread, so this is a no-op elsewhere.
+    """
+    name = getattr(settings, "PROFILE_SIGNAL", "")
+    if not name or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(getattr(signal, name), _on_signal)
+    return True
+
+
+class ProfilingMiddleware:
+    """
+    Tags each request's thread with its view for worker captures, and
+    profiles single home/colleges requests sent with an X-Profile header.
+    List it after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.request_views = set(getattr(settings, "PROFILE_REQUEST_VIEWS", ("home", "colleges")))
+
+    def __call__(self, request):
+        ident = threading.get_ident()
+        request._profile_sampler = None
+        try:
+            response = self.get_response(request)
+        finally:
+            _thread_views.pop(ident, None)
+            sampler = request._profile_sampler
+            if sampler is not None:
+                sampler.stop()
+                sys.setswitchinterval(request._profile_switch)
+
+        if sampler is not None:
+            summary = sampler.write(capture_name(f"request-{request.resolver_match.url_name}"))
+            response["X-Profile-File"] = os.path.basename(summary["files"][0])
+            response["X-Profile-Samples"] = str(summary["samples"])
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = request.resolver_match.url_name or view_func.__name__
+        _thread_views[threading.get_ident()] = view
+
+        if (
+            "HTTP_X_PROFILE" in request.META
+            and view in self.request_views
+            and (settings.DEBUG or request.user.is_staff)
+        ):
+            # a shorter GIL switch interval lets the sampler thread in
+            # about every REQUEST_INTERVAL instead of every 5ms
+            request._profile_switch = sys.getswitchinterval()
+            sys.setswitchinterval(REQUEST_INTERVAL)
+            request._profile_sampler = StackSampler(
+                REQUEST_INTERVAL, thread_id=threading.get_ident(),
+            ).start()
+        return None
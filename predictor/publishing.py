@@ -0,0 +1,67 @@
+"""
+Publishing a new cutoff data version.
+
+Everything workers load for a version (the mmapped snapshot and the rank
+lookup table) is written first, under the new version, and only then is
+the data version stamp bumped. Workers that notice the bump therefore
+always find matching files and never fall back to the database.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from .cutoff_index import CutoffIndex, bump_data_version, new_data_version, snapshot_file
+from .rank_lookup import build_rank_lookup
+from .snapshot import CutoffColumns, write_snapshot
+
+
+def publish_cutoff_data():
+    """
+    Snapshot the current Cutoff table under a new data version, build its
+    rank lookup, then bump the stamp. Returns the new CutoffIndex.
+    """
+    version = new_data_version()
+    index = CutoffIndex(CutoffColumns.from_database(version=version))
+
+    write_snapshot(index.columns, snapshot_file())
+    build_rank_lookup(index=index)
+    bump_data_version(version)
+
+    return index
+
+
+_caller_publishes = threading.local()
+
+
+@contextmanager
+def published_by_caller():
+    """
+    Model signals do not publish inside the block: for commands that
+    write cutoffs in bulk and call publish_cutoff_data() once at the end.
+    """
+    _caller_publishes.depth = getattr(_caller_publishes, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _caller_publishes.depth -= 1
+
+
+def _publish():
+    publish_cutoff_data()
+
+
+def publish_on_commit():
+    """
+    Publish once when the current transaction commits, however many rows
+    it changed: an admin bulk edit or a loaddata of N bands rebuilds the
+    snapshot once, not N times. Outside a transaction, publish now.
+    """
+    if getattr(_caller_publishes, "depth", 0):
+        return
+    connection = transaction.get_connection()
+    # run_on_commit is cleared (or cut back to a savepoint) on rollback,
+    # so a rolled-back change leaves nothing scheduled
+    if any(entry[1] is _publish for entry in connection.run_on_commit):
+        return
+    transaction.on_commit(_publish)
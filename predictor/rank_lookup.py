@@ -0,0 +1,292 @@
+"""
+Precomputed rank -> eligible programs table for the browse page.
+
+For one (year, round, quota, seat_type, gender) slice the set of programs
+with opening_rank <= rank <= closing_rank only changes at opening ranks and
+just past closing ranks. We cut the rank axis at those breakpoints and
+store what changes at each one, plus the full active set every
+CHECKPOINT_EVERY breakpoints so a lookup never replays far:
+
+    bounds        int32  breakpoint ranks, ascending
+    enters        int32  row positions whose opening_rank is the breakpoint
+    leaves        int32  row positions whose closing_rank + 1 is the breakpoint
+    checks        int32  active row positions at every CHECKPOINT_EVERY-th
+                         breakpoint, concatenated
+
+each with an int64 *_offsets array (entry i owns arr[offsets[i]:offsets[i + 1]]).
+Row positions point into the cutoff index and are valid for the table's
+data version; storage is O(rows + rows * breakpoints / CHECKPOINT_EVERY)
+instead of one full copy of the active set per segment.
+
+A lookup is one bisect, a checkpoint slice and at most
+CHECKPOINT_EVERY - 1 deltas. The table is built from the in-memory
+cutoff index, saved to settings.RANK_LOOKUP_FILE by the build_rank_lookup
+command (run automatically after an import), and loaded once per worker.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .cutoff_index import get_cutoff_index
+
+
+# keys are CutoffIndex.group_key() integer tuples since format 2;
+# delta + checkpoint segments since format 3
+LOOKUP_FORMAT = 3
+
+# breakpoints between stored active sets
+CHECKPOINT_EVERY = 64
+
+
+def _grouped(ids, slots, count):
+    """
+    `ids` bucketed by `slots` (0..count-1) as (offsets, concatenated ids),
+    keeping the original order inside each bucket.
+    """
+    order = np.argsort(slots, kind="stable")
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(slots, minlength=count), out=offsets[1:])
+    return offsets, ids[order]
+
+
+class _Segments:
+    FIELDS = (
+        "bounds", "enter_offsets", "enters", "leave_offsets", "leaves",
+        "check_offsets", "checks",
+    )
+    __slots__ = FIELDS
+
+    def __init__(self, bounds, enter_offsets, enters, leave_offsets, leaves,
+                 check_offsets, checks):
+        self.bounds = bounds
+        self.enter_offsets = enter_offsets
+        self.enters = enters
+        self.leave_offsets = leave_offsets
+        self.leaves = leaves
+        self.check_offsets = check_offsets
+        self.checks = checks
+
+    @classmethod
+    def from_group(cls, group):
+        opening = np.asarray(group.opening, dtype=np.int64)
+        closing = np.asarray(group.closing, dtype=np.int64)
+        ids = np.arange(group.start, group.end, dtype=np.int32)
+
+        bounds = np.unique(np.concatenate([opening, closing + 1]))
+        count = len(bounds)
+
+        # inverted rows (opening_rank > closing_rank) are never active and
+        # would otherwise leave before they enter
+        valid = opening <= closing
+        enter_offsets, enters = _grouped(
+            ids[valid], np.searchsorted(bounds, opening[valid]), count,
+        )
+        leave_offsets, leaves = _grouped(
+            ids[valid], np.searchsorted(bounds, closing[valid] + 1), count,
+        )
+
+        chunks = [
+            ids[(opening <= b) & (closing >= b)] for b in bounds[::CHECKPOINT_EVERY]
+        ]
+        check_offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in chunks], out=check_offsets[1:])
+
+        return cls(
+            bounds.astype(np.int32),
+            enter_offsets, enters, leave_offsets, leaves,
+            check_offsets, np.concatenate(chunks) if chunks else ids[:0],
+        )
+
+    @property
+    def stored_ids(self):
+        return len(self.enters) + len(self.leaves) + len(self.checks)
+
+    def segment(self, rank):
+        """
+        Index of the segment holding `rank`, -1 before the first breakpoint.
+        """
+        return int(np.searchsorted(self.bounds, rank, side="right")) - 1
+
+    def ids_for(self, rank):
+        i = self.segment(rank)
+        if i < 0:
+            return self.checks[:0]
+
+        c = i // CHECKPOINT_EVERY
+        active = self.checks[self.check_offsets[c]:self.check_offsets[c + 1]]
+        first = c * CHECKPOINT_EVERY + 1
+        if first > i:
+            return active
+
+        # every row enters and leaves at most once, so replaying the deltas
+        # after the checkpoint is a union of enters minus the leaves
+        entered = self.enters[self.enter_offsets[first]:self.enter_offsets[i + 1]]
+        left = self.leaves[self.leave_offsets[first]:self.leave_offsets[i + 1]]
+        active = np.concatenate([active, entered])
+        if len(left):
+            active = active[~np.isin(active, left)]
+
+        # positions are in (closing_rank, id) order within the group
+        return np.sort(active)
+
+
+class RankLookup:
+    """
+    Breakpoint segments for every cutoff slice of one data version.
+    """
+
+    def __init__(self, segments, version="0"):
+        self.segments = segments
+        self.version = version
+
+    @classmethod
+    def from_index(cls, index):
+        segments = {
+            key: _Segments.from_group(group) for key, group in index.groups.items()
+        }
+        return cls(segments, version=index.version)
+
+    # -- persistence ------------------------------------------------------
+
+    def save(self, path):
+        keys = list(self.segments)
+        arrays = {}
+        for i, key in enumerate(keys):
+            seg = self.segments[key]
+            for field in _Segments.FIELDS:
+                arrays[f"{field}_{i}"] = getattr(seg, field)
+
+        meta = json.dumps({
+            "format": LOOKUP_FORMAT, "checkpoint_every": CHECKPOINT_EVERY,
+            "version": self.version, "keys": keys,
+        })
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, meta=np.array(meta), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("format") != LOOKUP_FORMAT:
+                raise ValueError(f"{path} is an older rank lookup format")
+            if meta.get("checkpoint_every") != CHECKPOINT_EVERY:
+                raise ValueError(f"{path} was built with a different checkpoint spacing")
+            segments = {
+                tuple(key): _Segments(*(data[f"{field}_{i}"] for field in _Segments.FIELDS))
+                for i, key in enumerate(meta["keys"])
+            }
+        return cls(segments, version=meta["version"])
+
+    # -- lookups ----------------------------------------------------------
+
+    def _slices(self, index, year, round, quotas, seat_type, gender, home_state=""):
+        for quota, allowed in index.quota_filters(quotas, home_state):
+            seg = self.segments.get(index.group_key(year, round, quota, seat_type, gender))
+            if seg is not None:
+                yield seg, allowed
+
+    def segment_key(self, index, year, round, quotas, seat_type, gender, rank, home_state=""):
+        """
+        Segment of `rank` in each slice the query reads: ranks with the same
+        key get the same positions_containing() result.
+        """
+        return tuple(
+            seg.segment(rank)
+            for seg, _ in self._slices(index, year, round, quotas, seat_type, gender, home_state)
+        )
+
+    def boundaries(self, index, year, round, quotas, seat_type, gender, home_state=""):
+        """
+        Sorted ranks where segment_key() changes for this query.
+        """
+        bounds = [
+            seg.bounds
+            for seg, _ in self._slices(index, year, round, quotas, seat_type, gender, home_state)
+        ]
+        if not bounds:
+            return []
+        return np.unique(np.concatenate(bounds)).tolist()
+
+    def positions_containing(self, index, year, round, quotas, seat_type, gender, rank,
+                             limit=None, home_state="", after=None):
+        """
+        Same positions as CutoffIndex.overlapping_positions(rank, rank),
+        served from the segments.
+        """
+        parts = []
+        for seg, allowed in self._slices(index, year, round, quotas, seat_type, gender, home_state):
+            ids = index.after(seg.ids_for(rank), after)
+            parts.append(index.filter_institutes(ids, allowed)[:limit])
+
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        if len(parts) == 1:
+            return parts[0]
+
+        merged = index.sort_positions(np.concatenate(parts))
+        return merged[:limit] if limit is not None else merged
+
+    def containing(self, index, year, round, quotas, seat_type, gender, rank,
+                   limit=None, home_state="", after=None):
+        """
+        Same rows as CutoffIndex.containing(), served from the segments.
+        """
+        return index.rows(self.positions_containing(
+            index, year, round, quotas, seat_type, gender, rank, limit, home_state, after,
+        ))
+
+
+def _lookup_file():
+    return getattr(
+        settings,
+        "RANK_LOOKUP_FILE",
+        os.path.join(settings.BASE_DIR, "rank_lookup.npz"),
+    )
+
+
+def build_rank_lookup(save=True, index=None):
+    """
+    Build the table for `index` (default: the current one), optionally
+    writing it to settings.RANK_LOOKUP_FILE for other workers to load.
+    """
+    lookup = RankLookup.from_index(index or get_cutoff_index())
+    if save:
+        lookup.save(_lookup_file())
+    return lookup
+
+
+_lookup = None
+_lookup_lock = threading.Lock()
+
+
+def get_rank_lookup(index=None):
+    """
+    Return this worker's RankLookup matching `index` (default: the current
+    cutoff index): the saved file when its version matches, otherwise a
+    fresh in-memory build.
+    """
+    global _lookup
+
+    index = index or get_cutoff_index()
+    version = index.version
+    lookup = _lookup
+    if lookup is not None and lookup.version == version:
+        return lookup
+
+    with _lookup_lock:
+        if _lookup is None or _lookup.version != version:
+            lookup = None
+            path = _lookup_file()
+            if os.path.exists(path):
+                try:
+                    lookup = RankLookup.load(path)
+                except (OSError, ValueError, KeyError):
+                    lookup = None
+            if lookup is None or lookup.version != version:
+                lookup = build_rank_lookup(save=False, index=index)
+            _lookup = lookup
+        return _lookup
@@ -0,0 +1,96 @@
+"""
+Result cache for prediction queries.
+
+The predictor's input space is tiny, so identical queries repeat a lot.
+Results (the matching row positions) are cached under a normalised key:
+
+    (kind, year, round, quotas, seat_type, gender, min_rank, max_rank, limit)
+
+A small per-process LRU sits in front of Django's cache framework
+(settings.PREDICTION_CACHE_ALIAS). Every key embeds the cutoff data
+version, so once a loader bumps the version old entries can never be
+served; the LRU is also dropped when the version moves.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .cutoff_index import data_version
+
+
+class ResultCache:
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._lru = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.stats = {"lru_hits": 0, "shared_hits": 0, "misses": 0}
+
+    def _shared(self):
+        return caches[getattr(settings, "PREDICTION_CACHE_ALIAS", "default")]
+
+    @staticmethod
+    def make_key(version, parts):
+        raw = repr((version,) + tuple(parts))
+        return "prediction:" + hashlib.sha1(raw.encode()).hexdigest()
+
+    def _remember(self, key, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def get_or_compute(self, parts, compute, version=None):
+        """
+        Return the cached value for `parts`, computing and storing it on a miss.
+        `version` defaults to the current cutoff data version.
+        """
+        if version is None:
+            version = data_version()
+        key = self.make_key(version, parts)
+
+        with self._lock:
+            if version != self._version:
+                self._lru.clear()
+                self._version = version
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.stats["lru_hits"] += 1
+                return self._lru[key]
+
+        shared = self._shared()
+        value = shared.get(key)
+        if value is not None:
+            with self._lock:
+                self.stats["shared_hits"] += 1
+                self._remember(key, value)
+            return value
+
+        value = compute()
+        shared.set(key, value, getattr(settings, "PREDICTION_CACHE_TIMEOUT", 3600))
+        with self._lock:
+            self.stats["misses"] += 1
+            self._remember(key, value)
+        return value
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["lru_size"] = len(self._lru)
+        lookups = stats["lru_hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_ratio"] = (
+            (stats["lru_hits"] + stats["shared_hits"]) / lookups if lookups else 0.0
+        )
+        stats["data_version"] = self._version
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self.stats = {"lru_hits": 0, "shared_hits": 0, "misses": 0}
+
+
+result_cache = ResultCache()
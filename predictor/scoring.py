@@ -0,0 +1,162 @@
+"""
+Admission-chance scoring for the marks predictor.
+
+The student's rank and each program's next closing rank are both treated
+as log-normal:
+
+    student    centre log(approx_rank); spread from the likely rank range
+               the marks engine gives (rank_low..rank_high is about +/- one
+               standard deviation)
+    program    centre blends the row's own closing rank with its mean over
+               earlier loaded years; spread is the year-to-year std of
+               log(closing_rank), or DEFAULT_CLOSING_SPREAD with one year
+
+P(admit) = P(student rank <= closing rank) = Phi(gap / combined spread).
+The opening rank only bounds the band; a better rank than the opening
+rank is still admitted, so it never lowers the chance.
+
+Everything is a NumPy expression over the whole (quota, seat_type, gender)
+slice, so scoring every program in a slice costs about one sort.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+
+SAFE_PROBABILITY = 0.8
+MODERATE_PROBABILITY = 0.4
+# programs less likely than this are not listed at all
+MIN_PROBABILITY = 0.05
+
+# log-scale spreads: 0.15 is roughly +/-15% on the closing rank
+DEFAULT_CLOSING_SPREAD = 0.15
+MIN_CLOSING_SPREAD = 0.05
+MIN_RANK_SPREAD = 0.02
+# weight of the row's own year against the multi-year mean
+OWN_YEAR_WEIGHT = 0.6
+
+CHANCE_LABELS = ("safe", "moderate", "reach")
+
+RankEstimate = namedtuple("RankEstimate", ["rank", "rank_low", "rank_high"])
+
+
+def normal_cdf(z):
+    """
+    Vectorised standard normal CDF (Abramowitz & Stegun 7.1.26 erf,
+    absolute error below 1.5e-7); NumPy has no erf of its own.
+    """
+    z = np.asarray(z, dtype=np.float64)
+    x = np.abs(z) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-x * x)
+    return 0.5 * (1.0 + np.sign(z) * erf)
+
+
+def chance_labels(probability):
+    """
+    Index into CHANCE_LABELS for each probability.
+    """
+    return np.where(
+        probability >= SAFE_PROBABILITY, 0,
+        np.where(probability >= MODERATE_PROBABILITY, 1, 2),
+    )
+
+
+def admission_probability(index, positions, estimate):
+    """
+    P(admit) for every row position against one RankEstimate.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    mean, std, count = (part[positions] for part in index.closing_trend())
+
+    own = np.log(np.maximum(index.columns.closing_rank[positions], 1).astype(np.float64))
+    centre = np.where(count > 1, OWN_YEAR_WEIGHT * own + (1 - OWN_YEAR_WEIGHT) * mean, own)
+    closing_spread = np.where(
+        count > 1, np.maximum(std, MIN_CLOSING_SPREAD), DEFAULT_CLOSING_SPREAD
+    )
+
+    low, high = max(estimate.rank_low, 1), max(estimate.rank_high, 1)
+    rank_spread = max((np.log(high) - np.log(low)) / 2.0, MIN_RANK_SPREAD)
+    student = np.log(max(estimate.rank, 1))
+
+    return normal_cdf((centre - student) / np.sqrt(closing_spread ** 2 + rank_spread ** 2))
+
+
+def _scored_slice(index, year, round_no, quotas, seat_type, gender, estimate, home_state):
+    """
+    Listable positions of a slice in (closing_rank, id) order, with their
+    probabilities and label indexes.
+    """
+    positions = index.slice_positions(year, round_no, quotas, seat_type, gender, home_state)
+    probability = admission_probability(index, positions, estimate)
+
+    keep = probability >= MIN_PROBABILITY
+    positions, probability = positions[keep], probability[keep]
+    return positions, probability, chance_labels(probability)
+
+
+def score_slice(index, year, round_no, quotas, seat_type, gender, estimate,
+                limit=None, home_state=""):
+    """
+    (positions, probabilities, cursors) for one slice, most likely first.
+
+    Every program in the slice is scored and anything below MIN_PROBABILITY
+    dropped. With a limit, each label gets an equal share of the slots,
+    filled with its most competitive (lowest closing) programs, so a strong
+    student sees their best safe picks rather than fifty certain ones; the
+    chosen rows are then ordered by probability.
+
+    What is shown of each label is a prefix of that label's
+    (closing_rank, id) list, so `cursors` maps each label with rows left
+    over to the keyset cursor score_label() continues from.
+    """
+    positions, probability, labels = _scored_slice(
+        index, year, round_no, quotas, seat_type, gender, estimate, home_state,
+    )
+
+    # positions are already in competition (closing_rank, id) order
+    chosen = np.ones(len(positions), dtype=bool)
+    if limit is not None and len(positions) > limit:
+        share = limit // len(CHANCE_LABELS)
+
+        chosen[:] = False
+        for label in range(len(CHANCE_LABELS)):
+            chosen[np.flatnonzero(labels == label)[:share]] = True
+        # labels with fewer candidates leave slots; fill them in the same order
+        spare = np.flatnonzero(~chosen)
+        chosen[spare[:limit - int(chosen.sum())]] = True
+
+    cursors = {}
+    for label, name in enumerate(CHANCE_LABELS):
+        members = np.flatnonzero(labels == label)
+        shown = members[chosen[members]]
+        if len(shown) < len(members):
+            cursors[name] = index.cursor(positions[shown[-1]]) if len(shown) else ""
+
+    positions, probability = positions[chosen], probability[chosen]
+    closing = index.columns.closing_rank[positions]
+    ids = index.columns.id[positions]
+
+    # ties on the displayed percentage go to the more competitive program
+    order = np.lexsort((ids, closing, -np.round(probability, 2)))
+    return positions[order], probability[order], cursors
+
+
+def score_label(index, year, round_no, quotas, seat_type, gender, estimate, label,
+                after=None, limit=None, home_state=""):
+    """
+    One keyset page of a single label's programs, in (closing_rank, id)
+    order: (positions, probabilities, next cursor or None).
+    """
+    positions, probability, labels = _scored_slice(
+        index, year, round_no, quotas, seat_type, gender, estimate, home_state,
+    )
+    keep = (labels == CHANCE_LABELS.index(label)) & index.after_mask(positions, after)
+    positions, probability = positions[keep], probability[keep]
+
+    next_cursor = None
+    if limit is not None and len(positions) > limit:
+        positions, probability = positions[:limit], probability[:limit]
+        next_cursor = index.cursor(positions[-1])
+    return positions, probability, next_cursor
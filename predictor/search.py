@@ -0,0 +1,259 @@
+"""
+Fuzzy program / institute search over the in-memory cutoff index.
+
+Every distinct (institute, program) pair in the snapshot is one document,
+so "NIT Trichy" lists that institute's programs and "CSE" lists CSE at
+every institute. Documents are split into word tokens, plus acronyms
+("Computer Science and Engineering" -> "cse", "National Institute of
+Technology Kurukshetra" -> "nit", "nitk"), and indexed twice:
+
+    token postings    vocabulary token -> documents containing it
+    trigram postings  trigram -> vocabulary tokens containing it
+
+A query token matches vocabulary tokens exactly, as a prefix
+(autocomplete) or by trigram similarity (typos), each with a weight;
+documents add up the best weight per query token. Only documents matching
+the most query tokens are kept, ranked by score and then shorter names.
+
+The index is derived from the snapshot string tables, once per data
+version, so a search never touches the database.
+"""
+import bisect
+import re
+import threading
+
+import numpy as np
+
+from .cutoff_index import get_cutoff_index
+
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.8
+# trigram (Jaccard) similarity needed for a typo match; weight = similarity * FUZZY_WEIGHT
+FUZZY_THRESHOLD = 0.3
+FUZZY_WEIGHT = 0.8
+MIN_ACRONYM = 3
+MATCH_CACHE_SIZE = 10000
+
+# words that never narrow a search
+QUERY_STOPWORDS = {
+    "a", "all", "and", "at", "branch", "branches", "college", "colleges", "for",
+    "in", "of", "seat", "seats", "the", "with",
+}
+ACRONYM_STOPWORDS = {"and", "of", "in", "with", "the", "for"}
+
+# common names that share no spelling with the official one
+SYNONYMS = {
+    "trichy": "tiruchirappalli",
+    "chennai": "madras",
+    "mumbai": "bombay",
+    "kozhikode": "calicut",
+    "prayagraj": "allahabad",
+    "bengaluru": "bangalore",
+    "bhu": "varanasi",
+    "ism": "dhanbad",
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _WORD.findall(str(text).lower())
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def acronyms(words, min_length):
+    """
+    Acronyms of every leading run of `words` (stopwords skipped), at least
+    `min_length` letters long.
+    """
+    letters = "".join(w[0] for w in words if w not in ACRONYM_STOPWORDS and w.isalpha())
+    return {letters[:n] for n in range(min_length, len(letters) + 1)}
+
+
+class SearchIndex:
+    """
+    Token and trigram inverted index over one CutoffIndex's programs.
+    """
+
+    def __init__(self, index):
+        cols, strings = index.columns, index.columns.strings
+        self.version = index.version
+        self.institutes = strings.get("institute", [])
+        self.programs = strings.get("program", [])
+        self.seat_types = strings.get("seat_type", [])
+        self.institute_states = strings.get("institute_state") or [""] * len(self.institutes)
+        self.institute_types = strings.get("institute_type") or [""] * len(self.institutes)
+
+        # one document per (institute, program) pair
+        institute = np.asarray(cols.institute, dtype=np.int64)
+        pair = institute * max(len(self.programs), 1) + np.asarray(cols.program, dtype=np.int64)
+        pairs, row_doc = np.unique(pair, return_inverse=True)
+        self.doc_institute = pairs // max(len(self.programs), 1)
+        self.doc_program = pairs % max(len(self.programs), 1)
+        self.size = len(pairs)
+
+        # filters: institute type per document, seat types offered per document
+        type_names = sorted(set(self.institute_types))
+        type_codes = np.array([type_names.index(t) for t in self.institute_types], dtype=np.int64)
+        self.type_names = type_names
+        self.doc_type = type_codes[self.doc_institute] if self.size else np.empty(0, dtype=np.int64)
+        self.doc_seat_types = np.zeros((self.size, len(self.seat_types)), dtype=bool)
+        self.doc_seat_types[row_doc.reshape(-1), np.asarray(cols.seat_type, dtype=np.int64)] = True
+
+        # ranking tie-break: the plain program beats its longer variants
+        self.doc_length = np.array(
+            [len(self.institutes[i]) + len(self.programs[p])
+             for i, p in zip(self.doc_institute.tolist(), self.doc_program.tolist())],
+            dtype=np.int64,
+        )
+
+        self._build_postings()
+        self._matches = {}
+        self._lock = threading.Lock()
+
+    def _build_postings(self):
+        institute_tokens = [
+            set(tokenize(name)) | acronyms(tokenize(name), MIN_ACRONYM) for name in self.institutes
+        ]
+        # the acronym of a program is taken from its name before the
+        # "(4 Years, Bachelor of Technology)" part
+        program_tokens = [
+            set(tokenize(name)) | acronyms(tokenize(name.split("(")[0]), 2) for name in self.programs
+        ]
+
+        postings = {}
+        for doc, (i, p) in enumerate(zip(self.doc_institute.tolist(), self.doc_program.tolist())):
+            for token in institute_tokens[i] | program_tokens[p]:
+                postings.setdefault(token, []).append(doc)
+
+        self.vocabulary = sorted(postings)
+        offsets = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum([len(postings[t]) for t in self.vocabulary], out=offsets[1:])
+        self.offsets = offsets
+        self.docs = np.array(
+            [doc for t in self.vocabulary for doc in postings[t]], dtype=np.int64,
+        )
+
+        grams = {}
+        self.gram_counts = np.zeros(len(self.vocabulary), dtype=np.int64)
+        for token_id, token in enumerate(self.vocabulary):
+            token_grams = trigrams(token)
+            self.gram_counts[token_id] = len(token_grams)
+            for gram in token_grams:
+                grams.setdefault(gram, []).append(token_id)
+        self.grams = {gram: np.array(ids, dtype=np.int64) for gram, ids in grams.items()}
+
+    # -- matching ---------------------------------------------------------
+
+    def match_token(self, token):
+        """
+        (vocabulary ids, weights) matching one query token. Cached, since
+        the same few hundred tokens make up almost every query.
+        """
+        cached = self._matches.get(token)
+        if cached is not None:
+            return cached
+
+        weights = {}
+        start = bisect.bisect_left(self.vocabulary, token)
+        for token_id in range(start, len(self.vocabulary)):
+            candidate = self.vocabulary[token_id]
+            if not candidate.startswith(token):
+                break
+            weights[token_id] = EXACT_WEIGHT if candidate == token else PREFIX_WEIGHT
+
+        query_grams = trigrams(token)
+        if len(token) >= 3:
+            hits = [self.grams[g] for g in query_grams if g in self.grams]
+            if hits:
+                shared = np.bincount(np.concatenate(hits), minlength=len(self.vocabulary))
+                similarity = shared / (len(query_grams) + self.gram_counts - shared)
+                for token_id in np.flatnonzero(similarity >= FUZZY_THRESHOLD).tolist():
+                    weight = float(similarity[token_id]) * FUZZY_WEIGHT
+                    if weight > weights.get(token_id, 0.0):
+                        weights[token_id] = weight
+
+        ids = np.fromiter(weights, dtype=np.int64, count=len(weights))
+        match = (ids, np.fromiter(weights.values(), dtype=np.float64, count=len(weights)))
+        with self._lock:
+            if len(self._matches) >= MATCH_CACHE_SIZE:
+                self._matches.clear()
+            self._matches[token] = match
+        return match
+
+    def token_scores(self, token):
+        """
+        Best weight of `token` (or its synonym) in every document.
+        """
+        best = np.zeros(self.size)
+        for variant in {token, SYNONYMS.get(token, token)}:
+            ids, weights = self.match_token(variant)
+            if not len(ids):
+                continue
+            starts, ends = self.offsets[ids], self.offsets[ids + 1]
+            lengths = ends - starts
+            docs = np.concatenate([self.docs[s:e] for s, e in zip(starts.tolist(), ends.tolist())])
+            np.maximum.at(best, docs, np.repeat(weights, lengths))
+        return best
+
+    def search(self, query, institute_type="", category="", limit=SEARCH_LIMIT):
+        """
+        [(institute index, program index, score)] best first. `institute_type`
+        (IIT/NIT/IIIT/GFTI) and `category` (seat type) narrow the documents.
+        """
+        tokens = [t for t in dict.fromkeys(tokenize(query)) if t not in QUERY_STOPWORDS]
+        if not tokens or not self.size:
+            return []
+
+        score = np.zeros(self.size)
+        matched = np.zeros(self.size, dtype=np.int64)
+        for token in tokens:
+            best = self.token_scores(token)
+            score += best
+            matched += best > 0
+
+        keep = matched > 0
+        if institute_type:
+            code = self.type_names.index(institute_type) if institute_type in self.type_names else -1
+            keep &= self.doc_type == code
+        if category:
+            column = self.seat_types.index(category) if category in self.seat_types else None
+            keep &= self.doc_seat_types[:, column] if column is not None else False
+        if not keep.any():
+            return []
+        keep &= matched == matched[keep].max()
+
+        docs = np.flatnonzero(keep)
+        order = np.lexsort((self.doc_length[docs], -score[docs]))[:limit]
+        docs = docs[order]
+        return [
+            (int(self.doc_institute[d]), int(self.doc_program[d]), float(score[d]))
+            for d in docs.tolist()
+        ]
+
+
+_search_lock = threading.Lock()
+
+
+def get_search_index(index=None):
+    """
+    The SearchIndex of `index` (default: the current cutoff index), built
+    on first use and kept on the index, so it is replaced with it.
+    """
+    index = index or get_cutoff_index()
+    search_index = index.__dict__.get("_search_index")
+    if search_index is None:
+        with _search_lock:
+            search_index = index.__dict__.get("_search_index")
+            if search_index is None:
+                search_index = SearchIndex(index)
+                index._search_index = search_index
+    return search_index
@@ -0,0 +1,480 @@
+"""
+Prediction service shared by home(), colleges() and anything else that
+needs "which programs fit this rank".
+
+Everything here reads from the in-memory cutoff index / rank lookup, so a
+prediction costs no database queries once the worker is warm. Results are
+plain namedtuples grouped by institute, with the unlock masking applied in
+one place.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from .codes import GENDER_NEUTRAL, OPEN, canonical_gender, canonical_quota, canonical_seat_type
+from .cutoff_index import get_cutoff_index, parse_cursor
+from .institute_states import HOME_STATE_QUOTA, OTHER_STATE_QUOTA, STATE_QUOTAS, canonical_state
+from .marks_engine import get_marks_engine
+from .metrics import timed
+from .models import Cutoff
+from .rank_lookup import get_rank_lookup
+from .result_cache import result_cache
+from .scoring import CHANCE_LABELS, RankEstimate, chance_labels, score_label, score_slice
+
+
+# All India, plus the home-state quotas; CutoffIndex.quota_filters() keeps
+# HS/OS/GO/JK/LA only once the student gives a home state
+PREDICTOR_QUOTAS = ["AI", HOME_STATE_QUOTA, OTHER_STATE_QUOTA, *STATE_QUOTAS]
+RESULT_LIMIT = 50
+
+InstituteGroup = namedtuple("InstituteGroup", ["institute", "branches"])
+
+
+class Prediction:
+    """
+    Eligible programs for one query (or one page of it), grouped by
+    institute. Locked users only see the first institute group.
+
+    next_cursor continues the list on the next page; chance_cursors does
+    the same per safe / moderate / reach label for the marks predictor.
+    """
+
+    __slots__ = ("rows", "groups", "can_see_all", "next_cursor", "chance_cursors")
+
+    def __init__(self, rows, can_see_all, next_cursor=None, chance_cursors=None):
+        self.rows = rows
+        with timed("group"):
+            self.groups = group_by_institute(rows)
+        self.can_see_all = can_see_all
+        self.next_cursor = next_cursor
+        self.chance_cursors = chance_cursors or {}
+
+    @property
+    def visible_groups(self):
+        if self.can_see_all:
+            return self.groups
+        return self.groups[:1]
+
+    @property
+    def has_more_institutes(self):
+        return len(self.groups) > 1
+
+    def as_context(self):
+        return {
+            "cutoffs": self.rows,
+            "cutoffs_grouped": self.visible_groups,
+            "has_more_institutes": self.has_more_institutes,
+            "can_see_all": self.can_see_all,
+            "next_cursor": self.next_cursor,
+            "chance_cursors": [
+                (label, self.chance_cursors[label]) for label in CHANCE_LABELS if label in self.chance_cursors
+            ],
+        }
+
+
+def group_by_institute(rows):
+    """
+    [InstituteGroup(name, [rows...]), ...] in order of first appearance.
+    """
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row.institute_name, []).append(row)
+    return [InstituteGroup(name, branches) for name, branches in grouped.items()]
+
+
+def resolve_year_round(index, year, round_no):
+    """
+    Resolve requested year/round against the loaded cutoffs.
+    Defaults to the latest year and its latest JoSAA round.
+    """
+    year, round_no = str(year or "").strip(), str(round_no or "").strip()
+
+    year = int(year) if year.isdigit() else None
+    if year not in index.rounds:
+        years = index.years()
+        year = years[0] if years else 2025
+
+    round_no = int(round_no) if round_no.isdigit() else None
+    if round_no not in index.rounds.get(year, []):
+        round_no = index.latest_round(year)
+
+    return year, round_no
+
+
+def year_round_context(index, year, round_no):
+    round_labels = dict(Cutoff.ROUND_CHOICES)
+    return {
+        "year": year,
+        "round": round_no,
+        "years": index.years(),
+        "rounds": [(r, round_labels.get(r, r)) for r in index.rounds.get(year, [])],
+    }
+
+
+def _cached_page(index, parts, compute, limit):
+    """
+    (rows, next cursor) for one page of a normalised query key, going
+    through the result cache. compute() returns up to limit + 1 positions;
+    the extra one only tells us there is a next page.
+
+    Only row positions are cached, keyed on the index's data version, so
+    they always resolve against the same index that produced them.
+    """
+    with timed("query"):
+        positions = result_cache.get_or_compute(
+            parts, lambda: tuple(int(p) for p in compute()), version=index.version,
+        )
+        if len(positions) > limit:
+            return index.rows(positions[:limit]), index.cursor(positions[limit - 1])
+        return index.rows(positions), None
+
+
+def predict_window(year, round_no, seat_type, gender, min_rank, max_rank,
+                   can_see_all=False, quotas=PREDICTOR_QUOTAS, limit=RESULT_LIMIT, home_state="",
+                   after=""):
+    """
+    Programs whose cutoff band overlaps [min_rank, max_rank], one page
+    after the `after` cursor.
+    """
+    quotas, home_state = tuple(quotas), canonical_state(home_state)
+    index = get_cutoff_index()
+    rows, next_cursor = _cached_page(
+        index,
+        ("window", year, round_no, quotas, home_state, seat_type, gender, min_rank, max_rank, limit, after),
+        lambda: index.overlapping_positions(
+            year, round_no, quotas, seat_type, gender, min_rank, max_rank,
+            limit=limit + 1, home_state=home_state, after=parse_cursor(after),
+        ),
+        limit,
+    )
+    return Prediction(rows, can_see_all, next_cursor=next_cursor)
+
+
+def predict_rank(year, round_no, seat_type, gender, rank,
+                 can_see_all=False, quotas=PREDICTOR_QUOTAS, limit=RESULT_LIMIT, home_state="",
+                 after=""):
+    """
+    Programs with opening_rank <= rank <= closing_rank (browse colleges),
+    one page after the `after` cursor.
+    """
+    quotas, home_state = tuple(quotas), canonical_state(home_state)
+    index = get_cutoff_index()
+    lookup = get_rank_lookup(index)
+    # every rank in the same lookup segments shares one entry, so warming
+    # the segment boundaries warms every rank
+    segments = lookup.segment_key(index, year, round_no, quotas, seat_type, gender, rank, home_state)
+    rows, next_cursor = _cached_page(
+        index,
+        ("rank", year, round_no, quotas, home_state, seat_type, gender, segments, limit, after),
+        lambda: lookup.positions_containing(
+            index, year, round_no, quotas, seat_type, gender, rank,
+            limit=limit + 1, home_state=home_state, after=parse_cursor(after),
+        ),
+        limit,
+    )
+    return Prediction(rows, can_see_all, next_cursor=next_cursor)
+
+
+def _scored_rows(index, scored):
+    labels = chance_labels(np.array([p for _, p in scored]))
+    return [
+        index.row(pos)._replace(probability=prob, chance=CHANCE_LABELS[label])
+        for (pos, prob), label in zip(scored, labels.tolist())
+    ]
+
+
+def predict_chances(year, round_no, seat_type, gender, estimate,
+                    can_see_all=False, quotas=PREDICTOR_QUOTAS, limit=RESULT_LIMIT, home_state=""):
+    """
+    Programs scored by admission chance for a marks estimate (marks
+    predictor), most likely first. Rows carry probability and a
+    safe / moderate / reach label; predict_chance_page() continues each
+    label from Prediction.chance_cursors.
+    """
+    quotas, home_state = tuple(quotas), canonical_state(home_state)
+    estimate = RankEstimate(estimate.approx_rank, estimate.rank_low, estimate.rank_high)
+    index = get_cutoff_index()
+
+    def compute():
+        positions, probability, cursors = score_slice(
+            index, year, round_no, quotas, seat_type, gender, estimate,
+            limit=limit, home_state=home_state,
+        )
+        return tuple(zip(positions.tolist(), np.round(probability, 4).tolist())), cursors
+
+    with timed("query"):
+        scored, cursors = result_cache.get_or_compute(
+            ("chance", year, round_no, quotas, home_state, seat_type, gender) + tuple(estimate) + (limit,),
+            compute,
+            version=index.version,
+        )
+        rows = _scored_rows(index, scored)
+    return Prediction(rows, can_see_all, chance_cursors=cursors)
+
+
+def predict_chance_page(year, round_no, seat_type, gender, estimate, label, after="",
+                        can_see_all=False, quotas=PREDICTOR_QUOTAS, limit=RESULT_LIMIT, home_state=""):
+    """
+    The next page of one chance label, in (closing_rank, id) order.
+    """
+    quotas, home_state = tuple(quotas), canonical_state(home_state)
+    estimate = RankEstimate(estimate.approx_rank, estimate.rank_low, estimate.rank_high)
+    index = get_cutoff_index()
+
+    def compute():
+        positions, probability, next_cursor = score_label(
+            index, year, round_no, quotas, seat_type, gender, estimate, label,
+            after=parse_cursor(after), limit=limit, home_state=home_state,
+        )
+        return tuple(zip(positions.tolist(), np.round(probability, 4).tolist())), next_cursor
+
+    with timed("query"):
+        scored, next_cursor = result_cache.get_or_compute(
+            ("chance-page", year, round_no, quotas, home_state, seat_type, gender)
+            + tuple(estimate) + (label, after, limit),
+            compute,
+            version=index.version,
+        )
+        rows = _scored_rows(index, scored)
+    return Prediction(rows, can_see_all, next_cursor=next_cursor)
+
+
+def iter_eligible(year, round_no, seat_type, gender, rank=None, estimate=None,
+                  quotas=PREDICTOR_QUOTAS, home_state=""):
+    """
+    Every eligible program, uncapped, for exports: by admission chance
+    for a marks estimate (like predict_chances), else containing `rank`
+    (like predict_rank). Rows are built one at a time as they are consumed.
+    """
+    quotas, home_state = tuple(quotas), canonical_state(home_state)
+    index = get_cutoff_index()
+
+    if estimate is not None:
+        estimate = RankEstimate(estimate.approx_rank, estimate.rank_low, estimate.rank_high)
+        positions, probability, _ = score_slice(
+            index, year, round_no, quotas, seat_type, gender, estimate, home_state=home_state,
+        )
+        labels = chance_labels(probability)
+        for pos, prob, label in zip(positions.tolist(), probability.tolist(), labels.tolist()):
+            yield index.row(pos)._replace(probability=prob, chance=CHANCE_LABELS[label])
+    else:
+        positions = get_rank_lookup(index).positions_containing(
+            index, year, round_no, quotas, seat_type, gender, rank, home_state=home_state,
+        )
+        for pos in positions.tolist():
+            yield index.row(pos)
+
+
+# ---------------------------------------------------------------------------
+# Batch prediction (JSON API)
+# ---------------------------------------------------------------------------
+
+# students scored per vectorised pass; also the streaming flush size
+BATCH_CHUNK = 2000
+# the snapshot stores ranks as int32
+MAX_RANK = 2 ** 31 - 1
+
+StudentQuery = namedtuple(
+    "StudentQuery",
+    ["marks", "rank", "seat_type", "gender", "quotas", "home_state", "year", "round"],
+)
+
+
+FILTER_FIELDS = ("quota", "category", "gender", "home_state", "year", "round")
+
+
+def parse_filters(data, index):
+    """
+    (seat_type, gender, quotas, home_state, year, round) of one student
+    dict, or an error message.
+    """
+    quotas = data.get("quota") or PREDICTOR_QUOTAS
+    if isinstance(quotas, str):
+        quotas = [quotas]
+    if not isinstance(quotas, (list, tuple)) or not all(isinstance(q, str) for q in quotas):
+        return "quota must be a string or a list of strings."
+    quotas = [canonical_quota(q) for q in quotas]
+    if not all(quotas):
+        return "quota is not a recognised quota."
+
+    seat_type = canonical_seat_type(data.get("category") or OPEN)
+    if not seat_type:
+        return "category is not a recognised seat type."
+    gender = canonical_gender(data.get("gender") or GENDER_NEUTRAL)
+    if not gender:
+        return "gender is not a recognised gender."
+
+    home_state = canonical_state(data.get("home_state"))
+    if data.get("home_state") and not home_state:
+        return "home_state is not a recognised state."
+
+    year, round_no = resolve_year_round(index, data.get("year"), data.get("round"))
+    return seat_type, gender, tuple(quotas), home_state, year, round_no
+
+
+def parse_student(data, index, filters=None, engine=None):
+    """
+    Validate one student dict from the API. Returns (StudentQuery, None)
+    or (None, error message).
+
+    `filters` memoises parse_filters() across a batch: students mostly
+    share a handful of category / gender / quota combinations.
+
+    rank and marks are bounded here, so nothing outside the int64 rank
+    arrays or the marks bands reaches predict_batch.
+    """
+    if not isinstance(data, dict):
+        return None, "Each student must be a JSON object."
+
+    marks, rank = data.get("marks"), data.get("rank")
+    if rank is not None:
+        # JSON numbers skip the string checks; "2500" is accepted too
+        if type(rank) is not int:
+            if not str(rank).strip().isdigit():
+                return None, "rank must be a positive integer."
+            rank = int(rank)
+        if rank < 1:
+            return None, "rank must be a positive integer."
+        if rank > MAX_RANK:
+            return None, "rank is out of range."
+    elif marks is not None:
+        if type(marks) is not int:
+            if not str(marks).strip().lstrip("-").isdigit():
+                return None, "marks must be an integer."
+            marks = int(marks)
+        if not (engine or get_marks_engine()).covers(marks):
+            return None, "Marks out of supported range."
+    else:
+        return None, "Provide either marks or rank."
+
+    if filters is None:
+        parsed = parse_filters(data, index)
+    else:
+        # repr() keeps 5 and "5", or ["AI"] and "['AI']", apart
+        key = tuple(map(repr, map(data.get, FILTER_FIELDS)))
+        parsed = filters.get(key)
+        if parsed is None:
+            parsed = filters[key] = parse_filters(data, index)
+    if isinstance(parsed, str):
+        return None, parsed
+    seat_type, gender, quotas, home_state, year, round_no = parsed
+
+    return StudentQuery(
+        marks=marks if rank is None else None,
+        rank=rank,
+        seat_type=seat_type,
+        gender=gender,
+        quotas=quotas,
+        home_state=home_state,
+        year=year,
+        round=round_no,
+    ), None
+
+
+def _slice_arrays(index, key):
+    """
+    Positions plus opening/closing arrays for one
+    (year, round, quotas, seat_type, gender, home_state) slice, in
+    (closing_rank, id) order.
+    """
+    positions = index.slice_positions(*key)
+    cols = index.columns
+    return positions, cols.opening_rank[positions], cols.closing_rank[positions]
+
+
+def predict_batch(students, limit=RESULT_LIMIT, index=None):
+    """
+    Yield (result dict, row positions) per student, in input order.
+    Positions refer to `index` (default: the current cutoff index).
+
+    Marks are converted with one estimate_many() call per chunk, and every
+    (slice, chunk) pair is matched with a single broadcast comparison
+    instead of one index lookup per student.
+    """
+    index = index or get_cutoff_index()
+    engine = get_marks_engine()
+    slices = {}
+    filters = {}
+
+    for start in range(0, len(students), BATCH_CHUNK):
+        chunk = students[start:start + BATCH_CHUNK]
+        parsed = [parse_student(s, index, filters, engine) for s in chunk]
+        n = len(chunk)
+
+        lo = np.zeros(n, dtype=np.int64)
+        hi = np.zeros(n, dtype=np.int64)
+        ok = np.zeros(n, dtype=bool)
+        results = [None] * n
+
+        # ranks given directly: a point query
+        for i, (query, error) in enumerate(parsed):
+            if error:
+                results[i] = {"error": error}
+            elif query.rank is not None:
+                lo[i] = hi[i] = query.rank
+                ok[i] = True
+                results[i] = {"rank": query.rank}
+
+        # marks: one vectorised marks -> rank conversion for the chunk
+        with_marks = [i for i, (q, e) in enumerate(parsed) if not e and q.rank is None]
+        if with_marks:
+            est = engine.estimate_many([parsed[i][0].marks for i in with_marks])
+            valid = est["valid"]
+            members = np.array(with_marks)[valid]
+            lo[members], hi[members], ok[members] = est["rank_low"][valid], est["rank_high"][valid], True
+            columns = zip(
+                valid.tolist(), est["percentile"].tolist(), est["approx_rank"].tolist(),
+                est["rank_low"].tolist(), est["rank_high"].tolist(),
+            )
+            for i, (is_valid, percentile, approx_rank, rank_low, rank_high) in zip(with_marks, columns):
+                if not is_valid:
+                    results[i] = {"error": "Marks out of supported range."}
+                    continue
+                results[i] = {
+                    "marks": parsed[i][0].marks,
+                    "percentile": percentile,
+                    "rank": approx_rank,
+                    "rank_low": rank_low,
+                    "rank_high": rank_high,
+                }
+
+        # group students by slice and match each group in one broadcast
+        by_slice = {}
+        for i, (query, _) in enumerate(parsed):
+            if ok[i]:
+                key = (query.year, query.round, query.quotas, query.seat_type, query.gender, query.home_state)
+                by_slice.setdefault(key, []).append(i)
+
+        empty = np.empty(0, dtype=np.int64)
+        matched = [empty] * n
+        for key, members in by_slice.items():
+            if key not in slices:
+                slices[key] = _slice_arrays(index, key)
+            positions, opening, closing = slices[key]
+            if not len(positions):
+                continue
+
+            members = np.array(members)
+            mask = (opening[None, :] <= hi[members, None]) & (closing[None, :] >= lo[members, None])
+            # matches in (member, slice order); keep each member's first `limit`
+            rows, cols = np.nonzero(mask)
+            bounds = np.searchsorted(rows, np.arange(len(members) + 1))
+            keep = np.arange(len(rows)) - bounds[rows] < limit
+            bounds = np.searchsorted(rows[keep], np.arange(len(members) + 1))
+            hits = positions[cols[keep]]
+            for k, i in enumerate(members.tolist()):
+                matched[i] = hits[bounds[k]:bounds[k + 1]]
+
+        ids = index.columns.id
+        for i, (query, _) in enumerate(parsed):
+            if query is not None and "error" not in results[i]:
+                results[i].update(
+                    year=query.year,
+                    round=query.round,
+                    category=query.seat_type,
+                    gender=query.gender,
+                    quota=list(query.quotas),
+                    home_state=query.home_state,
+                    program_ids=ids[matched[i]].tolist(),
+                )
+            yield results[i], matched[i]
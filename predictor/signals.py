@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .publishing import publish_on_commit
+from .models import Cutoff, Institute, MarksBand
+
+
+@receiver(post_save, sender=MarksBand)
+@receiver(post_delete, sender=MarksBand)
+def marks_band_changed(sender, **kwargs):
+    # MarksBand is edited by hand in the admin; publish a new data version
+    # so every worker reloads its marks engine on the next request
+    publish_on_commit()
+
+
+@receiver(post_save, sender=Institute)
+def institute_changed(sender, update_fields=None, created=False, **kwargs):
+    # the snapshot carries each institute's name, state and type
+    if created or (
+        update_fields is not None and not {"name", "state", "institute_type"} & set(update_fields)
+    ):
+        return
+    publish_on_commit()
+
+
+@receiver(post_save, sender=Cutoff)
+@receiver(post_delete, sender=Cutoff)
+def cutoff_changed(sender, **kwargs):
+    # a cutoff edited or deleted in the admin; the loaders publish
+    # themselves and use bulk operations, which send no signals
+    publish_on_commit()
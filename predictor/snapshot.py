@@ -0,0 +1,228 @@
+"""
+Columnar cutoff data and its on-disk snapshot format.
+
+CutoffColumns holds the whole Cutoff + Institute table as NumPy arrays,
+sorted by (year, round, quota, seat_type, gender, closing_rank, id) so
+every predictor slice is one contiguous range. Strings are dictionary
+encoded: each string column stores small integer codes into a table.
+strings["institute_state"] and strings["institute_type"] are parallel to
+the institute table and hold each institute's state (for home-state quota
+resolution) and IIT/NIT/IIIT/GFTI type (for search filters). Quota, seat
+type and gender use the fixed canonical tables of codes.py, so their codes
+are the same in every snapshot.
+
+A snapshot file is that same layout written to disk:
+
+    b"JEECUT01"                 magic
+    uint32                      header length
+    header (JSON)               format, data version, row count, string
+                                tables, and dtype/offset/length of every
+                                column
+    column data                 each column 64-byte aligned
+
+Workers open it with mmap, read-only, and wrap each column in a zero-copy
+np.frombuffer() view, so every gunicorn worker shares the same pages.
+Writers replace the file atomically (os.replace), so a worker holding the
+old mapping keeps a consistent view until it reopens.
+"""
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from .codes import TABLES, code_table
+from .models import Cutoff
+
+
+MAGIC = b"JEECUT01"
+FORMAT_VERSION = 1
+ALIGN = 64
+
+STRING_COLUMNS = ("institute", "program", "quota", "seat_type", "gender")
+
+COLUMN_DTYPES = {
+    "id": "<i8",
+    "institute": "<i4",
+    "program": "<i4",
+    "quota": "<i2",
+    "seat_type": "<i2",
+    "gender": "<i2",
+    "year": "<i2",
+    "round": "<i2",
+    "opening_rank": "<i4",
+    "closing_rank": "<i4",
+    # rows of the same program/slice/round across years share a key;
+    # history_order lists positions sorted by (history_key, year) and key k
+    # owns history_order[history_start[k]:history_start[k + 1]]
+    "history_key": "<i4",
+    "history_order": "<i4",
+    "history_start": "<i4",
+}
+
+
+class CutoffColumns:
+    """
+    Sorted, dictionary-encoded cutoff columns (in memory or mmapped).
+    """
+
+    def __init__(self, arrays, strings, version="0", buffer=None):
+        self.arrays = arrays
+        self.strings = strings
+        self.version = version
+        self._buffer = buffer  # keeps the mmap alive while views exist
+
+    def __len__(self):
+        return len(self.arrays["id"])
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["arrays"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @classmethod
+    def from_rows(cls, rows, version="0"):
+        """
+        Build from (id, institute name, program, quota, seat_type, gender,
+        year, round, opening_rank, closing_rank, institute state, institute
+        type) tuples.
+        """
+        rows = list(rows)
+        raw = list(zip(*rows)) if rows else [()] * 12
+        names = ("id",) + STRING_COLUMNS + ("year", "round", "opening_rank", "closing_rank")
+
+        arrays, strings = {}, {}
+        for name, values in zip(names, raw[:10]):
+            if name in STRING_COLUMNS:
+                table, codes = np.unique(np.array(values, dtype=object).astype(str), return_inverse=True)
+                table = [str(s) for s in table]
+                if name in TABLES:
+                    labels, table = code_table(name, table)
+                    codes = np.array([table.index(label) for label in labels], dtype=np.int64)[codes]
+                strings[name] = table
+                arrays[name] = codes.astype(COLUMN_DTYPES[name])
+            else:
+                arrays[name] = np.array(values, dtype=COLUMN_DTYPES[name])
+
+        state_by_institute = dict(zip(raw[1], raw[10]))
+        type_by_institute = dict(zip(raw[1], raw[11]))
+        strings["institute_state"] = [state_by_institute.get(name) or "" for name in strings["institute"]]
+        strings["institute_type"] = [type_by_institute.get(name) or "" for name in strings["institute"]]
+
+        order = np.lexsort((
+            arrays["id"],
+            arrays["closing_rank"],
+            arrays["gender"],
+            arrays["seat_type"],
+            arrays["quota"],
+            arrays["round"],
+            arrays["year"],
+        ))
+        arrays = {name: col[order] for name, col in arrays.items()}
+
+        if len(order):
+            history_fields = np.stack([
+                arrays[name].astype(np.int64)
+                for name in ("institute", "program", "quota", "seat_type", "gender", "round")
+            ], axis=1)
+            _, history_key = np.unique(history_fields, axis=0, return_inverse=True)
+            history_key = history_key.reshape(-1)
+        else:
+            history_key = np.empty(0, dtype=np.int64)
+        arrays["history_key"] = history_key.astype(COLUMN_DTYPES["history_key"])
+        arrays["history_order"] = np.lexsort(
+            (arrays["year"], arrays["history_key"])
+        ).astype(COLUMN_DTYPES["history_order"])
+        counts = np.bincount(history_key, minlength=int(history_key.max()) + 1 if len(history_key) else 0)
+        arrays["history_start"] = np.concatenate([[0], np.cumsum(counts)]).astype(
+            COLUMN_DTYPES["history_start"]
+        )
+
+        return cls(arrays, strings, version=version)
+
+    @classmethod
+    def from_database(cls, version="0"):
+        # single joined query; institute name comes along with each row
+        rows = Cutoff.objects.values_list(
+            "id",
+            "institute__name",
+            "program_name",
+            "quota",
+            "seat_type",
+            "gender",
+            "year",
+            "round",
+            "opening_rank",
+            "closing_rank",
+            "institute__state",
+            "institute__institute_type",
+        )
+        return cls.from_rows(rows.iterator(), version=version)
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_snapshot(columns, path):
+    """
+    Write `columns` to `path` atomically.
+    """
+    layout, offset = {}, 0
+    for name, dtype in COLUMN_DTYPES.items():
+        length = len(columns.arrays[name])
+        offset = _aligned(offset)
+        layout[name] = {"dtype": dtype, "offset": offset, "length": length}
+        offset += length * np.dtype(dtype).itemsize
+
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "data_version": columns.version,
+        "rows": len(columns),
+        "strings": columns.strings,
+        "columns": layout,
+    }).encode()
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(MAGIC)
+        fh.write(struct.pack("<I", len(header)))
+        fh.write(header)
+        for name, dtype in COLUMN_DTYPES.items():
+            fh.seek(data_start + layout[name]["offset"])
+            fh.write(np.ascontiguousarray(columns.arrays[name], dtype=dtype).tobytes())
+        fh.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def open_snapshot(path):
+    """
+    Map a snapshot read-only. Returns CutoffColumns whose arrays are
+    zero-copy views of the file, or raises ValueError if it is not one.
+    """
+    with open(path, "rb") as fh:
+        buffer = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if buffer[:len(MAGIC)] != MAGIC:
+        buffer.close()
+        raise ValueError(f"{path} is not a cutoff snapshot")
+
+    (header_len,) = struct.unpack_from("<I", buffer, len(MAGIC))
+    header_start = len(MAGIC) + 4
+    header = json.loads(buffer[header_start:header_start + header_len])
+    if header["format"] != FORMAT_VERSION:
+        buffer.close()
+        raise ValueError(f"Unsupported snapshot format {header['format']}")
+
+    data_start = _aligned(header_start + header_len)
+    arrays = {
+        name: np.frombuffer(
+            buffer, dtype=spec["dtype"], count=spec["length"], offset=data_start + spec["offset"]
+        ) if spec["length"] else np.empty(0, dtype=spec["dtype"])
+        for name, spec in header["columns"].items()
+    }
+
+    return CutoffColumns(arrays, header["strings"], version=header["data_version"], buffer=buffer)
@@ -0,0 +1,105 @@
+"""
+Predictor state kept in a signed cookie instead of the database session.
+
+The predictor remembers one thing per visitor: whether the OTP step
+unlocked every college. Storing that in the DB-backed session cost a
+session row write on almost every request and grew the sessions table
+without bound. It now lives in one compact cookie, signed with SECRET_KEY
+so it cannot be edited client-side:
+
+    unlocked       True once the OTP was verified
+
+Result pages themselves are canonical GET URLs (http_cache.py), so the
+query needs no storing; the OTP step returns to the page's URL.
+
+PredictorStateMiddleware loads it lazily as request.predictor_state
+(a dict-like object with the session's get / [] / pop API) and sets the
+cookie only when a view changed it. Browsing therefore never writes to
+the database; the session is left to the lead / OTP flow.
+"""
+from django.conf import settings
+from django.core import signing
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+
+STATE_COOKIE = "predictor_state"
+STATE_SALT = "predictor.state"
+
+
+def dump_state(data):
+    return signing.dumps(data, salt=STATE_SALT, compress=True)
+
+
+def load_state(value):
+    """
+    The state dict in a cookie value; {} when it is missing, tampered
+    with or older than SESSION_COOKIE_AGE.
+    """
+    if not value:
+        return {}
+    try:
+        data = signing.loads(value, salt=STATE_SALT, max_age=settings.SESSION_COOKIE_AGE)
+    except signing.BadSignature:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+class PredictorState:
+    def __init__(self, cookie):
+        self._cookie = cookie
+        self._data = None
+        self.modified = False
+
+    @property
+    def accessed(self):
+        return self._data is not None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = load_state(self._cookie)
+        return self._data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        if self.data.get(key) != value:
+            self.data[key] = value
+            self.modified = True
+
+    def pop(self, key, default=None):
+        if key in self.data:
+            self.modified = True
+        return self.data.pop(key, default)
+
+
+class PredictorStateMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = request.predictor_state = PredictorState(request.COOKIES.get(STATE_COOKIE))
+        response = self.get_response(request)
+
+        if state.accessed:
+            # the response depends on this visitor's cookie, like a session
+            patch_vary_headers(response, ("Cookie",))
+        if state.modified:
+            if state.data:
+                response.set_cookie(
+                    STATE_COOKIE,
+                    dump_state(state.data),
+                    max_age=settings.SESSION_COOKIE_AGE,
+                    secure=settings.SESSION_COOKIE_SECURE,
+                    httponly=True,
+                    samesite=settings.SESSION_COOKIE_SAMESITE,
+                )
+            else:
+                response.delete_cookie(STATE_COOKIE, samesite=settings.SESSION_COOKIE_SAMESITE)
+            # shared caches must not store another visitor's Set-Cookie
+            patch_cache_control(response, private=True)
+        return response
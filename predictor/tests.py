@@ -1,3 +1,1100 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from urllib.parse import quote
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from .cutoff_index import bump_data_version
+from .models import Cutoff, Institute, Lead, MarksBand
+
+
+class PredictorTestCase(TestCase):
+    """
+    Small cutoff/marks fixture with the data version stamp, snapshot, rank
+    lookup, lead queue and profile files pointed at a temp dir, so tests
+    never touch the real ones.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmpdir = tempfile.mkdtemp()
+        cls._settings = override_settings(
+            CUTOFF_DATA_VERSION_FILE=Path(cls._tmpdir) / "version",
+            RANK_LOOKUP_FILE=Path(cls._tmpdir) / "rank_lookup.npz",
+            CUTOFF_SNAPSHOT_FILE=Path(cls._tmpdir) / "cutoffs.snapshot",
+            LEAD_QUEUE_FILE=Path(cls._tmpdir) / "lead_queue.jsonl",
+            PROFILE_DIR=Path(cls._tmpdir) / "profiles",
+        )
+        cls._settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._settings.disable()
+        shutil.rmtree(cls._tmpdir, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        MarksBand.objects.bulk_create([
+            MarksBand(min_marks=200, max_marks=300, percentile=99.5, min_rank=1, max_rank=5000),
+            MarksBand(min_marks=100, max_marks=199, percentile=95.0, min_rank=5001, max_rank=60000),
+        ])
+
+        cutoffs = []
+        for i in range(5):
+            institute = Institute.objects.create(name=f"Institute {i}")
+            for j in range(4):
+                cutoffs.append(Cutoff(
+                    institute=institute,
+                    program_name=f"Program {j}",
+                    quota="AI",
+                    seat_type="OPEN",
+                    gender="Gender-Neutral",
+                    opening_rank=1000 * j + 1,
+                    closing_rank=1000 * j + 2000 + i * 100,
+                    year=2025,
+                ))
+        Cutoff.objects.bulk_create(cutoffs)
+
+    def setUp(self):
+        # a new stamp makes every in-memory structure rebuild from this fixture
+        bump_data_version()
+
+    def unlock(self):
+        from .state import STATE_COOKIE, dump_state
+
+        self.client.cookies[STATE_COOKIE] = dump_state({"unlocked": True})
+
+
+class PredictionQueryCountTests(PredictorTestCase):
+    def test_colleges_renders_without_cutoff_queries(self):
+        # canonical URL, so no redirect
+        url = "/colleges/?rank=2500&category=OPEN&gender=Gender-Neutral&home_state=&year=2025&round=6"
+        self.client.get(url)  # warm the index
+
+        # state is in the signed cookie: no session, Cutoff, Institute or
+        # MarksBand queries
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Institute 0")
+
+    def test_home_post_renders_without_cutoff_queries(self):
+        data = {"marks": "150", "category": "OPEN", "gender": "Gender-Neutral"}
+        self.client.post("/predict/", data, follow=True)
+
+        with self.assertNumQueries(0):
+            response = self.client.post("/predict/", data, follow=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.context["result"])
+
+    def test_cold_index_build_is_one_query_per_structure(self):
+        # cutoff index (1 joined query) + marks engine (1 query)
+        with self.assertNumQueries(2):
+            self.client.post(
+                "/predict/",
+                {"marks": "250", "category": "OPEN", "gender": "Gender-Neutral"},
+                follow=True,
+            )
+
+
+class MarksEngineTests(PredictorTestCase):
+    def test_out_of_range_marks_are_rejected_everywhere(self):
+        from .marks_engine import get_marks_engine
+
+        huge = "9" * 400
+        self.assertIsNone(get_marks_engine().estimate(int(huge)))
+        self.assertIsNone(get_marks_engine().estimate(301))
+
+        for marks in (huge, "301", "99"):
+            response = self.client.get("/predict/", {"marks": marks})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context["error"], "Marks out of supported range.")
+            self.assertNotIn("ETag", response)
+
+        self.unlock()
+        self.assertEqual(self.client.get("/predict/more/", {"marks": huge, "chance": "safe"}).status_code, 400)
+        self.assertEqual(self.client.get("/export/", {"marks": huge}).status_code, 400)
+
+    def test_estimates_interpolate_inside_bands(self):
+        import numpy as np
+        from .marks_engine import get_marks_engine
+
+        engine = get_marks_engine()
+        self.assertEqual(engine.estimate(250).approx_rank, 2500)
+        self.assertEqual((engine.estimate(250).min_rank, engine.estimate(250).max_rank), (1, 5000))
+
+        marks = np.arange(-5, 306)
+        many = engine.estimate_many(marks)
+        self.assertEqual(marks[many["valid"]].tolist(), list(range(100, 301)))
+        approx = many["approx_rank"][many["valid"]]
+        self.assertTrue((np.diff(approx) <= 0).all())
+        self.assertTrue((many["rank_low"] <= many["approx_rank"]).all())
+        self.assertTrue((many["approx_rank"] <= many["rank_high"]).all())
+
+        for value in (-5, 100, 150, 199, 200, 299, 300, 305):
+            single = engine.estimate(value)
+            i = value + 5
+            if single is None:
+                self.assertFalse(many["valid"][i], value)
+                continue
+            self.assertEqual(
+                (single.approx_rank, single.rank_low, single.rank_high, single.percentile),
+                (many["approx_rank"][i], many["rank_low"][i], many["rank_high"][i], many["percentile"][i]),
+            )
+
+
+class ChanceScoringTests(PredictorTestCase):
+    def test_home_lists_programs_by_admission_chance(self):
+        response = self.client.get(
+            "/predict/", {"marks": "250", "category": "OPEN", "gender": "Gender-Neutral"}, follow=True
+        )
+
+        rows = response.context["cutoffs"]
+        self.assertTrue(rows)
+        # ordered by the displayed percentage
+        probabilities = [round(row.probability, 2) for row in rows]
+        self.assertEqual(probabilities, sorted(probabilities, reverse=True))
+        for row in rows:
+            expected = "safe" if row.probability >= 0.8 else "moderate" if row.probability >= 0.4 else "reach"
+            self.assertEqual(row.chance, expected)
+
+    def test_closing_trend_uses_earlier_years_only(self):
+        from .cutoff_index import get_cutoff_index
+
+        institute = Institute.objects.get(name="Institute 0")
+        Cutoff.objects.create(
+            institute=institute, program_name="Program 0", quota="AI", seat_type="OPEN",
+            gender="Gender-Neutral", opening_rank=1, closing_rank=4000, year=2024,
+        )
+        bump_data_version()
+
+        index = get_cutoff_index()
+        mean, std, count = index.closing_trend()
+        by_year = {
+            index.row(pos).year: pos
+            for pos in range(index.size)
+            if index.row(pos).institute_name == "Institute 0" and index.row(pos).program_name == "Program 0"
+        }
+        self.assertEqual(count[by_year[2024]], 1)
+        self.assertEqual(count[by_year[2025]], 2)
+        self.assertGreater(std[by_year[2025]], 0)
+
+
+class CutoffIndexTests(PredictorTestCase):
+    def test_overlapping_matches_the_orm_query(self):
+        from .cutoff_index import get_cutoff_index
+
+        index = get_cutoff_index()
+        args = (2025, 6, ("AI",), "OPEN", "Gender-Neutral")
+        for lo, hi in ((1, 1), (1000, 1000), (1001, 1001), (2000, 2500), (2401, 2450),
+                       (4500, 6000), (5900, 6000), (6001, 9000)):
+            expected = list(Cutoff.objects.filter(
+                year=2025, round=6, quota="AI", seat_type="OPEN", gender="Gender-Neutral",
+                opening_rank__lte=hi, closing_rank__gte=lo,
+            ).order_by("closing_rank", "id").values_list("id", flat=True))
+            for limit in (None, 3):
+                rows = index.overlapping(*args, lo, hi, limit=limit)
+                self.assertEqual([row.id for row in rows], expected[:limit], (lo, hi, limit))
+            self.assertEqual(
+                [row.id for row in index.containing(*args, lo)],
+                [row.id for row in index.overlapping(*args, lo, lo)],
+            )
+
+
+class OpeningTreeTests(PredictorTestCase):
+    def test_matches_a_full_scan(self):
+        import numpy as np
+        from .cutoff_index import _MinTree
+
+        rng = np.random.default_rng(7)
+        for n in (1, 2, 37, 256, 1000):
+            values = rng.integers(1, 10000, n)
+            tree = _MinTree(values)
+            for _ in range(50):
+                lo, hi = sorted(rng.integers(0, n + 1, 2).tolist())
+                x = int(rng.integers(0, 10000))
+                expected = lo + np.flatnonzero(values[lo:hi] <= x)
+                self.assertEqual(tree.at_most(lo, hi, x).tolist(), expected.tolist())
+                self.assertEqual(tree.at_most(lo, hi, x, limit=3).tolist(), expected[:3].tolist())
+
+    def test_long_tails_use_the_tree(self):
+        from unittest import mock
+        from . import cutoff_index
+
+        index = cutoff_index.get_cutoff_index()
+        queries = [(lo, lo + width) for lo in (1, 1500, 2500, 4200) for width in (0, 300, 5000)]
+        for group in index.groups.values():
+            scanned = [group.overlapping(a, b, limit).tolist() for a, b in queries for limit in (None, 2)]
+            with mock.patch.object(cutoff_index, "TAIL_SCAN_ROWS", 0):
+                walked = [group.overlapping(a, b, limit).tolist() for a, b in queries for limit in (None, 2)]
+            self.assertEqual(walked, scanned)
+
+
+class SnapshotTests(PredictorTestCase):
+    def test_round_trip_matches_the_database(self):
+        import numpy as np
+        from .snapshot import COLUMN_DTYPES, CutoffColumns, open_snapshot, write_snapshot
+
+        path = Path(self._tmpdir) / "round_trip.snapshot"
+        for columns in (CutoffColumns.from_database(version="v1"), CutoffColumns.from_rows([], version="v2")):
+            write_snapshot(columns, path)
+            mapped = open_snapshot(path)
+            self.assertEqual((mapped.version, len(mapped)), (columns.version, len(columns)))
+            self.assertEqual(mapped.strings, columns.strings)
+            for name in COLUMN_DTYPES:
+                self.assertTrue(np.array_equal(mapped.arrays[name], columns.arrays[name]), name)
+
+    def test_rejects_other_files(self):
+        from unittest import mock
+        from . import snapshot
+        from .cutoff_index import CutoffIndex
+
+        path = Path(self._tmpdir) / "bad.snapshot"
+        path.write_bytes(b"NOTASNAP" + bytes(64))
+        with self.assertRaisesMessage(ValueError, "is not a cutoff snapshot"):
+            snapshot.open_snapshot(path)
+
+        with mock.patch.object(snapshot, "FORMAT_VERSION", 99):
+            snapshot.write_snapshot(snapshot.CutoffColumns.from_database(version="v1"), path)
+        with self.assertRaisesMessage(ValueError, "Unsupported snapshot format 99"):
+            snapshot.open_snapshot(path)
+
+        # a worker falls back to the database instead of failing
+        with self.settings(CUTOFF_SNAPSHOT_FILE=path):
+            self.assertEqual(len(CutoffIndex.build(version="v1").columns), 20)
+
+    def test_worker_maps_the_published_snapshot(self):
+        from .cutoff_index import get_cutoff_index
+        from .publishing import publish_cutoff_data
+
+        before = get_cutoff_index()
+        Cutoff.objects.create(
+            institute=Institute.objects.first(), program_name="Program 9", quota="AI",
+            seat_type="OPEN", gender="Gender-Neutral", opening_rank=1, closing_rank=10, year=2025,
+        )
+        published = publish_cutoff_data()
+
+        with self.assertNumQueries(0):
+            after = get_cutoff_index()
+        self.assertIsNot(after, before)
+        self.assertEqual(after.version, published.version)
+        self.assertIsNotNone(after.columns._buffer)
+        self.assertEqual(len(after.columns), 21)
+
+
+class RankLookupTests(PredictorTestCase):
+    def test_matches_the_index_at_and_between_breakpoints(self):
+        from unittest import mock
+        from django.conf import settings
+        from . import rank_lookup
+        from .cutoff_index import get_cutoff_index
+
+        index = get_cutoff_index()
+        args = (2025, 6, ("AI",), "OPEN", "Gender-Neutral")
+        for every in (1, 4, 64):
+            with mock.patch.object(rank_lookup, "CHECKPOINT_EVERY", every):
+                lookup = rank_lookup.build_rank_lookup(save=every == 4, index=index)
+                if every == 4:
+                    lookup = rank_lookup.RankLookup.load(settings.RANK_LOOKUP_FILE)
+                bounds = sorted({int(b) for seg in lookup.segments.values() for b in seg.bounds})
+                ranks = {0, 1, 99999}
+                for lo, hi in zip(bounds, bounds[1:]):
+                    ranks.update((lo - 1, lo, (lo + hi) // 2, hi - 1))
+                for rank in sorted(ranks):
+                    self.assertEqual(
+                        [row.id for row in lookup.containing(index, *args, rank)],
+                        [row.id for row in index.containing(*args, rank)],
+                        (every, rank),
+                    )
+
+    def test_inverted_rows_are_never_active(self):
+        from unittest import mock
+        from . import rank_lookup
+        from .cutoff_index import get_cutoff_index
+
+        inverted = Cutoff.objects.create(
+            institute=Institute.objects.first(), program_name="Program 9", quota="AI",
+            seat_type="OPEN", gender="Gender-Neutral", opening_rank=3500, closing_rank=2500,
+            year=2025,
+        )
+        bump_data_version()
+        index = get_cutoff_index()
+        with mock.patch.object(rank_lookup, "CHECKPOINT_EVERY", 4):
+            lookup = rank_lookup.build_rank_lookup(save=False, index=index)
+            for rank in range(1, 6000, 50):
+                rows = lookup.containing(index, 2025, 6, ("AI",), "OPEN", "Gender-Neutral", rank)
+                self.assertNotIn(inverted.id, [row.id for row in rows], rank)
+
+
+class ResultCacheTests(PredictorTestCase):
+    def test_new_data_version_misses_both_layers(self):
+        from . import services
+        from .publishing import publish_cutoff_data
+        from .result_cache import result_cache
+
+        def predict():
+            services.predict_rank(2025, 6, "OPEN", "Gender-Neutral", 4500)
+            stats = result_cache.snapshot()
+            return stats["lru_hits"], stats["shared_hits"], stats["misses"]
+
+        result_cache.clear()
+        self.assertEqual(predict(), (0, 0, 1))
+        self.assertEqual(predict(), (1, 0, 1))
+
+        # another worker: empty LRU, same shared cache
+        result_cache._lru.clear()
+        self.assertEqual(predict(), (1, 1, 1))
+
+        bump_data_version()
+        self.assertEqual(predict(), (1, 1, 2))
+        self.assertEqual(result_cache.snapshot()["lru_size"], 1)
+
+        publish_cutoff_data()
+        self.assertEqual(predict(), (1, 1, 3))
+        self.assertEqual(predict(), (2, 1, 3))
+
+
+class WarmCacheTests(PredictorTestCase):
+    def test_warmed_ranks_cover_ranks_between_steps(self):
+        from django.core.management import call_command
+        from . import services
+        from .result_cache import result_cache
+
+        call_command(
+            "warm_prediction_cache", year=2025, round=6, max_rank=10000, workers=1,
+            stdout=StringIO(),
+        )
+        result_cache.clear()
+        for rank in (1, 2345, 3001, 4567, 9999):
+            services.predict_rank(2025, 6, "OPEN", "Gender-Neutral", rank)
+        stats = result_cache.snapshot()
+        self.assertEqual(stats["misses"], 0)
+        self.assertEqual(stats["shared_hits"], 5)
+
+
+class HomeStateQuotaTests(PredictorTestCase):
+    def test_home_state_picks_hs_or_os_per_institute(self):
+        from . import services
+
+        calicut = Institute.objects.create(name="National Institute of Technology Calicut", state="Kerala")
+        for quota in ("HS", "OS"):
+            Cutoff.objects.create(
+                institute=calicut, program_name="Program 0", quota=quota, seat_type="OPEN",
+                gender="Gender-Neutral", opening_rank=1, closing_rank=9000, year=2025,
+            )
+        bump_data_version()
+
+        def quotas_for(home_state):
+            rows = services.predict_rank(
+                2025, 6, "OPEN", "Gender-Neutral", 5000, can_see_all=True, home_state=home_state,
+            ).rows
+            return {row.quota for row in rows if row.institute_name == calicut.name}
+
+        self.assertEqual(quotas_for(""), set())
+        self.assertEqual(quotas_for("kerala"), {"HS"})
+        self.assertEqual(quotas_for("Goa"), {"OS"})
+
+
+class KeysetPaginationTests(PredictorTestCase):
+    def test_pages_cover_the_full_result_once(self):
+        from . import services
+
+        full = services.predict_rank(2025, 6, "OPEN", "Gender-Neutral", 2500, limit=100).rows
+        seen, after = [], ""
+        while True:
+            page = services.predict_rank(2025, 6, "OPEN", "Gender-Neutral", 2500, limit=3, after=after)
+            seen.extend(row.id for row in page.rows)
+            if not page.next_cursor:
+                break
+            after = page.next_cursor
+
+        self.assertEqual(len(full), 10)
+        self.assertEqual(seen, [row.id for row in full])
+
+    def test_load_more_fragment_requires_unlock(self):
+        url = "/colleges/more/?rank=2500&category=OPEN&gender=Gender-Neutral&after=3000_1"
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.unlock()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("X-Next-Cursor", response)
+
+
+class CanonicalLabelTests(PredictorTestCase):
+    def test_any_gender_spelling_finds_female_only_rows(self):
+        from .codes import FEMALE_ONLY
+
+        Cutoff.objects.create(
+            institute=Institute.objects.get(name="Institute 0"), program_name="Program 0", quota="AI",
+            seat_type="OPEN", gender="Female-only including Supernumerary",
+            opening_rank=1, closing_rank=9000, year=2025,
+        )
+        bump_data_version()
+
+        for spelling in ("Female-only including Supernumerary", FEMALE_ONLY, "female"):
+            response = self.client.get(
+                "/colleges/", {"rank": "5000", "category": "open", "gender": spelling}, follow=True
+            )
+            self.assertEqual(response.context["gender"], FEMALE_ONLY)
+            self.assertEqual([row.gender for row in response.context["cutoffs"]], [FEMALE_ONLY])
+
+
+class ExportTests(PredictorTestCase):
+    def test_csv_export_streams_every_eligible_program(self):
+        self.unlock()
+
+        response = self.client.get("/export/", {"rank": "2500", "category": "OPEN", "gender": "Gender-Neutral"})
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith("Institute,Program"))
+        self.assertEqual(len(lines) - 1, 10)
+
+
+class PublishSignalTests(PredictorTestCase):
+    def test_bulk_edit_publishes_once_on_commit(self):
+        from .cutoff_index import data_version
+
+        before = data_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for band in MarksBand.objects.all():
+                band.percentile -= 0.1
+                band.save()
+            MarksBand.objects.create(min_marks=0, max_marks=99, percentile=50.0, min_rank=60001, max_rank=900000)
+            institute = Institute.objects.get(name="Institute 0")
+            institute.state = "Kerala"
+            institute.save()
+            self.assertEqual(data_version(), before)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(data_version(), before)
+
+
+class CutoffEditTests(PredictorTestCase):
+    def programs(self, rank):
+        from . import services
+
+        prediction = services.predict_rank(2025, 6, "OPEN", "Gender-Neutral", rank, can_see_all=True)
+        return [(row.institute_name, row.program_name) for row in prediction.rows]
+
+    def test_admin_edit_reaches_predictions(self):
+        self.assertEqual(self.programs(5500), [])
+        cutoff = Cutoff.objects.get(institute__name="Institute 0", program_name="Program 3", year=2025)
+        with self.captureOnCommitCallbacks(execute=True):
+            cutoff.closing_rank = 6000
+            cutoff.save()
+        self.assertEqual(self.programs(5500), [("Institute 0", "Program 3")])
+
+    def test_admin_delete_reaches_predictions(self):
+        self.assertIn(("Institute 0", "Program 3"), self.programs(4500))
+        with self.captureOnCommitCallbacks(execute=True):
+            Cutoff.objects.get(institute__name="Institute 0", program_name="Program 3", year=2025).delete()
+        self.assertNotIn(("Institute 0", "Program 3"), self.programs(4500))
+
+    def test_loaders_publish_once(self):
+        from django.core.management import call_command
+
+        path = Path(self._tmpdir) / "cutoffs.csv"
+        path.write_text(
+            "Institute,Academic Program Name,Quota,Seat Type,Gender,Opening Rank,Closing Rank\n"
+            "Institute 0,Program 0,AI,OPEN,Gender-Neutral,100,5000\n"
+        )
+        # the command publishes itself; its bulk delete schedules nothing
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            call_command("load_sample_cutoffs", path=str(path), year=2025, round=6, stdout=StringIO())
+        self.assertEqual(callbacks, [])
+        self.assertEqual(Cutoff.objects.filter(year=2025, round=6).count(), 1)
+
+
+class RankColumnTests(PredictorTestCase):
+    def test_clean_rank_column(self):
+        import pandas as pd
+        from .management.commands.load_sample_cutoffs import clean_rank_column
+
+        series = pd.Series(["12", " 34P ", "", None, "abc", "5.5", "7.0", 8, "P"], dtype=object)
+        cleaned = clean_rank_column(series)
+        self.assertEqual(str(cleaned.dtype), "Int64")
+        self.assertEqual(
+            [None if pd.isna(v) else int(v) for v in cleaned],
+            [12, 34, None, None, None, None, 7, 8, None],
+        )
+
+    def test_bulk_load_replaces_the_round_and_skips_bad_ranks(self):
+        from django.core.management import call_command
+
+        path = Path(self._tmpdir) / "bulk.csv"
+        path.write_text(
+            "Institute,Academic Program Name,Quota,Seat Type,Gender,Opening Rank,Closing Rank\n"
+            "Institute 0,Program 0,AI,OPEN,Gender-Neutral,10,100\n"
+            "Institute 1,Program 0,AI,OPEN,Gender-Neutral,20P,200P\n"
+            "Institute 2,Program 0,AI,OPEN,Gender-Neutral,,300\n"
+            "Institute 3,Program 0,AI,OPEN,Gender-Neutral,40,n/a\n"
+            "New Institute,Program 0,AI,OPEN,Gender-Neutral,50,500\n"
+        )
+        out = StringIO()
+        call_command("load_sample_cutoffs", path=str(path), year=2025, round=6, batch_size=2, stdout=out)
+
+        self.assertIn("Inserted=3, Updated=0, Deleted=20", out.getvalue())
+        self.assertIn("Skipped=2", out.getvalue())
+        self.assertEqual(sorted(Cutoff.objects.values_list("institute__name", "opening_rank", "closing_rank")), [
+            ("Institute 0", 10, 100),
+            ("Institute 1", 20, 200),
+            ("New Institute", 50, 500),
+        ])
+
+
+class IncrementalLoadTests(PredictorTestCase):
+    HEADER = "Institute,Academic Program Name,Quota,Seat Type,Gender,Opening Rank,Closing Rank\n"
+
+    def load(self, *lines):
+        from django.core.management import call_command
+
+        path = Path(self._tmpdir) / "incremental.csv"
+        path.write_text(self.HEADER + "".join(f"{line}\n" for line in lines))
+        out = StringIO()
+        call_command(
+            "load_sample_cutoffs", path=str(path), year=2025, round=3, incremental=True, stdout=out,
+        )
+        return out.getvalue()
+
+    def ranks(self, **filters):
+        return sorted(Cutoff.objects.filter(**filters).values_list(
+            "institute__name", "program_name", "opening_rank", "closing_rank",
+        ))
+
+    def test_applies_only_the_delta_for_its_year_and_round(self):
+        from .cutoff_index import data_version
+
+        Cutoff.objects.create(
+            institute=Institute.objects.get(name="Institute 0"), program_name="Program 0",
+            quota="AI", seat_type="OPEN", gender="Gender-Neutral",
+            opening_rank=1, closing_rank=900, year=2024, round=3,
+        )
+        others = (self.ranks(year=2025, round=6), self.ranks(year=2024))
+
+        out = self.load(
+            "Institute 0,Program 0,AI,OPEN,Gender-Neutral,10,100",
+            "Institute 1,Program 1,AI,OPEN,Gender-Neutral,20,200",
+            "Institute 2,Program 2,AI,OPEN,Gender-Neutral,30,300",
+        )
+        self.assertIn("Inserted=3, Updated=0, Deleted=0", out)
+
+        version = data_version()
+        out = self.load(
+            "Institute 0,Program 0,AI,OPEN,Gender-Neutral,10,100",
+            "Institute 1,Program 1,AI,OPEN,Gender-Neutral,20,250",
+            "Institute 3,Program 3,AI,OPEN,Gender-Neutral,40,400",
+        )
+        self.assertIn("Inserted=1, Updated=1, Deleted=1", out)
+        self.assertNotEqual(data_version(), version)
+        self.assertEqual(self.ranks(year=2025, round=3), [
+            ("Institute 0", "Program 0", 10, 100),
+            ("Institute 1", "Program 1", 20, 250),
+            ("Institute 3", "Program 3", 40, 400),
+        ])
+        self.assertEqual((self.ranks(year=2025, round=6), self.ranks(year=2024)), others)
+
+        version = data_version()
+        out = self.load(
+            "Institute 0,Program 0,AI,OPEN,Gender-Neutral,10,100",
+            "Institute 1,Program 1,AI,OPEN,Gender-Neutral,20,250",
+            "Institute 3,Program 3,AI,OPEN,Gender-Neutral,40,400",
+        )
+        self.assertIn("Inserted=0, Updated=0, Deleted=0", out)
+        self.assertIn("No changes", out)
+        self.assertEqual(data_version(), version)
+
+
+class CutoffRoundTests(PredictorTestCase):
+    def add_round(self, year, round_no, closing_rank):
+        Cutoff.objects.create(
+            institute=Institute.objects.get(name="Institute 0"), program_name="Program 9",
+            quota="AI", seat_type="OPEN", gender="Gender-Neutral",
+            opening_rank=1, closing_rank=closing_rank, year=year, round=round_no,
+        )
+
+    def test_resolve_year_round_defaults(self):
+        from . import services
+        from .cutoff_index import get_cutoff_index
+
+        self.add_round(2025, 2, 900)
+        self.add_round(2025, Cutoff.ROUND_CSAB, 900)
+        self.add_round(2024, Cutoff.ROUND_CSAB, 900)
+        bump_data_version()
+        index = get_cutoff_index()
+
+        for year, round_no, expected in (
+            (None, None, (2025, 6)),
+            ("2025", "2", (2025, 2)),
+            ("2025", "7", (2025, Cutoff.ROUND_CSAB)),
+            ("2025", "5", (2025, 6)),
+            ("2024", "", (2024, Cutoff.ROUND_CSAB)),
+            ("1999", "abc", (2025, 6)),
+        ):
+            self.assertEqual(services.resolve_year_round(index, year, round_no), expected, (year, round_no))
+
+    def test_csab_rows_are_served_only_for_the_csab_round(self):
+        from . import services
+
+        self.add_round(2025, Cutoff.ROUND_CSAB, 50000)
+        bump_data_version()
+
+        def programs(round_no):
+            rows = services.predict_rank(2025, round_no, "OPEN", "Gender-Neutral", 40000).rows
+            return [row.program_name for row in rows]
+
+        self.assertEqual(programs(Cutoff.ROUND_CSAB), ["Program 9"])
+        self.assertEqual(programs(6), [])
+
+    def test_sheet_titles_route_to_rounds(self):
+        from .management.commands.import_josaa_workbook import sheet_year_round
+
+        self.assertEqual(sheet_year_round("2025 CSAB"), (2025, Cutoff.ROUND_CSAB))
+        self.assertEqual(sheet_year_round("2024 Round 3"), (2024, 3))
+        self.assertEqual(sheet_year_round("2025 josaa"), (2025, Cutoff.FINAL_JOSAA_ROUND))
+        self.assertEqual(sheet_year_round("2025 CSAB", year=2023, round_no=2), (2023, 2))
+
+
+class WorkbookImportTests(PredictorTestCase):
+    def test_import_normalises_headers_and_values(self):
+        from django.core.management import call_command
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("2024 Round 2")
+        sheet.append(["JoSAA 2024 opening and closing ranks"])
+        sheet.append(["Institute", "Academic Program Name", "Quota", "Seat  Type", "Gender",
+                      "Opening Rank", "Closing Rank"])
+        sheet.append(["Institute 0", "Program 0", "AI", "OPEN", "Female-only including Supernumerary",
+                      "12P", "40P"])
+        sheet.append(["Institute 9", "Program 0", "AI", "OPEN", "Gender-Neutral", 100.0, "250"])
+        sheet.append([None, None, None, None, None, None, None])
+        path = Path(self._tmpdir) / "josaa.xlsx"
+        workbook.save(path)
+
+        call_command("import_josaa_workbook", path=str(path), stdout=StringIO())
+
+        rows = sorted(Cutoff.objects.filter(year=2024, round=2).values_list(
+            "institute__name", "gender", "opening_rank", "closing_rank",
+        ))
+        self.assertEqual(rows, [
+            ("Institute 0", "Female-only (including Supernumerary)", 12, 40),
+            ("Institute 9", "Gender-Neutral", 100, 250),
+        ])
+
+
+class PredictApiTests(PredictorTestCase):
+    def post(self, payload, **extra):
+        import json
+
+        return self.client.post("/api/predict/", json.dumps(payload), content_type="application/json", **extra)
+
+    def test_single_student_by_rank(self):
+        response = self.post({"rank": 2500, "category": "open", "gender": "neutral"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        (result,) = data["results"]
+        self.assertEqual((result["rank"], result["category"], result["year"]), (2500, "OPEN", 2025))
+        self.assertTrue(result["program_ids"])
+        for program_id in result["program_ids"]:
+            program = data["programs"][str(program_id)]
+            self.assertLessEqual(program["opening_rank"], 2500)
+            self.assertGreaterEqual(program["closing_rank"], 2500)
+
+    def test_batch_keeps_order_and_reports_errors_per_student(self):
+        response = self.post({"students": [
+            {"marks": 250},
+            {"rank": "abc"},
+            {"rank": 2500, "quota": 5},
+            {"rank": 2500, "quota": ["AI", {"x": 1}]},
+            {"marks": 20},
+            {},
+            "student",
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(results[0]["marks"], 250)
+        self.assertEqual(
+            [r.get("error") for r in results[1:]],
+            [
+                "rank must be a positive integer.",
+                "quota must be a string or a list of strings.",
+                "quota must be a string or a list of strings.",
+                "Marks out of supported range.",
+                "Provide either marks or rank.",
+                "Each student must be a JSON object.",
+            ],
+        )
+
+    def test_out_of_range_numbers_are_per_student_errors(self):
+        import json
+
+        students = [
+            {"rank": 10 ** 20},
+            {"rank": "99999999999999999999"},
+            {"rank": 2 ** 31},
+            {"marks": 10 ** 400},
+            {"marks": "-" + "9" * 30},
+            {"rank": 2500},
+        ]
+        errors = [
+            "rank is out of range.",
+            "rank is out of range.",
+            "rank is out of range.",
+            "Marks out of supported range.",
+            "Marks out of supported range.",
+            None,
+        ]
+
+        response = self.post(students)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r.get("error") for r in response.json()["results"]], errors)
+
+        response = self.post(students, QUERY_STRING="stream=1")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([line["result"].get("error") for line in lines if "result" in line], errors)
+
+    def test_rejects_bad_payloads(self):
+        self.assertEqual(self.client.post("/api/predict/", "{", content_type="application/json").status_code, 400)
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.client.get("/api/predict/").status_code, 405)
+
+    def test_large_batch_streams_past_the_upload_limit(self):
+        import json
+        from .api import API_STREAM_THRESHOLD
+
+        # over DATA_UPLOAD_MAX_MEMORY_SIZE (2.5 MB), which request.body enforces
+        students = [{"rank": 2500 + i % 500, "category": "OPEN", "gender": "Gender-Neutral",
+                     "home_state": "", "quota": "AI"} for i in range(API_STREAM_THRESHOLD * 3)]
+        response = self.post(students)
+        self.assertGreater(int(response.wsgi_request.META["CONTENT_LENGTH"]), 2.5 * 2 ** 20)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        results = [line["result"] for line in lines if "result" in line]
+        programs = {line["program"]["id"] for line in lines if "program" in line}
+        self.assertEqual([r["rank"] for r in results], [s["rank"] for s in students])
+        self.assertEqual(programs, {pid for r in results for pid in r["program_ids"]})
+        # each program line comes before the first result that refers to it
+        sent = set()
+        for line in lines:
+            if "program" in line:
+                sent.add(line["program"]["id"])
+            else:
+                self.assertTrue(set(line["result"]["program_ids"]) <= sent)
+
+
+class SearchTests(PredictorTestCase):
+    def test_search_tolerates_typos_and_nicknames(self):
+        trichy = Institute.objects.create(
+            name="National Institute of Technology, Tiruchirappalli", state="Tamil Nadu", institute_type="NIT",
+        )
+        for program in ("Computer Science and Engineering (4 Years, Bachelor of Technology)",
+                        "Civil Engineering (4 Years, Bachelor of Technology)"):
+            Cutoff.objects.create(
+                institute=trichy, program_name=program, quota="OS", seat_type="OPEN",
+                gender="Gender-Neutral", opening_rank=1, closing_rank=9000, year=2025,
+            )
+        bump_data_version()
+
+        response = self.client.get("/api/search/", {"q": "nit trichy cse"})
+        results = response.json()["results"]
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0]["program"].startswith("Computer Science"))
+
+        response = self.client.get("/api/search/", {"q": "computr scien", "type": "NIT"})
+        self.assertEqual(
+            [r["institute"] for r in response.json()["results"]], [trichy.name],
+        )
+        self.assertEqual(self.client.get("/api/search/", {"q": "cse", "type": "XYZ"}).status_code, 400)
+
+
+class AllocationTests(PredictorTestCase):
+    def test_better_rank_gets_the_contested_seat(self):
+        from . import allocation
+        from .cutoff_index import get_cutoff_index
+
+        index = get_cutoff_index()
+        buckets = allocation.Buckets.from_index(index, 2025, 6, program_seats=1)
+        first = buckets.program_names.index(("Institute 0", "Program 0"))
+        second = buckets.program_names.index(("Institute 1", "Program 0"))
+
+        # everyone wants the same program first; one seat each
+        cohort = allocation.Cohort(
+            rank=[30, 10, 20],
+            category=["OPEN"] * 3,
+            female=[False] * 3,
+            home_state=[""] * 3,
+            preferences=[[first, second]] * 3,
+        )
+        result = allocation.simulate(buckets, cohort)
+
+        self.assertEqual(buckets.program[result.assigned].tolist()[:2], [first, second])
+        self.assertEqual(result.assigned[2], -1)
+        self.assertEqual(result.closing[result.assigned[0]], 10)
+        self.assertEqual(result.closing[result.assigned[1]], 20)
+
+
+class LeadQueueTests(PredictorTestCase):
+    def test_unlock_is_queued_then_drained_once(self):
+        from django.core.management import call_command
+        from . import lead_queue
+        from .state import STATE_COOKIE, load_state
+
+        form = {"name": "Asha", "phone": "9876543210", "state": "Kerala", "pass_year": "2026", "terms": "on"}
+        self.client.post("/unlock/", form)
+        response = self.client.post("/verify-otp/", {"otp": "123456"})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(load_state(self.client.cookies[STATE_COOKIE].value)["unlocked"])
+        self.assertFalse(Lead.objects.exists())
+
+        # the same phone again shortly after, plus a replay of the first spool
+        self.client.post("/unlock/", form)
+        spool = Path(lead_queue.queue_path()).read_text()
+        call_command("drain_lead_queue", stdout=StringIO())
+        Path(f"{lead_queue.queue_path()}.0.draining").write_text(spool)
+        call_command("drain_lead_queue", stdout=StringIO())
+
+        lead = Lead.objects.get()
+        self.assertEqual((lead.name, lead.phone, lead.otp_verified), ("Asha", "9876543210", True))
+        self.assertFalse(Path(lead_queue.queue_path()).exists())
+
+    def test_claim_waits_for_a_writer_with_the_spool_open(self):
+        import fcntl
+        import os
+        import threading
+        from . import lead_queue
+
+        lead_queue.enqueue_lead(name="Asha", phone="9876543210", state="Kerala", pass_year="2026")
+        claimed = []
+        with lead_queue.spool_lock(fcntl.LOCK_SH):
+            # a writer that opened the spool just before the claim
+            fd = os.open(lead_queue.queue_path(), os.O_WRONLY | os.O_APPEND)
+            claimer = threading.Thread(target=lambda: claimed.extend(lead_queue.claim_spools()))
+            claimer.start()
+            claimer.join(0.3)
+            self.assertTrue(claimer.is_alive())
+            os.write(fd, b'{"event":"verified","token":"late"}\n')
+            os.close(fd)
+        claimer.join(5)
+
+        (spool,) = claimed
+        events, _ = lead_queue.read_events(spool)
+        self.assertEqual([e["event"] for e in events], ["lead", "verified"])
+        self.assertEqual(lead_queue.drain()["created"], 1)
+        self.assertFalse(os.path.exists(spool))
+
+    def test_duplicate_verified_in_a_later_drain(self):
+        from . import lead_queue
+
+        fields = {"name": "Asha", "phone": "9876543210", "state": "Kerala", "pass_year": "2026"}
+        lead_queue.enqueue_lead(**fields)
+        lead_queue.drain()
+        duplicate = lead_queue.enqueue_lead(**fields)
+        lead_queue.drain()
+        lead_queue.enqueue_verified(duplicate)
+        # one malformed line does not stop the rest of the spool
+        lead_queue.enqueue({"token": "x", "phone": "1"})
+        totals = lead_queue.drain()
+
+        self.assertEqual(totals["verified"], 1)
+        self.assertTrue(Lead.objects.get().otp_verified)
+
+
+class BenchmarkTests(PredictorTestCase):
+    def test_benchmark_reports_every_stage_per_scale(self):
+        import json
+        from django.core.management import call_command
+
+        path = Path(self._tmpdir) / "cutoffs.csv"
+        path.write_text(
+            "Institute,Academic Program Name,Quota,Seat Type,Gender,Opening Rank,Closing Rank\n"
+            "Institute 0,Program 0,AI,OPEN,Gender-Neutral,100,5000\n"
+            "Institute 1,Program 1,AI,OBC-NCL,Gender-Neutral,50,3000P\n"
+        )
+        out = StringIO()
+        call_command(
+            "benchmark_predictor", csv=str(path), scales="1,2", samples=3, use_current_db=True,
+            stdout=out, stderr=StringIO(),
+        )
+
+        report = json.loads(out.getvalue())
+        self.assertEqual([(run["scale"], run["rows"]) for run in report["runs"]], [(1, 2), (2, 4)])
+        run = report["runs"][0]
+        self.assertEqual(run["latency_ms"]["rank_lookup"]["n"], 3)
+        self.assertLessEqual(run["latency_ms"]["request_home"]["p50"], run["latency_ms"]["request_home"]["p99"])
+        self.assertIn("colleges", run["queries_per_request"])
+        self.assertGreater(run["memory"]["process_rss_mb"], 0)
+
+
+class MetricsTests(PredictorTestCase):
+    @override_settings(SERVER_TIMING_HEADER=True, METRICS_TOKEN="s3cret")
+    def test_request_stages_reach_header_and_metrics(self):
+        from .metrics import registry
+
+        def stages(response):
+            return [part.split(";")[0] for part in response["Server-Timing"].split(", ")]
+
+        registry.reset()
+        # the redirect to the canonical URL builds the index
+        response = self.client.get("/colleges/", {"rank": "2500"})
+        self.assertIn("db", stages(response))
+        url = response["Location"]
+        # public pages go to shared caches: no per-request timings
+        self.assertNotIn("Server-Timing", self.client.get(url))
+        self.unlock()
+        response = self.client.get(url)
+        for stage in ("query", "group", "render", "session", "total"):
+            self.assertIn(stage, stages(response))
+
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/api/cache-stats/").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer nope").status_code, 403)
+        self.assertEqual(self.client.get("/api/cache-stats/", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+        metrics = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").content.decode()
+        self.assertIn('predictor_request_duration_seconds_count{view="colleges"} 3', metrics)
+        self.assertIn('predictor_stage_duration_seconds_bucket{stage="render",le="+Inf"} 2', metrics)
+        self.assertIn('predictor_responses_total{view="colleges",status="302"} 1', metrics)
+        self.assertIn('predictor_responses_total{view="colleges",status="200"} 2', metrics)
+
+
+class ProfilerTests(PredictorTestCase):
+    def test_sampler_roots_stacks_at_the_view(self):
+        import threading
+        from . import profiler
+
+        release, ready = threading.Event(), threading.Event()
+
+        def waiting_view():
+            profiler._thread_views[threading.get_ident()] = "colleges"
+            ready.set()
+            release.wait(5)
+
+        worker = threading.Thread(target=waiting_view)
+        worker.start()
+        ready.wait(5)
+        sampler = profiler.StackSampler(thread_id=worker.ident)
+        sampler.sample(threading.get_ident())
+        release.set()
+        worker.join()
+        profiler._thread_views.pop(worker.ident, None)
+
+        (stack, count), = sampler.stacks.items()
+        self.assertTrue(stack.startswith("[colleges];"))
+        self.assertIn("waiting_view (predictor/tests.py:", stack)
+        self.assertEqual(sampler.summary()["views"]["colleges"]["samples"], 1)
+
+    def test_profile_header_needs_staff(self):
+        from django.contrib.auth.models import User
+
+        response = self.client.get("/colleges/", {"rank": "2500"}, HTTP_X_PROFILE="1", follow=True)
+        self.assertNotIn("X-Profile-File", response)
+
+        self.client.force_login(User.objects.create_user("ops", is_staff=True))
+        response = self.client.get("/colleges/", {"rank": "2500"}, HTTP_X_PROFILE="1", follow=True)
+        self.assertTrue(response["X-Profile-File"].startswith("request-colleges-"))
+        self.assertTrue((Path(self._tmpdir) / "profiles" / response["X-Profile-File"]).exists())
+
+    def test_endpoint_rejects_non_finite_durations(self):
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_user("ops", is_staff=True))
+        for params in ({"seconds": "nan"}, {"seconds": "inf"}, {"interval": "nan"}, {"seconds": "-1"}):
+            self.assertEqual(self.client.get("/profile/", params).status_code, 400)
+
+
+class StateCookieTests(PredictorTestCase):
+    def test_tampered_cookie_is_ignored(self):
+        from .state import STATE_COOKIE, dump_state
+
+        url = "/colleges/more/?rank=2500&category=OPEN&gender=Gender-Neutral&after=3000_1"
+        self.client.cookies[STATE_COOKIE] = dump_state({"unlocked": False})[:-2] + "xx"
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_sweep_deletes_expired_and_predictor_only_sessions(self):
+        from datetime import timedelta
+        from django.contrib.sessions.backends.db import SessionStore
+        from django.contrib.sessions.models import Session
+        from django.core.management import call_command
+        from django.utils import timezone
+
+        def session(expiry, **data):
+            store = SessionStore()
+            store.update(data)
+            store.set_expiry(expiry)
+            store.save()
+            return store.session_key
+
+        session(timedelta(days=1), last_prediction={"marks": 150})
+        lead = session(timedelta(days=1), pending_lead={"token": "t"}, last_colleges_rank=2500)
+        expired = session(timedelta(days=1), pending_lead={"token": "u"})
+        Session.objects.filter(session_key=expired).update(expire_date=timezone.now() - timedelta(days=1))
+
+        call_command("sweep_sessions", legacy=True, batch_size=1, stdout=StringIO())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), [lead])
+
+
+class HttpCacheTests(PredictorTestCase):
+    URL = "/colleges/?rank=2500&category=OPEN&gender=Gender-Neutral&home_state=&year=2025&round=6"
+
+    def test_any_spelling_redirects_to_the_canonical_url(self):
+        response = self.client.get("/colleges/", {"gender": "neutral", "rank": "2500", "category": "open"})
+        self.assertRedirects(response, self.URL, fetch_redirect_response=False)
+
+        response = self.client.post("/predict/", {"marks": "150"})
+        self.assertRedirects(
+            response,
+            "/predict/?marks=150&category=OPEN&gender=Gender-Neutral&home_state=&year=2025&round=6",
+            fetch_redirect_response=False,
+        )
+
+    def test_revalidation_is_a_304_without_queries(self):
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("Cookie", response["Vary"])
+        self.assertIn("Last-Modified", response)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.URL, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached["ETag"], response["ETag"])
+
+        # new data, new validator
+        bump_data_version()
+        self.assertEqual(self.client.get(self.URL, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+    def test_unlocked_page_is_private_with_its_own_etag(self):
+        locked = self.client.get(self.URL)
+        self.unlock()
+        unlocked = self.client.get(self.URL)
+        self.assertIn("private", unlocked["Cache-Control"])
+        self.assertNotIn("public", unlocked["Cache-Control"])
+        self.assertNotEqual(unlocked["ETag"], locked["ETag"])
+
+    def test_otp_step_returns_to_the_result_page(self):
+        form = {"name": "Asha", "phone": "9876543210", "state": "Kerala", "pass_year": "2026", "terms": "on"}
+        self.client.post("/unlock/?source=colleges&next=" + quote(self.URL), form)
+        response = self.client.post("/verify-otp/", {"otp": "123456"})
+        self.assertRedirects(response, self.URL, fetch_redirect_response=False)
+        self.assertTrue(self.client.get(self.URL).context["can_see_all"])
+
+        # only local URLs; the empty search form it falls back to stays unlocked
+        self.client.post("/unlock/?source=colleges&next=https://example.com/", form)
+        response = self.client.post("/verify-otp/", {"otp": "123456"}, follow=True)
+        self.assertEqual(response.redirect_chain[0][0].split("?")[0], "/colleges/")
+        self.assertTrue(self.client.get(self.URL).context["can_see_all"])
+
+    def test_head_on_the_canonical_url_is_not_redirected(self):
+        response = self.client.head(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+        self.assertEqual(self.client.head("/colleges/?rank=2500").status_code, 302)
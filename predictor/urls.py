@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 
 urlpatterns = [
@@ -7,8 +7,22 @@ urlpatterns = [
     path("predict/", views.home, name="home"),
     path("colleges/", views.colleges, name="colleges"),
 
+    # "load more" fragments (keyset pages after the first)
+    path("predict/more/", views.home_more, name="home_more"),
+    path("colleges/more/", views.colleges_more, name="colleges_more"),
+    path("export/", views.export_programs, name="export_programs"),
+
     # new routes for unlock flow
     path("unlock/", views.start_lead, name="start_lead"),
     path("verify-otp/", views.verify_otp, name="verify_otp"),
     path("reset-unlock/", views.reset_unlock, name="reset_unlock"),
+
+    # JSON API for partners
+    path("api/predict/", api.predict_api, name="api_predict"),
+    path("api/search/", api.search_api, name="api_search"),
+    path("api/cache-stats/", api.cache_stats, name="api_cache_stats"),
+
+    # Prometheus scrape target (metrics.py), staff stack sampling (profiler.py)
+    path("metrics", api.metrics, name="metrics"),
+    path("profile/", api.profile_worker, name="profile_worker"),
 ]
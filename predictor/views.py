@@ -1,24 +1,45 @@
-from collections import defaultdict
-
+from django.http import HttpResponseBadRequest, HttpResponseForbidden
 from django.shortcuts import render, redirect
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.db.models import Q
-from .models import MarksBand, Cutoff, Lead
+from .codes import GENDER_NEUTRAL, OPEN, canonical_gender, canonical_seat_type
+from .cutoff_index import get_cutoff_index
+from .exports import csv_response, xlsx_response
+from .institute_states import STATES, canonical_state
+from .marks_engine import get_marks_engine
+from .metrics import timed
+from .scoring import CHANCE_LABELS
+from . import http_cache, lead_queue, services
 import random
 import re  
+from urllib.parse import urlencode
 
 
 def user_can_see_all(request):
-    return request.session.get("can_see_all_colleges", False)
+    return request.predictor_state.get("unlocked", False)
+
+
+def student_filters(params):
+    """
+    (category, gender, home_state) from form/query params (or a saved
+    prediction), in the canonical spelling the cutoff data uses.
+    """
+    return (
+        canonical_seat_type(params.get("category"), OPEN),
+        canonical_gender(params.get("gender"), GENDER_NEUTRAL),
+        canonical_state(params.get("home_state")),
+    )
 
 
 def reset_unlock(request):
     """
-    Dev/helper: clear unlock flag and last prediction
+    Dev/helper: clear unlock flag and pending lead
     so masking is active again and predictor starts empty.
     """
-    request.session.pop("can_see_all_colleges", None)
-    request.session.pop("lead_id", None)
-    request.session.pop("last_prediction", None)
+    request.predictor_state.pop("unlocked")
+    request.session.pop("pending_lead", None)
+    request.session.pop("unlock_next", None)
     return redirect("home")
 
 
@@ -60,7 +81,8 @@ def start_lead(request):
 
         dummy_otp = "123456"  # fixed for now
 
-        lead = Lead.objects.create(
+        # queued, not written here: drain_lead_queue stores it (lead_queue.py)
+        token = lead_queue.enqueue_lead(
             name=name,
             phone=phone,
             state=state,
@@ -69,7 +91,7 @@ def start_lead(request):
             otp_code=dummy_otp,
         )
 
-        request.session["lead_id"] = lead.id
+        request.session["pending_lead"] = {"token": token, "phone": phone, "otp_code": dummy_otp}
 
         # remember where user started unlock from
         source = request.GET.get("source") or request.POST.get("source")
@@ -78,6 +100,13 @@ def start_lead(request):
         else:
             request.session.pop("unlock_source", None)
 
+        # result page to return to; only local URLs
+        next_url = request.GET.get("next") or request.POST.get("next")
+        if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+            request.session["unlock_next"] = next_url
+        else:
+            request.session.pop("unlock_next", None)
+
         return redirect("verify_otp")
 
     # GET: show empty form
@@ -90,8 +119,7 @@ def verify_otp(request):
     """
     Step 2: verify dummy OTP and unlock all colleges.
     """
-    lead_id = request.session.get("lead_id")
-    lead = Lead.objects.filter(id=lead_id).first()
+    lead = request.session.get("pending_lead")
 
     if not lead:
         return render(request, "predictor/verify_otp.html", {
@@ -101,34 +129,38 @@ def verify_otp(request):
     if request.method == "POST":
         entered = request.POST.get("otp", "").strip()
 
-        if entered == lead.otp_code:
-            lead.otp_verified = True
-            lead.save(update_fields=["otp_verified"])
-            request.session["can_see_all_colleges"] = True
+        if entered == lead["otp_code"]:
+            lead_queue.enqueue_verified(lead["token"])
+            request.predictor_state["unlocked"] = True
+
+            # back to the result page the unlock started from (canonical URL)
+            next_url = request.session.pop("unlock_next", None)
+            if next_url:
+                return redirect(next_url)
 
             # decide where to send user back
             source = request.session.get("unlock_source")
 
             if source == "colleges":
-                # go back to browse colleges; keep same query params in URL
-                last_rank = request.session.get("last_colleges_rank", "")
-                last_category = request.session.get("last_colleges_category", "OPEN")
-                last_gender = request.session.get("last_colleges_gender", "Gender-Neutral")
-
-                return redirect(
-                    f"/colleges/?rank={last_rank}&category={last_category}&gender={last_gender}"
-                )
+                # empty search form; a bare /colleges/ would lock the view again
+                params = {
+                    "rank": "",
+                    "category": OPEN,
+                    "gender": GENDER_NEUTRAL,
+                    "home_state": "",
+                }
+                return redirect(f"{reverse('colleges')}?{urlencode(params)}")
 
             # default: go to predictor
             return redirect("home")
         else:
             return render(request, "predictor/verify_otp.html", {
-                "phone": lead.phone,
+                "phone": lead["phone"],
                 "error": "Invalid OTP. Please try again.",
             })
 
     return render(request, "predictor/verify_otp.html", {
-        "phone": lead.phone,
+        "phone": lead["phone"],
     })
 
 
@@ -140,206 +172,216 @@ def colleges(request):
     # always start locked when user opens this page directly
     if request.method == "GET" and "rank" not in request.GET:
         # first time visiting /colleges/ in this session: lock view
-        request.session.pop("can_see_all_colleges", None)
+        request.predictor_state.pop("unlocked")
 
     rank_str = request.GET.get("rank", "").strip()
-    category = request.GET.get("category", "OPEN").strip()
-    gender = request.GET.get("gender", "Gender-Neutral").strip()
+    category, gender, home_state = student_filters(request.GET)
+
+    index = get_cutoff_index()
+    year, round_no = services.resolve_year_round(
+        index, request.GET.get("year"), request.GET.get("round")
+    )
 
     context = {
         "rank": rank_str,
         "category": category,
         "gender": gender,
+        "home_state": home_state,
+        "states": STATES,
         "cutoffs": None,
+        **services.year_round_context(index, year, round_no),
     }
 
-    if rank_str.isdigit():
-        rank = int(rank_str)
-        # remember last browse-colleges search
-        request.session["last_colleges_rank"] = rank
-        request.session["last_colleges_category"] = category
-        request.session["last_colleges_gender"] = gender
-
-
-        # use AI quota
-        quota_filter = ["AI"]
-
-        # STRICT containment: opening_rank <= rank <= closing_rank
-        qs = Cutoff.objects.filter(
-            year=2025,
-            quota__in=quota_filter,
-            seat_type=category,
-            gender=gender,
-            opening_rank__lte=rank,
-            closing_rank__gte=rank,
-        ).order_by("closing_rank")[:50]
+    if not rank_str.isdigit():
+        with timed("render"):
+            return render(request, "predictor/colleges.html", context)
+
+    # results are served from one canonical, cacheable URL (http_cache.py)
+    query = http_cache.canonical_query("rank", rank_str, category, gender, home_state, year, round_no)
+    response = http_cache.canonical_redirect(request, query)
+    if response is not None:
+        return response
+    page = http_cache.CachedPage(request, "colleges", query, index.version, user_can_see_all(request))
+    response = page.not_modified()
+    if response is not None:
+        return response
+
+    # STRICT containment: opening_rank <= rank <= closing_rank
+    prediction = services.predict_rank(
+        year, round_no, category, gender, int(rank_str),
+        can_see_all=page.unlocked,
+        home_state=home_state,
+    )
+    context.update(prediction.as_context())
+
+    with timed("render"):
+        return page.finish(render(request, "predictor/colleges.html", context))
+
+
+def _more_response(request, prediction, prefix, show_chance=False):
+    """
+    One "load more" page: the institute cards as an HTML fragment, with the
+    cursor of the following page (empty when this is the last) in the
+    X-Next-Cursor header.
+    """
+    page = request.GET.get("page", "1")
+    with timed("render"):
+        response = render(request, "predictor/_institute_cards.html", {
+            "cutoffs_grouped": prediction.visible_groups,
+            "prefix": f"{prefix}-p{page if page.isdigit() else 1}",
+            "show_chance": show_chance,
+        })
+    response["X-Next-Cursor"] = prediction.next_cursor or ""
+    return response
 
-        context["cutoffs"] = qs
 
-        # group by institute name for accordion display
-        grouped = defaultdict(list)
-        for c in qs:
-            grouped[c.institute.name].append(c)
+def colleges_more(request):
+    """
+    Next page of browse-colleges results after the `after` cursor.
+    Paging past the first page is for unlocked users only.
+    """
+    if not user_can_see_all(request):
+        return HttpResponseForbidden("Unlock all colleges to load more results.")
 
-        grouped_items = list(grouped.items())
+    rank_str = request.GET.get("rank", "").strip()
+    if not rank_str.isdigit():
+        return HttpResponseBadRequest("rank must be a positive integer.")
+
+    index = get_cutoff_index()
+    year, round_no = services.resolve_year_round(
+        index, request.GET.get("year"), request.GET.get("round")
+    )
+    category, gender, home_state = student_filters(request.GET)
+    prediction = services.predict_rank(
+        year, round_no, category, gender, int(rank_str),
+        can_see_all=True,
+        home_state=home_state,
+        after=request.GET.get("after", ""),
+    )
+    return _more_response(request, prediction, "col")
+
+
+def home_more(request):
+    """
+    Next page of one chance label (safe / moderate / reach) on the
+    predictor page, after the `after` cursor.
+    """
+    if not user_can_see_all(request):
+        return HttpResponseForbidden("Unlock all colleges to load more results.")
+
+    marks_str = request.GET.get("marks", "").strip()
+    chance = request.GET.get("chance", "")
+    estimate = get_marks_engine().estimate(int(marks_str)) if marks_str.isdigit() else None
+    if not estimate or chance not in CHANCE_LABELS:
+        return HttpResponseBadRequest("Send supported marks and a chance label.")
+
+    index = get_cutoff_index()
+    year, round_no = services.resolve_year_round(
+        index, request.GET.get("year"), request.GET.get("round")
+    )
+    category, gender, home_state = student_filters(request.GET)
+    prediction = services.predict_chance_page(
+        year, round_no, category, gender, estimate, chance,
+        after=request.GET.get("after", ""),
+        can_see_all=True,
+        home_state=home_state,
+    )
+    return _more_response(request, prediction, f"home-{chance}", show_chance=True)
+
+
+def export_programs(request):
+    """
+    Download the full eligible-program list as CSV (streamed) or XLSX.
+    Takes the same inputs as home() (marks) or colleges() (rank), plus
+    format=csv|xlsx. Unlocked users only, like "load more".
+    """
+    if not user_can_see_all(request):
+        return HttpResponseForbidden("Unlock all colleges to download the full list.")
 
-        if not user_can_see_all(request) and grouped_items:
-            grouped_items = [grouped_items[0]]
+    marks_str = request.GET.get("marks", "").strip()
+    rank_str = request.GET.get("rank", "").strip()
+    estimate = get_marks_engine().estimate(int(marks_str)) if marks_str.isdigit() else None
+    if estimate is None and not rank_str.isdigit():
+        return HttpResponseBadRequest("Send supported marks or a rank.")
+
+    index = get_cutoff_index()
+    year, round_no = services.resolve_year_round(
+        index, request.GET.get("year"), request.GET.get("round")
+    )
+    category, gender, home_state = student_filters(request.GET)
+    rows = services.iter_eligible(
+        year, round_no, category, gender,
+        rank=int(rank_str) if estimate is None else None,
+        estimate=estimate,
+        home_state=home_state,
+    )
+
+    basis = f"marks-{marks_str}" if estimate is not None else f"rank-{rank_str}"
+    filename = f"jee-programs-{basis}-{category}-{year}-r{round_no}"
+    if request.GET.get("format") == "xlsx":
+        return xlsx_response(rows, filename, with_chance=estimate is not None)
+    return csv_response(rows, filename, with_chance=estimate is not None)
 
-        context["cutoffs_grouped"] = grouped_items
-        context["has_more_institutes"] = len(grouped) > 1
-        context["can_see_all"] = user_can_see_all(request)
 
-    return render(request, "predictor/colleges.html", context)
+def home(request):
+    """
+    Marks predictor. Results are GETs on a canonical URL (http_cache.py);
+    a POSTed form is redirected there.
+    """
+    params = request.POST if request.method == "POST" else request.GET
+    category, gender, home_state = student_filters(params)
 
+    index = get_cutoff_index()
+    year, round_no = services.resolve_year_round(index, params.get("year"), params.get("round"))
 
-def home(request):
     context = {
         "result": None,
         "error": None,
         "cutoffs": None,
-        "category": "OPEN",             # default
-        "gender": "Gender-Neutral",     # default
+        "category": category,
+        "gender": gender,
+        "home_state": home_state,       # "" = All India quota only
+        "states": STATES,
+        **services.year_round_context(index, year, round_no),  # latest data by default
     }
 
-    # --- 1) Handle GET: rebuild last prediction if it exists (used after OTP) ---
-    if request.method == "GET":
-        saved = request.session.get("last_prediction")
-        if saved:
-            marks = saved["marks"]
-            category = saved["category"]
-            gender = saved["gender"]
-            min_rank = saved["min_rank"]
-            max_rank = saved["max_rank"]
-
-            band = (
-                MarksBand.objects
-                .filter(min_marks__lte=marks, max_marks__gte=marks)
-                .first()
-            )
-
-            if band:
-                approx_rank = (band.min_rank + band.max_rank) // 2
-
-                context["result"] = {
-                    "marks": marks,
-                    "percentile": band.percentile,
-                    "min_rank": band.min_rank,
-                    "max_rank": band.max_rank,
-                    "approx_rank": approx_rank,
-                }
-
-                context["category"] = category
-                context["gender"] = gender
-
-                quota_filter = ["AI"]
-
-                base_qs = Cutoff.objects.filter(
-                    year=2025,
-                    quota__in=quota_filter,
-                    seat_type=category,
-                    gender=gender,
-                )
-
-                qs = base_qs.filter(
-                    opening_rank__lte=max_rank,
-                    closing_rank__gte=min_rank,
-                ).order_by("closing_rank")[:50]
-
-                context["cutoffs"] = qs
-
-                grouped = defaultdict(list)
-                for c in qs:
-                    grouped[c.institute.name].append(c)
-
-                grouped_items = list(grouped.items())
-
-                if not user_can_see_all(request) and grouped_items:
-                    grouped_items = [grouped_items[0]]
-
-                context["cutoffs_grouped"] = grouped_items
-                context["has_more_institutes"] = len(grouped) > 1
-                context["can_see_all"] = user_can_see_all(request)
-
-    # --- 2) Handle POST: normal flow when user submits marks form ---
-    if request.method == "POST":
-        marks_str = request.POST.get("marks", "").strip()
-        category = request.POST.get("category", "OPEN").strip()
-        gender = request.POST.get("gender", "Gender-Neutral").strip()
-
-        if not marks_str.isdigit():
-            context["error"] = "Please enter a valid integer marks."
-        else:
-            marks = int(marks_str)
-            band = (
-                MarksBand.objects
-                .filter(min_marks__lte=marks, max_marks__gte=marks)
-                .first()
-            )
-
-            if not band:
-                context["error"] = "Marks out of supported range."
-            else:
-                approx_rank = (band.min_rank + band.max_rank) // 2
-
-                context["result"] = {
-                    "marks": marks,
-                    "percentile": band.percentile,
-                    "min_rank": band.min_rank,
-                    "max_rank": band.max_rank,
-                    "approx_rank": approx_rank,
-                }
-
-                # keep selections for redisplay
-                context["category"] = category
-                context["gender"] = gender
-
-                # 5% tolerance around approx_rank
-                predicted_rank = int(approx_rank)
-                tolerance = int(0.05 * predicted_rank)  # 5% window
-                min_rank = predicted_rank - tolerance
-                max_rank = predicted_rank + tolerance
-
-                # for predictor page we always use AI quota
-                quota_filter = ["AI"]
-
-                base_qs = Cutoff.objects.filter(
-                    year=2025,
-                    quota__in=quota_filter,
-                    seat_type=category,
-                    gender=gender,
-                )
-
-                # any branch whose cutoff band overlaps [min_rank, max_rank]
-                qs = base_qs.filter(
-                    opening_rank__lte=max_rank,
-                    closing_rank__gte=min_rank,
-                ).order_by("closing_rank")[:50]
-
-                context["cutoffs"] = qs
-
-                # group by institute name for template
-                grouped = defaultdict(list)
-                for c in qs:
-                    grouped[c.institute.name].append(c)
-
-                grouped_items = list(grouped.items())
-
-                if not user_can_see_all(request) and grouped_items:
-                    # show only the first institute group
-                    grouped_items = [grouped_items[0]]
-
-                context["cutoffs_grouped"] = grouped_items
-                context["has_more_institutes"] = len(grouped) > 1
-                context["can_see_all"] = user_can_see_all(request)
-
-                # save this prediction in session so we can restore it after OTP
-                request.session["last_prediction"] = {
-                    "marks": marks,
-                    "category": category,
-                    "gender": gender,
-                    "min_rank": min_rank,
-                    "max_rank": max_rank,
-                }
+    marks_str = params.get("marks", "").strip()
+    if "marks" not in params:
+        with timed("render"):
+            return render(request, "predictor/home.html", context)
+    if not marks_str.isdigit():
+        context["error"] = "Please enter a valid integer marks."
+        with timed("render"):
+            return render(request, "predictor/home.html", context)
+    if not get_marks_engine().covers(int(marks_str)):
+        # before the canonical URL: int() of a long digit string is fine,
+        # but not its float conversion in the engine
+        context["error"] = "Marks out of supported range."
+        with timed("render"):
+            return render(request, "predictor/home.html", context)
+
+    query = http_cache.canonical_query("marks", marks_str, category, gender, home_state, year, round_no)
+    response = http_cache.canonical_redirect(request, query)
+    if response is not None:
+        return response
+    page = http_cache.CachedPage(request, "home", query, index.version, user_can_see_all(request))
+    response = page.not_modified()
+    if response is not None:
+        return response
+
+    estimate = get_marks_engine().estimate(int(marks_str))
+    if not estimate:
+        context["error"] = "Marks out of supported range."
+    else:
+        context["result"] = estimate._asdict()
+
+        # every branch in the slice, scored by admission chance
+        prediction = services.predict_chances(
+            year, round_no, category, gender, estimate,
+            can_see_all=page.unlocked,
+            home_state=home_state,
+        )
+        context.update(prediction.as_context())
 
-    return render(request, "predictor/home.html", context)
+    with timed("render"):
+        return page.finish(render(request, "predictor/home.html", context))
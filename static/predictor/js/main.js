@@ -51,3 +51,33 @@ function initUnlockForm() {
 
 // Initialize when page loads
 document.addEventListener('DOMContentLoaded', initUnlockForm);
+
+// "Load more" results: fetch the next keyset page as HTML and append it
+function loadMore(button) {
+    const target = document.getElementById(button.dataset.target);
+    if (!target) return;
+
+    const page = parseInt(button.dataset.page || "1") + 1;
+    const url = `${button.dataset.url}&after=${encodeURIComponent(button.dataset.after)}&page=${page}`;
+
+    button.disabled = true;
+    fetch(url, { headers: { "X-Requested-With": "XMLHttpRequest" } })
+        .then(response => {
+            if (!response.ok) throw new Error(response.statusText);
+            const next = response.headers.get("X-Next-Cursor");
+            return response.text().then(html => ({ html, next }));
+        })
+        .then(({ html, next }) => {
+            target.insertAdjacentHTML("beforeend", html);
+            if (next) {
+                button.dataset.after = next;
+                button.dataset.page = page;
+                button.disabled = false;
+            } else {
+                button.remove();
+            }
+        })
+        .catch(() => {
+            button.disabled = false;
+        });
+}